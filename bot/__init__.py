@@ -7,8 +7,12 @@ import traceback
 import discord
 from discord.ext import commands
 
-from bot import utils, database
-from bot.database.models import Guild
+from bot import utils
+from bot.database.prefixes import prefix_store
+from bot.store import JobDb
+from bot.utils.channel_index import ChannelIndex
+from bot.utils.job_queue import JobQueue
+from bot.utils.loop_monitor import LoopMonitor
 
 __version__ = "0.1.0"
 
@@ -21,27 +25,34 @@ async def get_prefix(_bot, message):
         prefix = utils.get_guild_prefix(_bot, message.guild.id)
     return commands.when_mentioned_or(prefix)(_bot, message)
 
-intents = discord.Intents(messages=True, message_content=True, guilds=True)
+# voice_states to know when puzzle voice channels are empty
+intents = discord.Intents(messages=True, message_content=True, guilds=True, voice_states=True)
 bot = commands.AutoShardedBot(command_prefix=get_prefix, intents=intents)
 bot.version = __version__
+# Per-guild data such as the command prefix, preloaded at startup so that get_prefix needs no I/O
 bot.guild_data = {}
+bot.prefixes = prefix_store(utils.config.database)
+# Background jobs for slow side effects of commands, e.g. creating Google spreadsheets
+bot.jobs = JobQueue(JobDb)
+# Channel lookups by id or name without scanning all guild channels
+bot.channel_index = ChannelIndex()
+bot.channel_index.register(bot)
+# Watchdog for synchronous calls blocking the event loop
+bot.loop_monitor = LoopMonitor(threshold=utils.config.loop_lag_threshold_ms / 1000)
 
 
 async def preload_guild_data():
-    guilds = await Guild.query.gino.all()
-    d = dict()
-    for guild in guilds:
-        d[guild.id] = {"prefix": guild.prefix}
-    return d
+    prefixes = await bot.prefixes.load_all()
+    return {guild_id: {"prefix": prefix} for guild_id, prefix in prefixes.items()}
 
 
 @bot.event
 async def on_ready():
     bot.invite = invite_link.format(bot.user.id)
-    # await database.setup()
-    # bot.guild_data = await preload_guild_data()
     guild_names = [g.name for g in bot.guilds]
     guild_ids = [g.id for g in bot.guilds]
+    # resume jobs left over from a previous run, now that channels can be looked up
+    bot.jobs.start()
 
     print(
         f"""Logged in as {bot.user}..
@@ -78,6 +89,13 @@ async def load_extensions(_bot):
 async def main():
     setup_logger(logging.INFO)
     async with bot:
+        bot.loop_monitor.start()
+        try:
+            await bot.prefixes.setup()
+            bot.guild_data = await preload_guild_data()
+        except Exception as exc:
+            # e.g. the database isn't running, which is fine unless prefixes were set with `!prefix`
+            logging.warning(f"Unable to load guild prefixes ({type(exc).__name__}: {exc}), using the default prefix")
         await load_extensions(bot)
         await bot.start(utils.config.token)
 
@@ -46,7 +46,8 @@ class BaseCog(commands.Cog):
     def get_puzzle_data_from_channel(self, channel) -> Optional[PuzzleData]:
         """Extract puzzle data based on the channel name and category name
 
-        Looks up the corresponding JSON data
+        Looks up the corresponding JSON data. Works for puzzle threads too,
+        whose category is the one of their #meta or forum channel.
         """
         if not channel.category:
             return None
@@ -58,7 +59,9 @@ class BaseCog(commands.Cog):
         puzzle_id = channel.id
         puzzle_name = channel.name
         settings = GuildSettingsDb.get_cached(guild_id)
-        hunt_id = settings.category_mapping[channel.category.id]
+        hunt_id = settings.category_mapping.get(channel.category.id)
+        if hunt_id is None:
+            return None
 
         if round_name.startswith(self.get_solved_puzzle_category(settings.hunt_settings[hunt_id].hunt_name)):
             round_id = "*"
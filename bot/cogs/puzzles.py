@@ -1,14 +1,21 @@
+import asyncio
 import datetime
 import logging
+import time
 import traceback
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
 import discord
 import pytz
 from bot.base_cog import BaseCog
-from bot.store import (GuildSettings, GuildSettingsDb, HuntSettings,
+from bot.store import (GuildSettings, GuildSettingsDb, HuntSettings, Job,
                        MissingPuzzleError, PuzzleData, PuzzleJsonDb)
 from bot.utils import urls
+from bot.utils.channel_index import THREAD_TYPES, GuildChannelIndex
+from bot.utils.keyed_lock import hunt_locks, puzzle_locks
+from bot.utils.progress import ProgressMessage
+from bot.utils.puzzle_list import listings
+from discord import app_commands
 from discord.ext import commands, tasks
 
 logger = logging.getLogger(__name__)
@@ -17,18 +24,58 @@ logger = logging.getLogger(__name__)
 class Puzzles(BaseCog):
     GENERAL_CHANNEL_NAME = "general"
     META_CHANNEL_NAME = "meta"
+    FORUM_CHANNEL_NAME = "puzzles"
     META_REASON = "bot-meta"
     ROLE_REASON = "bot-role"
     PUZZLE_REASON = "bot-puzzle"
     DELETE_REASON = "bot-delete"
     CLEANUP_REASON = "bot-cleanup"
     HUNT_REASON = "bot-hunt-general"
+    ARCHIVE_REASON = "bot-archive"
+    VOICE_IDLE_REASON = "bot-voice-idle"
     SOLVED_PUZZLES_CATEGORY = "solved"
     PRIORITIES = ["low", "medium", "high", "very high"]
+    # Discord limit on the number of channels in a category
+    MAX_CATEGORY_CHANNELS = 50
+    # Create the next solved category once the current one has this few slots left
+    SOLVED_CATEGORY_HEADROOM = 5
+    # Concurrent channel deletions during cleanup
+    CLEANUP_CONCURRENCY = 5
+    # Concurrent puzzle channel creations for `!p round: a | b | c`
+    BATCH_CONCURRENCY = 4
 
     def __init__(self, bot):
         self.bot = bot
+        # Solved categories being created ahead of time, hunt id -> task
+        self.solved_category_tasks = {}
+        # Puzzle voice channels, voice channel id -> (guild id, puzzle channel id, round id, hunt id)
+        self.voice_channels = {}
+        # Empty puzzle voice channels, voice channel id -> time.monotonic() since when
+        self.voice_idle_since = {}
+        bot.jobs.register("hunt_cleanup", self.run_cleanup_job, on_give_up=self.give_up_cleanup_job)
         self.archived_solved_puzzles_loop.start()
+        self.reap_voice_channels.start()
+        # Slash command descriptions are plain text, unlike the `!help` markdown
+        for command in self.walk_commands():
+            if isinstance(command, commands.HybridCommand):
+                command.app_command.description = command.app_command.description.strip("*")
+
+    async def cog_before_invoke(self, ctx):
+        # Acknowledge slash commands right away, their response is sent once the command is done.
+        # Discord otherwise fails the interaction after 3 seconds, e.g. while waiting on Google
+        await ctx.defer()
+
+    async def cog_after_invoke(self, ctx):
+        if ctx.interaction is None or ctx.command_failed or ctx.interaction.is_expired():
+            return
+        try:
+            response = await ctx.interaction.original_response()
+            if response.flags.loading:
+                # command returned without replying, e.g. not sent in the right channel
+                await ctx.interaction.edit_original_response(content=":ok_hand:")
+        except discord.HTTPException:
+            # e.g. the command deleted its channel
+            pass
 
     def clean_name(self, name):
         """Cleanup name to be appropriate for discord channel"""
@@ -37,9 +84,14 @@ class Puzzles(BaseCog):
             name = name[1:-1]
         return "-".join(name.lower().split())
 
+    def channels(self, guild: discord.Guild) -> GuildChannelIndex:
+        """Index of the guild's channels, for lookups without scanning guild.channels"""
+        return self.bot.channel_index(guild)
 
-    @commands.command(aliases=["h"])
+    @commands.hybrid_command(aliases=["h"])
+    @app_commands.describe(arg="hunt-name: hunt-url, and optionally `, role-name`")
     async def hunt(self, ctx, *, arg):
+        """*Create new hunt: !h hunt-name: hunt-url, role-name*"""
         guild = ctx.guild
         if not (await self.check_is_bot_channel(ctx)):
             return
@@ -54,14 +106,20 @@ class Puzzles(BaseCog):
         raise ValueError(f"Unable to parse hunt name {arg}, try using `!h hunt-name:hunt-url`")
 
 
-    @commands.command(aliases=["p"])
+    @commands.hybrid_command(aliases=["p"])
+    @app_commands.describe(arg="round-name: puzzle-name, puzzle-url (just the puzzle in #meta channels)")
     async def puzzle(self, ctx, *, arg):
         """*Create new puzzle channels: !p round-name: puzzle-name, puzzle-url*
 
-        Can be posted in either a #meta channel or the bot channel
+        Can be posted in either a #meta channel or the bot channel. Several puzzles
+        can be created at once with `!p round-name: puzzle-1 | puzzle-2, url | ..`,
+        or one puzzle per line.
         """
         guild = ctx.guild
 
+        if "|" in arg or "\n" in arg.strip():
+            return await self.batch_puzzles(ctx, arg)
+
         puzzle_url = None
         if ", " in arg:
             arg, puzzle_url = arg.split(", ", 1)
@@ -79,30 +137,88 @@ class Puzzles(BaseCog):
 
         raise ValueError(f"Unable to parse puzzle name {arg}, try using `!p round-name: puzzle-name`")
 
-    @commands.command(aliases=["r"])
+    @puzzle.autocomplete("arg")
+    async def puzzle_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Suggest `round-name: ` for rounds of the guild's hunts, from the settings and channel index"""
+        if interaction.guild is None or interaction.channel.name == self.META_CHANNEL_NAME:
+            return []
+        round_part, sep, puzzle_part = current.partition(":")
+        round_part = self.clean_name(round_part) if round_part.strip() else ""
+        choices = []
+        for name in self.round_names(interaction.guild):
+            if (sep and name == round_part) or (not sep and name.startswith(round_part)):
+                value = f"{name}: {puzzle_part.strip()}"[:100]
+                choices.append(app_commands.Choice(name=value, value=value))
+        return choices[:25]
+
+    def round_names(self, guild: discord.Guild) -> List[str]:
+        """Names of the round categories of hunts that haven't ended, without their solved categories"""
+        settings = GuildSettingsDb.get_cached(guild.id)
+        solved_ids = {
+            category_id for hunt in settings.hunt_settings.values() for category_id in hunt.solved_category_ids
+        }
+        names = []
+        for category_id, hunt_id in settings.category_mapping.items():
+            hunt_settings = settings.hunt_settings.get(hunt_id)
+            category = self.channels(guild).category_by_id(category_id)
+            if category is None or category_id in solved_ids or hunt_settings is None or hunt_settings.end_time:
+                continue
+            names.append(category.name)
+        return sorted(names)
+
+    async def batch_puzzles(self, ctx, arg: str):
+        """Parse `round: a | b, url | c` (or one puzzle per line) and create the puzzles together"""
+        if ctx.channel.name == self.META_CHANNEL_NAME:
+            round_name = ctx.channel.category.name
+        else:
+            if not (await self.check_is_bot_channel(ctx)):
+                return
+            if ":" not in arg:
+                raise ValueError(f"Unable to parse round name, try using `!p round-name: puzzle-1 | puzzle-2`")
+            round_name, arg = arg.split(":", 1)
+
+        puzzles = {}
+        for item in arg.replace("\n", "|").split("|"):
+            item = item.strip()
+            if not item:
+                continue
+            puzzle_url = None
+            if ", " in item:
+                item, puzzle_url = item.split(", ", 1)
+            # same channel name twice would race to create two channels
+            puzzles.setdefault(self.clean_name(item), (item, puzzle_url))
+        if not puzzles:
+            raise ValueError("No puzzle names found, try using `!p round-name: puzzle-1 | puzzle-2`")
+        return await self.create_puzzle_channels(ctx, round_name, list(puzzles.values()))
+
+    @commands.hybrid_command(aliases=["r"])
+    @app_commands.describe(arg="round-name")
     async def round(self, ctx, *, arg):
         """*Create new puzzle round: !r round-name*"""
         if ctx.channel.name != "general":
             return
 
         hunt_id = ctx.channel.category.id
-        category_name = self.clean_name(arg)
-        guild = ctx.guild
-        category = discord.utils.get(guild.categories, name=category_name)
-        settings  = GuildSettingsDb.get(guild.id)
-        if not category:
-            hunt_settings = settings.hunt_settings[hunt_id]
-            print(f"Creating a new channel category for round: {category_name}")
-            role = None
-            if hunt_settings.role_id:
-                role = discord.utils.get(guild.roles, id=hunt_settings.role_id)
-            overwrites = self.get_overwrites(guild, role)
-            # TODO: debug position?
-            category = await guild.create_category(category_name, overwrites=overwrites, position=max(len(guild.categories) - 2,0))
-        if not category.id in settings.category_mapping:
-            settings.category_mapping[category.id] = hunt_id
-            GuildSettingsDb.commit(settings)
-        await self.create_puzzle_channel(ctx, category.name, self.META_CHANNEL_NAME)
+        # e.g. the same round posted twice at once
+        async with hunt_locks(hunt_id):
+            category_name = self.clean_name(arg)
+            guild = ctx.guild
+            category = self.channels(guild).category(category_name)
+            settings  = GuildSettingsDb.get(guild.id)
+            if not category:
+                hunt_settings = settings.hunt_settings[hunt_id]
+                print(f"Creating a new channel category for round: {category_name}")
+                role = None
+                if hunt_settings.role_id:
+                    role = discord.utils.get(guild.roles, id=hunt_settings.role_id)
+                overwrites = self.get_overwrites(guild, role)
+                # TODO: debug position?
+                category = await guild.create_category(category_name, overwrites=overwrites, position=max(len(guild.categories) - 2,0))
+                self.channels(guild).add(category)
+            if not category.id in settings.category_mapping:
+                settings.category_mapping[category.id] = hunt_id
+                GuildSettingsDb.commit(settings)
+            await self.create_puzzle_channel(ctx, category.name, self.META_CHANNEL_NAME)
 
     @classmethod
     def get_guild_settings_from_ctx(cls, ctx, use_cached: bool = True) -> GuildSettings:
@@ -112,7 +228,7 @@ class Puzzles(BaseCog):
         else:
             return GuildSettingsDb.get(guild_id)
 
-    @commands.command()
+    @commands.hybrid_command()
     @commands.has_permissions(manage_channels=True)
     async def show_settings(self, ctx):
         """*(admin) Show guild-level settings*"""
@@ -123,7 +239,7 @@ class Puzzles(BaseCog):
             settings = settings.hunt_settings[hunt_id]
         await ctx.channel.send(f"```json\n{settings.to_json(indent=2)}```")
 
-    @commands.command()
+    @commands.hybrid_command()
     @commands.has_permissions(manage_channels=True)
     async def update_setting(self, ctx, setting_key: str, setting_value: str):
         """*(admin) Update guild setting: !update_setting key value*"""
@@ -166,73 +282,83 @@ class Puzzles(BaseCog):
         else:
             await ctx.send(f":exclamation: Unrecognized setting key: `{setting_key}`. Use `!show_settings` for more info.")
 
-    @commands.command(aliases=["list"])
+    @commands.hybrid_command(aliases=["list"])
     async def list_puzzles(self, ctx):
         """*List all puzzles and their statuses*"""
 
         if ctx.channel.name != self.GENERAL_CHANNEL_NAME:
             return
 
-        all_puzzles = PuzzleJsonDb.get_all(ctx.guild.id, ctx.channel.category.name)
-        all_puzzles = PuzzleData.sort_by_round_start(all_puzzles)
-
-        embed = discord.Embed()
-        cur_round = None
-        message = ""
-        # Create a message with a new embed field per round,
-        # listing all puzzles in the embed field
-        for puzzle in all_puzzles:
-            if cur_round is None:
-                cur_round = puzzle.round_name
-            if puzzle.round_name != cur_round:
-                # Reached next round, add new embed field
-                embed.add_field(name=cur_round, value=message)
-                cur_round = puzzle.round_name
-                message = ""
-            message += f"{puzzle.channel_mention}"
-            if puzzle.puzzle_type:
-                message += f" type:{puzzle.puzzle_type}"
-            if puzzle.solution:
-                message += f" sol:**{puzzle.solution}**"
-            elif puzzle.status:
-                message += f" status:{puzzle.status}"
-            message += "\n"
-
-        # add last round
-        if message:
-            embed.add_field(name=cur_round, value=message)
-
-        if embed.fields:
+        # #general is in the hunt's category, whose id is the hunt id
+        for embed in listings.get(ctx.guild.id, ctx.channel.category.id):
             await ctx.send(embed=embed)
 
     async def get_or_create_channel(
         self, guild: discord.Guild, category: discord.CategoryChannel, channel_name: str, channel_type, **kwargs
     ):
         """Retrieve given channel by name/category or create one"""
-        if channel_type == "text":
-            channel_type = discord.ChannelType.text
-        elif channel_type == "voice":
-            channel_type = discord.ChannelType.voice
-        if not (channel_type is discord.ChannelType.text or channel_type is discord.ChannelType.voice):
+        create_methods = {
+            discord.ChannelType.text: guild.create_text_channel,
+            discord.ChannelType.voice: guild.create_voice_channel,
+            discord.ChannelType.forum: guild.create_forum,
+        }
+        if isinstance(channel_type, str):
+            channel_type = getattr(discord.ChannelType, channel_type, channel_type)
+        if channel_type not in create_methods:
             raise ValueError(f"Unrecognized channel_type: {channel_type}")
-        channel = discord.utils.get(guild.channels, category=category, type=channel_type, name=channel_name)
+        channel = self.channels(guild).find(category, channel_type, channel_name)
         created = False
         if not channel:
             message = f"Creating a new channel: {channel_name} of type {channel_type} for category: {category}"
             print(message)
             logger.info(message)
-            create_method = (
-                guild.create_text_channel if channel_type is discord.ChannelType.text else guild.create_voice_channel
-            )
-            channel = await create_method(channel_name, category=category, **kwargs)
+            channel = await create_methods[channel_type](channel_name, category=category, **kwargs)
+            self.channels(guild).add(channel)
             created = True
 
         return (channel, created)
 
+    async def get_or_create_thread(
+        self, guild: discord.Guild, category: discord.CategoryChannel, thread_name: str, mode: str, overwrites=None
+    ):
+        """Retrieve puzzle thread by name or create one, in the round's #meta channel or forum channel
+
+        Used instead of text channels when the `discord_puzzle_threads` setting is "meta" or "forum".
+        """
+        if mode == "forum":
+            parent, _ = await self.get_or_create_channel(
+                guild=guild, category=category, channel_name=self.FORUM_CHANNEL_NAME, channel_type="forum",
+                overwrites=overwrites, reason=self.PUZZLE_REASON,
+            )
+        elif mode == "meta":
+            parent, _ = await self.get_or_create_channel(
+                guild=guild, category=category, channel_name=self.META_CHANNEL_NAME, channel_type="text",
+                overwrites=overwrites, reason=self.PUZZLE_REASON,
+            )
+        else:
+            raise ValueError(f"Unrecognized discord_puzzle_threads setting: {mode}, should be meta or forum")
+
+        thread = self.channels(guild).find(parent, discord.ChannelType.public_thread, thread_name)
+        if thread:
+            return (thread, False)
+        logger.info(f"Creating a new thread: {thread_name} in {parent.name} for category: {category}")
+        if mode == "forum":
+            # forum posts need a starting message, the welcome message is sent afterwards
+            thread = (await parent.create_thread(
+                name=thread_name, content=f"Puzzle: {thread_name}", auto_archive_duration=10080, reason=self.PUZZLE_REASON,
+            )).thread
+        else:
+            thread = await parent.create_thread(
+                name=thread_name, type=discord.ChannelType.public_thread, auto_archive_duration=10080,
+                reason=self.PUZZLE_REASON,
+            )
+        self.channels(guild).add(thread)
+        return (thread, True)
+
     async def get_or_create_category(
         self, hunt_settings, guild: discord.Guild, category_name: str
     ):
-            category = discord.utils.get(guild.categories, name=category_name)
+            category = self.channels(guild).category(category_name)
             created = False
             if not category:
                 role = None
@@ -240,6 +366,7 @@ class Puzzles(BaseCog):
                     role = discord.utils.get(guild.roles, id=hunt_settings.role_id)
                 overwrites = self.get_overwrites(guild, role)
                 category = await guild.create_category(category_name, overwrites=overwrites, position=max(len(guild.categories) - 2,0))
+                self.channels(guild).add(category)
                 created = True
             return (category, created)
 
@@ -263,14 +390,15 @@ class Puzzles(BaseCog):
             overwrites = self.get_overwrites(guild, role)
 
         category = await guild.create_category(category_name, overwrites=overwrites, position=max(len(guild.categories) - 2,0))
+        self.channels(guild).add(category)
         text_channel, created_text = await self.get_or_create_channel(
             guild=guild, category=category, channel_name=self.GENERAL_CHANNEL_NAME, overwrites=overwrites, channel_type="text", reason=self.HUNT_REASON
         )
         settings = GuildSettingsDb.get(guild.id)
         solved_category = await guild.create_category(self.get_solved_puzzle_category(hunt_name), overwrites=overwrites, position=max(len(guild.categories) - 2,0))
+        self.channels(guild).add(solved_category)
         settings.category_mapping[solved_category.id] = category.id
 
-
         hs = HuntSettings(
             hunt_name=hunt_name,
             hunt_id=category.id,
@@ -279,37 +407,106 @@ class Puzzles(BaseCog):
         )
         if role:
             hs.role_id=role.id
+        hs.solved_category_ids.append(solved_category.id)
 
-        gsheet_cog = self.bot.get_cog("GoogleSheets")
-        print("google sheets cog:", gsheet_cog)
-        if gsheet_cog is not None:
-            # update google sheet ID
-            nexus_spreadsheet, hunt_folder = await gsheet_cog.create_nexus_spreadsheet(text_channel, hunt_name)
-        hs.drive_nexus_sheet_id = nexus_spreadsheet.id
-        hs.drive_parent_id = hunt_folder["id"]
         # add hunt settings
         settings.hunt_settings[category.id] = hs
         GuildSettingsDb.commit(settings)
         await self.send_initial_hunt_channel_messages(hs, text_channel)
 
+        board_cog = self.bot.get_cog("StatusBoard")
+        if board_cog is not None:
+            board_cog.enable(guild, category.id, text_channel)
+
+        gsheet_cog = self.bot.get_cog("GoogleSheets")
+        if gsheet_cog is not None:
+            # hunt folder and nexus sheet IDs are saved to hunt settings once created
+            gsheet_cog.enqueue_hunt_nexus(text_channel, hs)
+
         return (category, text_channel, True)
 
 
     async def create_puzzle_channel(self, ctx, round_name: str, puzzle_name: str, puzzle_url: Optional[str] = None):
-        """Create new text channel for puzzle, and optionally a voice channel
+        """Create new text channel (or thread) for puzzle
 
         Save puzzle metadata to data_dir, send initial messages to channel, and
         create corresponding Google Sheet if GoogleSheets cog is set up.
         """
-        guild = ctx.guild
+        text_channel, created, puzzle_data, category = await self.setup_puzzle_channel(
+            ctx.guild, round_name, puzzle_name, puzzle_url
+        )
+        if created:
+            message = await ctx.send(
+                f":white_check_mark: I've created a new puzzle channel for {category.mention}: {text_channel.mention}"
+            )
+            gsheet_cog = self.bot.get_cog("GoogleSheets")
+            if gsheet_cog is not None:
+                # spreadsheet is created in the background, and the message above edited once it's ready
+                gsheet_cog.enqueue_puzzle_spreadsheet(puzzle_data, message=message)
+        else:
+            await ctx.send(
+                f"I've found an already existing puzzle channel for {category.mention}: {text_channel.mention}"
+            )
+        return (text_channel, created)
+
+    async def create_puzzle_channels(self, ctx, round_name: str, puzzles: List[Tuple[str, Optional[str]]]):
+        """Create several puzzle channels at once, e.g. when a round unlocks
+
+        Channels are created concurrently, each spreadsheet is queued as a
+        background job as soon as its channel exists, and a single summary
+        message is sent.
+        """
+        semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+        gsheet_cog = self.bot.get_cog("GoogleSheets")
+
+        async def setup(puzzle_name, puzzle_url):
+            async with semaphore:
+                result = await self.setup_puzzle_channel(ctx.guild, round_name, puzzle_name, puzzle_url)
+            text_channel, created_text, puzzle_data, category = result
+            if created_text and gsheet_cog is not None:
+                gsheet_cog.enqueue_puzzle_spreadsheet(puzzle_data)
+            return result
+
+        # The first puzzle on its own, so that channels shared by the puzzles (e.g. the forum channel) exist
+        results = [await asyncio.gather(setup(*puzzles[0]), return_exceptions=True)]
+        results.append(await asyncio.gather(*[setup(*puzzle) for puzzle in puzzles[1:]], return_exceptions=True))
+        results = [result for batch in results for result in batch]
+
+        created, existing, errors = [], [], []
+        for (puzzle_name, _), result in zip(puzzles, results):
+            if isinstance(result, Exception):
+                errors.append(f"{puzzle_name}: {result}")
+                continue
+            text_channel, created_text, puzzle_data, category = result
+            if created_text:
+                created.append(text_channel.mention)
+            else:
+                existing.append(text_channel.mention)
+
+        lines = []
+        if created:
+            lines.append(f":white_check_mark: I've created {len(created)} new puzzle channels: {' '.join(created)}")
+        if existing:
+            lines.append(f"I've found already existing puzzle channels: {' '.join(existing)}")
+        if errors:
+            lines.append(":exclamation: Unable to create:\n" + "\n".join(errors))
+        await ctx.send("\n".join(lines)[:2000])
+
+    async def setup_puzzle_channel(
+        self, guild: discord.Guild, round_name: str, puzzle_name: str, puzzle_url: Optional[str] = None
+    ) -> Tuple[discord.abc.GuildChannel, bool, PuzzleData, discord.CategoryChannel]:
+        """Find or create the puzzle's channel and data, without replying to the command
+
+        Returns (text channel, whether it was created, puzzle data, round category)
+        """
         category_name = self.clean_name(round_name)
-        category = discord.utils.get(guild.categories, name=category_name)
+        category = self.channels(guild).category(category_name)
         if category is None:
             raise ValueError(f"Round {category_name} not found")
 
         settings = GuildSettingsDb.get_cached(guild.id)
         if not category.id in settings.category_mapping:
-            raise ValueError(f"Hunt not found for {category_mapping}")
+            raise ValueError(f"Hunt not found for {category.name}")
         hunt_id = settings.category_mapping[category.id]
         hunt_settings = settings.hunt_settings[hunt_id]
         role = None
@@ -318,9 +515,14 @@ class Puzzles(BaseCog):
         overwrites = self.get_overwrites(guild, role)
 
         channel_name = self.clean_name(puzzle_name)
-        text_channel, created_text = await self.get_or_create_channel(
-            guild=guild, category=category, channel_name=channel_name, overwrites=overwrites, channel_type="text", reason=self.PUZZLE_REASON
-        )
+        if settings.discord_puzzle_threads and channel_name != self.META_CHANNEL_NAME:
+            text_channel, created_text = await self.get_or_create_thread(
+                guild, category, channel_name, settings.discord_puzzle_threads, overwrites=overwrites
+            )
+        else:
+            text_channel, created_text = await self.get_or_create_channel(
+                guild=guild, category=category, channel_name=channel_name, overwrites=overwrites, channel_type="text", reason=self.PUZZLE_REASON
+            )
         if created_text:
             hunt_settings = settings.hunt_settings[hunt_id]
             puzzle_data = PuzzleData(
@@ -350,40 +552,11 @@ class Puzzles(BaseCog):
                 puzzle_data.hunt_url = f"{hunt_url_base}/{prefix}/{p_name}"
             PuzzleJsonDb.commit(puzzle_data)
             await self.send_initial_puzzle_channel_messages(text_channel)
-
-            gsheet_cog = self.bot.get_cog("GoogleSheets")
-            # print("google sheets cog:", gsheet_cog)
-            if gsheet_cog is not None:
-                # update google sheet ID
-                await gsheet_cog.create_puzzle_spreadsheet(text_channel, puzzle_data)
         else:
             puzzle_data = self.get_puzzle_data_from_channel(text_channel)
 
-        created_voice = False
-        if settings.discord_use_voice_channels:
-            voice_channel, created_voice = await self.get_or_create_channel(
-                guild=guild, category=category, channel_name=channel_name, overwrites=overwrites, channel_type="voice", reason=self.PUZZLE_REASON
-            )
-            if created_voice:
-                puzzle_data.voice_channel_id = voice_channel.id
-                PuzzleJsonDb.commit(puzzle_data)
-        created = created_text or created_voice
-        if created:
-            if created_text and created_voice:
-                created_desc = "text and voice"  # I'm sure there's a more elegant way to do this ..
-            elif created_text:
-                created_desc = "text"
-            elif created_voice:
-                created_desc = "voice"
-
-            await ctx.send(
-                f":white_check_mark: I've created new puzzle {created_desc} channels for {category.mention}: {text_channel.mention}"
-            )
-        else:
-            await ctx.send(
-                f"I've found an already existing puzzle channel for {category.mention}: {text_channel.mention}"
-            )
-        return (text_channel, created)
+        # Voice channels are created on demand with !voice, see `voice`
+        return (text_channel, created_text, puzzle_data, category)
 
     async def send_initial_hunt_channel_messages(self, hunt: HuntSettings, channel: discord.TextChannel):
         embed = discord.Embed(
@@ -399,8 +572,8 @@ class Puzzles(BaseCog):
             name="Important Links",
             value=f"""The following are some useful links:
 * Hunt Website: {hunt.hunt_url}
-* Nexus Sheet: {urls.spreadsheet_url(hunt.drive_nexus_sheet_id)}
-* Drive URL: {urls.drive_folder_url(hunt.drive_parent_id)}
+* Nexus Sheet: {urls.spreadsheet_url(hunt.drive_nexus_sheet_id) if hunt.drive_nexus_sheet_id else "(being created)"}
+* Drive URL: {urls.drive_folder_url(hunt.drive_parent_id) if hunt.drive_parent_id else "(being created)"}
 """,
             inline=False,
         )
@@ -426,6 +599,7 @@ class Puzzles(BaseCog):
 • `!doc <url>` will update the Google Drive link
 • `!name <name>` will update the puzle name
 • `!info` will re-post this message
+• `!voice` will create a voice channel for this puzzle, removed again once nobody has used it for a while
 • `!delete` should *only* be used if a channel was mistakenly created.
 • `!type crossword` will mark the type of the puzzle, for others to know
 • `!priority high` will mark the priority of the puzzle, for others to know
@@ -447,7 +621,7 @@ class Puzzles(BaseCog):
         return f"{hunt_name}-{self.SOLVED_PUZZLES_CATEGORY}"
 
 
-    @commands.command()
+    @commands.hybrid_command()
     async def info(self, ctx):
         """*Show discord command help for a puzzle channel*"""
         puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
@@ -459,21 +633,22 @@ class Puzzles(BaseCog):
 
     async def update_puzzle_attr_by_command(self, ctx, attr, value, message=None, reply=True):
         """Common pattern where we want to update a single field in PuzzleData based on command"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        message = message or attr
-        if value:
-            setattr(puzzle_data, attr, value)
-            PuzzleJsonDb.commit(puzzle_data)
-            message = "Updated! " + message
+            message = message or attr
+            if value:
+                setattr(puzzle_data, attr, value)
+                PuzzleJsonDb.commit(puzzle_data)
+                message = "Updated! " + message
 
-        if reply:
-            embed = discord.Embed(description=f"""{message}: {getattr(puzzle_data, attr)}""")
-            await ctx.send(embed=embed)
-        return puzzle_data
+            if reply:
+                embed = discord.Embed(description=f"""{message}: {getattr(puzzle_data, attr)}""")
+                await ctx.send(embed=embed)
+            return puzzle_data
 
     async def send_state(self, channel: discord.TextChannel, puzzle_data: PuzzleData, description=None):
         """Send simple embed showing relevant links"""
@@ -487,7 +662,7 @@ class Puzzles(BaseCog):
         embed.add_field(name="Priority", value=puzzle_data.priority or "?")
         await channel.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command()
     async def link(self, ctx, *, url: Optional[str]):
         """*Show or update link to puzzle*"""
         puzzle_data = await self.update_puzzle_attr_by_command(ctx, "hunt_url", url, reply=False)
@@ -496,7 +671,7 @@ class Puzzles(BaseCog):
                 ctx.channel, puzzle_data, description=":white_check_mark: I've updated:" if url else None
             )
 
-    @commands.command(aliases=["sheet", "drive"])
+    @commands.hybrid_command(aliases=["sheet", "drive"])
     async def doc(self, ctx, *, url: Optional[str]):
         """*Show or update link to google spreadsheet/doc for puzzle*"""
         file_id = None
@@ -511,57 +686,61 @@ class Puzzles(BaseCog):
                 ctx.channel, puzzle_data, description=":white_check_mark: I've updated:" if url else None
             )
 
-    @commands.command(aliases=["notes"])
+    @commands.hybrid_command(aliases=["notes"])
     async def note(self, ctx, *, note: Optional[str]):
         """*Show or add a note about the puzzle*"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        message = "Showing notes left by users!"
-        if note:
-            puzzle_data.notes.append(f"{note} - {ctx.message.jump_url}")
-            PuzzleJsonDb.commit(puzzle_data)
-            message = (
-                f"Added a new note! Use `!erase_note {len(puzzle_data.notes)}` to remove the note if needed. "
-                f"Check `!notes` for the current list of notes."
-            )
+            message = "Showing notes left by users!"
+            if note:
+                # slash commands have no message of their own to link to
+                jump_url = ctx.message.jump_url if ctx.interaction is None else ctx.channel.jump_url
+                puzzle_data.notes.append(f"{note} - {jump_url}")
+                PuzzleJsonDb.commit(puzzle_data)
+                message = (
+                    f"Added a new note! Use `!erase_note {len(puzzle_data.notes)}` to remove the note if needed. "
+                    f"Check `!notes` for the current list of notes."
+                )
 
-        if puzzle_data.notes:
-            embed = discord.Embed(description=f"{message}")
-            embed.add_field(
-                name="Notes",
-                value="\n".join([f"{i+1}: {puzzle_data.notes[i]}" for i in range(len(puzzle_data.notes))])
-            )
-        else:
-            embed = discord.Embed(description="No notes left yet, use `!note my note here` to leave a note")
-        await ctx.send(embed=embed)
+            if puzzle_data.notes:
+                embed = discord.Embed(description=f"{message}")
+                embed.add_field(
+                    name="Notes",
+                    value="\n".join([f"{i+1}: {puzzle_data.notes[i]}" for i in range(len(puzzle_data.notes))])
+                )
+            else:
+                embed = discord.Embed(description="No notes left yet, use `!note my note here` to leave a note")
+            await ctx.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command()
     async def erase_note(self, ctx, note_index: int):
         """*Remove a note by index*"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        if 1 <= note_index <= len(puzzle_data.notes):
-            note = puzzle_data.notes[note_index-1]
-            del puzzle_data.notes[note_index - 1]
-            PuzzleJsonDb.commit(puzzle_data)
-            description = f"Erased note {note_index}: `{note}`"
-        else:
-            description = f"Unable to find note {note_index}"
+            if 1 <= note_index <= len(puzzle_data.notes):
+                note = puzzle_data.notes[note_index-1]
+                del puzzle_data.notes[note_index - 1]
+                PuzzleJsonDb.commit(puzzle_data)
+                description = f"Erased note {note_index}: `{note}`"
+            else:
+                description = f"Unable to find note {note_index}"
 
-        embed = discord.Embed(description=description)
-        embed.add_field(
-            name="Notes",
-            value="\n".join([f"{i+1}, {puzzle_data.notes[i]}" for i in range(len(puzzle_data.notes))])
-        )
-        await ctx.send(embed=embed)
+            embed = discord.Embed(description=description)
+            embed.add_field(
+                name="Notes",
+                value="\n".join([f"{i+1}, {puzzle_data.notes[i]}" for i in range(len(puzzle_data.notes))])
+            )
+            await ctx.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command()
     async def status(self, ctx, *, status: Optional[str]):
         """*Show or update puzzle status, e.g. "extracting"*"""
         puzzle_data = await self.update_puzzle_attr_by_command(ctx, "status", status, reply=False)
@@ -570,7 +749,7 @@ class Puzzles(BaseCog):
                 ctx.channel, puzzle_data, description=":white_check_mark: I've updated:" if status else None
             )
 
-    @commands.command()
+    @commands.hybrid_command()
     async def name(self, ctx, *, name: Optional[str]):
         """*Show or update puzzle name*"""
         if name:
@@ -582,7 +761,7 @@ class Puzzles(BaseCog):
                 ctx.channel, puzzle_data, description=":white_check_mark: I've updated:" if name else None
             )
 
-    @commands.command()
+    @commands.hybrid_command()
     async def type(self, ctx, *, puzzle_type: Optional[str]):
         """*Show or update puzzle type, e.g. "crossword"*"""
         puzzle_data = await self.update_puzzle_attr_by_command(ctx, "puzzle_type", puzzle_type, reply=False)
@@ -591,7 +770,7 @@ class Puzzles(BaseCog):
                 ctx.channel, puzzle_data, description=":white_check_mark: I've updated:" if puzzle_type else None
             )
 
-    @commands.command()
+    @commands.hybrid_command()
     async def priority(self, ctx, *, priority: Optional[str]):
         """*Show or update puzzle priority, one of "low", "medium", "high"*"""
         if priority is not None and priority not in self.PRIORITIES:
@@ -615,121 +794,314 @@ class Puzzles(BaseCog):
     #     embed = discord.Embed(description=f"""Resources: """)
     #     await ctx.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command(aliases=["vc"])
+    async def voice(self, ctx):
+        """*Create a voice channel for the puzzle, deleted again after being empty for a while*"""
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
+            guild = ctx.guild
+            settings = GuildSettingsDb.get_cached(guild.id)
+            if not settings.discord_use_voice_channels:
+                await ctx.send(":exclamation: Voice channels are turned off, see the `discord_use_voice_channels` setting")
+                return
+
+            voice_channel = self.channels(guild).get(puzzle_data.voice_channel_id, discord.ChannelType.voice)
+            if voice_channel is None:
+                hunt_settings = settings.hunt_settings[puzzle_data.hunt_id]
+                role = None
+                if hunt_settings.role_id:
+                    role = discord.utils.get(guild.roles, id=hunt_settings.role_id)
+                voice_channel, _ = await self.get_or_create_channel(
+                    guild=guild, category=ctx.channel.category, channel_name=puzzle_data.name, channel_type="voice",
+                    overwrites=self.get_overwrites(guild, role), reason=self.PUZZLE_REASON,
+                )
+                puzzle_data.voice_channel_id = voice_channel.id
+                PuzzleJsonDb.commit(puzzle_data)
+                self.track_voice_channel(puzzle_data)
+            await ctx.send(
+                f":loud_sound: Join {voice_channel.mention}! It will be removed after "
+                f"{settings.discord_voice_idle_minutes} minutes without anyone in it."
+            )
+
+    def track_voice_channel(self, puzzle: PuzzleData, idle: bool = True):
+        """Remember the puzzle of a voice channel, so it can be reaped once idle"""
+        self.voice_channels[puzzle.voice_channel_id] = (puzzle.guild_id, puzzle.channel_id, puzzle.round_id, puzzle.hunt_id)
+        if idle:
+            self.voice_idle_since[puzzle.voice_channel_id] = time.monotonic()
+
+    def forget_voice_channel(self, voice_channel_id: int):
+        """Stop tracking a deleted voice channel, and clear it from its puzzle"""
+        self.voice_idle_since.pop(voice_channel_id, None)
+        key = self.voice_channels.pop(voice_channel_id, None)
+        if key is None:
+            return
+        guild_id, channel_id, round_id, hunt_id = key
+        try:
+            # re-read, since the puzzle may have been updated since it was tracked
+            puzzle = PuzzleJsonDb.get(guild_id, channel_id, round_id, hunt_id)
+        except MissingPuzzleError:
+            return
+        if puzzle.voice_channel_id == voice_channel_id:
+            puzzle.voice_channel_id = 0
+            PuzzleJsonDb.commit(puzzle)
+
+    async def remove_voice_channel(self, guild: discord.Guild, voice_channel_id: int):
+        """Delete a puzzle's voice channel, unless someone is in it"""
+        voice_channel = self.channels(guild).get(voice_channel_id, discord.ChannelType.voice)
+        if voice_channel is not None:
+            if voice_channel.members:
+                self.voice_idle_since.pop(voice_channel_id, None)
+                return
+            try:
+                await voice_channel.delete(reason=self.VOICE_IDLE_REASON)
+            except discord.NotFound:
+                pass
+        self.forget_voice_channel(voice_channel_id)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if after.channel is not None:
+            self.voice_idle_since.pop(after.channel.id, None)
+        if before.channel is not None and before.channel.id in self.voice_channels and not before.channel.members:
+            self.voice_idle_since[before.channel.id] = time.monotonic()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if channel.id in self.voice_channels:
+            self.forget_voice_channel(channel.id)
+
+    @tasks.loop(seconds=60.0)
+    async def reap_voice_channels(self):
+        """Delete puzzle voice channels which have been empty for `discord_voice_idle_minutes`"""
+        now = time.monotonic()
+        for voice_channel_id, idle_since in list(self.voice_idle_since.items()):
+            key = self.voice_channels.get(voice_channel_id)
+            if key is None:
+                # no longer tracked, e.g. deleted along with its puzzle
+                self.voice_idle_since.pop(voice_channel_id, None)
+                continue
+            guild_id = key[0]
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            idle_minutes = GuildSettingsDb.get_cached(guild_id).discord_voice_idle_minutes
+            if now - idle_since >= idle_minutes * 60:
+                try:
+                    await self.remove_voice_channel(guild, voice_channel_id)
+                except Exception:
+                    logger.exception(f"Unable to remove idle voice channel {voice_channel_id}")
+
+    @reap_voice_channels.before_loop
+    async def before_reaping_voice_channels(self):
+        await self.bot.wait_until_ready()
+        # voice channels left over from before a restart
+        for guild in self.bot.guilds:
+            for puzzle in PuzzleJsonDb.get_all(guild.id):
+                if puzzle.voice_channel_id:
+                    voice_channel = self.channels(guild).get(puzzle.voice_channel_id, discord.ChannelType.voice)
+                    self.track_voice_channel(puzzle, idle=voice_channel is None or not voice_channel.members)
+
+    @commands.hybrid_command()
     async def solve(self, ctx, *, arg):
         """*Mark puzzle as fully solved, after confirmation from HQ*"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        solution = arg.strip().upper()
-        puzzle_data.status = "solved"
-        puzzle_data.solution = solution
-        puzzle_data.solve_time = datetime.datetime.now(tz=pytz.UTC)
-        PuzzleJsonDb.commit(puzzle_data)
+            solution = arg.strip().upper()
+            puzzle_data.status = "solved"
+            puzzle_data.solution = solution
+            puzzle_data.solve_time = datetime.datetime.now(tz=pytz.UTC)
+            PuzzleJsonDb.commit(puzzle_data)
 
-        emoji = self.get_guild_settings_from_ctx(ctx).discord_bot_emoji
-        embed = discord.Embed(
-            description=f"{emoji} :partying_face: Great work! Marked the solution as `{solution}`"
-        )
-        embed.add_field(
-            name="Follow-up",
-            value="If the solution was mistakenly entered, please message `!unsolve`. "
-            "Otherwise, in around 5 minutes, I will automatically archive this "
-            "puzzle channel to #solved-puzzles and archive the Google Spreadsheet",
-        )
-        await ctx.send(embed=embed)
+            emoji = self.get_guild_settings_from_ctx(ctx).discord_bot_emoji
+            embed = discord.Embed(
+                description=f"{emoji} :partying_face: Great work! Marked the solution as `{solution}`"
+            )
+            embed.add_field(
+                name="Follow-up",
+                value="If the solution was mistakenly entered, please message `!unsolve`. "
+                "Otherwise, in around 5 minutes, I will automatically archive this "
+                "puzzle channel to #solved-puzzles and archive the Google Spreadsheet",
+            )
+            await ctx.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command()
     async def unsolve(self, ctx):
         """*Mark an accidentally solved puzzle as not solved*"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        prev_solution = puzzle_data.solution
-        puzzle_data.status = "unsolved"
-        puzzle_data.solution = ""
-        puzzle_data.solve_time = None
-        PuzzleJsonDb.commit(puzzle_data)
+            prev_solution = puzzle_data.solution
+            puzzle_data.status = "unsolved"
+            puzzle_data.solution = ""
+            puzzle_data.solve_time = None
+            PuzzleJsonDb.commit(puzzle_data)
 
-        emoji = self.get_guild_settings_from_ctx(ctx).discord_bot_emoji
-        embed = discord.Embed(
-            description=f"{emoji} Alright, I've unmarked {prev_solution} as the solution. "
-            "You'll get'em next time!"
-        )
-        await ctx.send(embed=embed)
+            emoji = self.get_guild_settings_from_ctx(ctx).discord_bot_emoji
+            embed = discord.Embed(
+                description=f"{emoji} Alright, I've unmarked {prev_solution} as the solution. "
+                "You'll get'em next time!"
+            )
+            await ctx.send(embed=embed)
 
-    @commands.command()
+    @commands.hybrid_command()
     @commands.has_permissions(manage_channels=True)
     async def delete(self, ctx):
         """*(admin) Permanently delete a channel*"""
-        puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
-        if not puzzle_data:
-            await self.send_not_puzzle_channel(ctx)
-            return
+        async with puzzle_locks(ctx.channel.id):
+            puzzle_data = self.get_puzzle_data_from_channel(ctx.channel)
+            if not puzzle_data:
+                await self.send_not_puzzle_channel(ctx)
+                return
 
-        if puzzle_data.solution:
-            raise ValueError("Unable to delete a solved puzzle channel, please contact discord admins if needed")
+            if puzzle_data.solution:
+                raise ValueError("Unable to delete a solved puzzle channel, please contact discord admins if needed")
 
-        channel = ctx.channel
-        category = channel.category
+            channel = ctx.channel
+            category = channel.category
 
-        # TODO: need to confirm deletion first!
+            # TODO: need to confirm deletion first!
 
-        PuzzleJsonDb.delete(puzzle_data)
-        voice_channel = discord.utils.get(
-            ctx.guild.channels, category=category, type=discord.ChannelType.voice, name=channel.name
-        )
-        if voice_channel:
-            await voice_channel.delete(reason=self.DELETE_REASON)
-        # delete text channel last so that errors can be reported
-        await ctx.channel.delete(reason=self.DELETE_REASON)
+            PuzzleJsonDb.delete(puzzle_data)
+            voice_channel = self.channels(ctx.guild).get(puzzle_data.voice_channel_id, discord.ChannelType.voice)
+            if voice_channel:
+                self.forget_voice_channel(voice_channel.id)
+                await voice_channel.delete(reason=self.DELETE_REASON)
+            # delete text channel last so that errors can be reported
+            await ctx.channel.delete(reason=self.DELETE_REASON)
 
-    @commands.command()
+    @commands.hybrid_command()
     @commands.has_permissions(manage_channels=True)
-    async def cleanup(self, ctx):
+    async def cleanup(self, ctx, action: Optional[str] = None):
+        """*(admin) Delete all channels of the hunt: !cleanup, or !cleanup cancel to stop*
+
+        Runs in the background, and resumes if the bot restarts before it is done.
+        """
         if ctx.channel.name != self.GENERAL_CHANNEL_NAME:
             return
 
         hunt_id = ctx.channel.category.id
+        key = self.cleanup_job_key(ctx.guild.id, hunt_id)
+        if action == "cancel":
+            if self.bot.jobs.cancel(key):
+                await ctx.send("Cleanup cancelled, run `!cleanup` again to resume")
+            else:
+                await ctx.send("No cleanup is running for this hunt")
+            return
+
         settings = GuildSettingsDb.get(ctx.guild.id)
         hunt_settings = settings.hunt_settings[hunt_id]
-        puzzles = PuzzleJsonDb.get_all(ctx.guild.id, hunt_id)
-        solved_category_name = self.get_solved_puzzle_category(hunt_settings.hunt_name)
-        rounds = set()
         setattr(hunt_settings, "end_time", datetime.datetime.now(tz=pytz.UTC))
         GuildSettingsDb.commit(settings)
-        for puzzle in puzzles:
-            channel = discord.utils.get(ctx.guild.channels, id=puzzle.channel_id)
-            rounds.add(puzzle.round_id)
-            if channel:
-                await channel.delete(reason=self.CLEANUP_REASON)
-        await ctx.channel.send("Puzzle channels deleted!")
-        for round_id in rounds:
-            category = discord.utils.get(ctx.guild.categories, id=round_id)
-            if category:
-                await category.delete(reason=self.CLEANUP_REASON)
-
-        await ctx.channel.send("Round categories deleted!")
-
-        count=1
-        suffix=""
-        while True:
-            solved_category = discord.utils.get(ctx.guild.categories, name=f"{solved_category_name}{suffix}")
-            if solved_category:
-                await solved_category.delete(reason=self.CLEANUP_REASON)
-                count += 1
-                suffix = f"-{count}"
-            else:
-                break
-        past_hunts_category = discord.utils.get(ctx.guild.categories, id=settings.past_hunts_category_id)
-        await ctx.channel.category.delete(reason=self.CLEANUP_REASON)
-        if past_hunts_category:
-            await ctx.channel.edit(name=hunt_settings.hunt_name, category=past_hunts_category)
-        await ctx.channel.send("Cleanup complete")
+        message = await ctx.send(f"Cleaning up {hunt_settings.hunt_name}..")
+        self.bot.jobs.enqueue("hunt_cleanup", key, {
+            "guild_id": ctx.guild.id,
+            "hunt_id": hunt_id,
+            "channel_id": ctx.channel.id,
+            "message_id": message.id,
+        })
+        gsheet_cog = self.bot.get_cog("GoogleSheets")
+        if gsheet_cog is not None:
+            # trash unused pre-made spreadsheets
+            gsheet_cog.release_sheet_pool(hunt_settings)
+
+    def cleanup_job_key(self, guild_id: int, hunt_id: int) -> str:
+        return f"cleanup-{guild_id}-{hunt_id}"
+
+    async def run_cleanup_job(self, job: Job):
+        # not while the hunt's puzzles are being archived, or a round is being created
+        async with hunt_locks(job.payload["hunt_id"]):
+            await self.cleanup_hunt(job)
+
+    async def cleanup_hunt(self, job: Job):
+        """Delete the hunt's puzzle channels (text and voice), round and solved categories
+
+        Idempotent, so that an interrupted cleanup picks up where it left off.
+        """
+        guild = self.bot.get_guild(job.payload["guild_id"])
+        if guild is None:
+            return
+        hunt_id = job.payload["hunt_id"]
+        settings = GuildSettingsDb.get(guild.id)
+        hunt_settings = settings.hunt_settings[hunt_id]
+        channels = self.channels(guild)
+        general_channel = channels.get(job.payload["channel_id"])
+        progress = ProgressMessage(
+            general_channel.get_partial_message(job.payload["message_id"]) if general_channel else None
+        )
+
+        # Rounds and solved categories are mapped to the hunt, puzzles remember their round
+        puzzles = PuzzleJsonDb.get_all(guild.id, hunt_id)
+        category_ids = {round_id for round_id, mapped_hunt_id in settings.category_mapping.items() if mapped_hunt_id == hunt_id}
+        category_ids.update(puzzle.round_id for puzzle in puzzles)
+        category_ids.update(hunt_settings.solved_category_ids)
+        category_ids.discard(hunt_id)
+        categories = [c for c in map(channels.category_by_id, category_ids) if c]
+
+        channel_ids = {puzzle.channel_id for puzzle in puzzles}
+        channel_ids.update(puzzle.voice_channel_id for puzzle in puzzles if puzzle.voice_channel_id)
+        to_delete = {c.id: c for c in map(channels.get, channel_ids) if c}
+        for category in categories:
+            to_delete.update({c.id: c for c in category.channels})
+        to_delete.pop(job.payload["channel_id"], None)
+        # threads are deleted along with their #meta or forum channel
+        to_delete = {
+            channel_id: channel for channel_id, channel in to_delete.items()
+            if channel.type not in THREAD_TYPES or channel.parent_id not in to_delete
+        }
+
+        await self.delete_channels(
+            list(to_delete.values()), progress, f"Cleaning up {hunt_settings.hunt_name}: deleted {{}}/{len(to_delete)} channels"
+        )
+        await self.delete_channels(
+            categories, progress, f"Cleaning up {hunt_settings.hunt_name}: deleted {{}}/{len(categories)} categories"
+        )
+
+        past_hunts_category = channels.category_by_id(settings.past_hunts_category_id)
+        if general_channel is not None and past_hunts_category and general_channel.category_id != past_hunts_category.id:
+            await general_channel.edit(name=hunt_settings.hunt_name, category=past_hunts_category)
+        hunt_category = channels.category_by_id(hunt_id)
+        if hunt_category:
+            await hunt_category.delete(reason=self.CLEANUP_REASON)
+        await progress.update(
+            f"Cleanup complete: deleted {len(to_delete)} channels and {len(categories)} categories", force=True
+        )
+
+    async def delete_channels(self, channels: List[discord.abc.GuildChannel], progress: ProgressMessage, message: str):
+        """Delete channels with bounded concurrency, discord.py handles per-route rate limits"""
+        semaphore = asyncio.Semaphore(self.CLEANUP_CONCURRENCY)
+        deleted = 0
+
+        async def delete(channel):
+            nonlocal deleted
+            async with semaphore:
+                try:
+                    await channel.delete(reason=self.CLEANUP_REASON)
+                except discord.NotFound:
+                    pass
+                deleted += 1
+                await progress.update(message.format(deleted))
+
+        results = await asyncio.gather(*[delete(channel) for channel in channels], return_exceptions=True)
+        await progress.update(message.format(deleted), force=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+
+    async def give_up_cleanup_job(self, job: Job, error: str):
+        channel = self.bot.get_channel(job.payload["channel_id"])
+        if channel is not None:
+            await channel.send(f":exclamation: Unable to finish cleanup: {error}")
+
     # async def confirm_delete(self, ctx):
     #     ref: https://github.com/stroupbslayen/discord-pretty-help/blob/master/pretty_help/pretty_help.py
     #     embed = discord.Embed(description="Are you sure you wish to delete this channel? All of this channel's contents will be permanently deleted.")
@@ -749,6 +1121,96 @@ class Puzzles(BaseCog):
 
         await ctx.channel.send(f"```json\n{puzzle_data.to_json()}```")
 
+    async def move_channels(self, guild: discord.Guild, channels: List[discord.abc.GuildChannel], category: discord.CategoryChannel):
+        """Move channels to the category with a single bulk channel update, instead of one edit per channel"""
+        try:
+            await self.bot.http.bulk_channel_update(
+                guild.id,
+                [{"id": channel.id, "parent_id": category.id} for channel in channels],
+                reason=self.ARCHIVE_REASON,
+            )
+        except discord.HTTPException:
+            logger.exception(f"Unable to move {len(channels)} channels to {category.name} at once, moving one by one")
+            for channel in channels:
+                if channel.category_id != category.id:
+                    await channel.edit(category=category, reason=self.ARCHIVE_REASON)
+
+    def solved_categories(self, guild: discord.Guild, hunt_id: int) -> List[discord.CategoryChannel]:
+        """The hunt's chain of solved categories which still exist, in order"""
+        channels = self.channels(guild)
+        hunt_settings = GuildSettingsDb.get_cached(guild.id).hunt_settings[hunt_id]
+        solved_ids = list(hunt_settings.solved_category_ids)
+        if not solved_ids:
+            # Hunts created before the chain was stored: pick up existing categories by name, once
+            solved_category_name = self.get_solved_puzzle_category(hunt_settings.hunt_name)
+            count = 1
+            category = channels.category(solved_category_name)
+            while category:
+                solved_ids.append(category.id)
+                count += 1
+                category = channels.category(f"{solved_category_name}-{count}")
+            if solved_ids:
+                # re-read, so that settings committed since they were cached aren't overwritten
+                settings = GuildSettingsDb.get(guild.id)
+                settings.hunt_settings[hunt_id].solved_category_ids = solved_ids
+                GuildSettingsDb.commit(settings)
+        return [c for c in map(channels.category_by_id, solved_ids) if c]
+
+    async def add_solved_category(self, guild: discord.Guild, hunt_id: int) -> discord.CategoryChannel:
+        """Create the next category of the hunt's solved category chain"""
+        hunt_settings = GuildSettingsDb.get_cached(guild.id).hunt_settings[hunt_id]
+        solved_ids = hunt_settings.solved_category_ids
+        solved_category_name = self.get_solved_puzzle_category(hunt_settings.hunt_name)
+        count = len(solved_ids) + 1
+        while True:
+            name = solved_category_name if count == 1 else f"{solved_category_name}-{count}"
+            existing = self.channels(guild).category(name)
+            if existing is None or existing.id not in solved_ids:
+                break
+            count += 1
+        category, _ = await self.get_or_create_category(hunt_settings, guild, name)
+        # re-read after creating the category, e.g. `!round` may have added a round meanwhile
+        settings = GuildSettingsDb.get(guild.id)
+        solved_ids = settings.hunt_settings[hunt_id].solved_category_ids
+        if category.id not in solved_ids:
+            solved_ids.append(category.id)
+        settings.category_mapping[category.id] = hunt_id
+        GuildSettingsDb.commit(settings)
+        return category
+
+    def prepare_solved_category(self, guild: discord.Guild, hunt_id: int, counts: dict):
+        """Create the next solved category in the background once the last one is nearly full
+
+        So that archiving doesn't need to create categories inline.
+        """
+        solved_categories = self.solved_categories(guild, hunt_id)
+        if solved_categories:
+            last_id = solved_categories[-1].id
+            count = max(counts.get(last_id, 0), self.channels(guild).channel_count(last_id))
+            if count < self.MAX_CATEGORY_CHANNELS - self.SOLVED_CATEGORY_HEADROOM:
+                return
+        task = self.solved_category_tasks.get(hunt_id)
+        if task is not None and not task.done():
+            return
+        self.solved_category_tasks[hunt_id] = asyncio.create_task(self.add_solved_category(guild, hunt_id))
+
+    async def fetch_channel(self, guild: discord.Guild, channel_id: int):
+        """Fetch a channel (or thread) missing from the index, None if it can't be fetched"""
+        try:
+            channel = await guild.fetch_channel(channel_id)
+        except discord.HTTPException:
+            logger.warning(f"Unable to fetch channel {channel_id}, skipping it", exc_info=True)
+            return None
+        self.channels(guild).add(channel)
+        return channel
+
+    def reread_puzzle(self, puzzle: PuzzleData) -> Optional[PuzzleData]:
+        """Current data of the puzzle, None if it was deleted"""
+        try:
+            return PuzzleJsonDb.get(puzzle.guild_id, puzzle.channel_id, puzzle.round_id, puzzle.hunt_id)
+        except MissingPuzzleError:
+            return None
+
     async def archive_solved_puzzles(self, guild: discord.Guild) -> List[PuzzleData]:
         """Archive puzzles for which sufficient time has elapsed since solve time
 
@@ -756,9 +1218,6 @@ class Puzzles(BaseCog):
         to start with the text [SOLVED]
         """
         puzzles_to_archive = PuzzleJsonDb.get_solved_puzzles_to_archive(guild.id)
-        settings  = GuildSettingsDb.get_cached(guild.id)
-
-        gsheet_cog = self.bot.get_cog("GoogleSheets")
 
         puzzles_by_hunt = {}
         for puzz in puzzles_to_archive:
@@ -767,43 +1226,79 @@ class Puzzles(BaseCog):
             puzzles_by_hunt[puzz.hunt_id].append(puzz)
 
         for hunt_id, puzzles in puzzles_by_hunt.items():
-            hunt_settings = settings.hunt_settings[int(hunt_id)]
-            solved_category_name = self.get_solved_puzzle_category(hunt_settings.hunt_name)
-
-            count=1
-            suffix=""
-            while True:
-                solved_category, created = await self.get_or_create_category(hunt_settings, guild, f"{solved_category_name}{suffix}")
-                if created:
-                    settings.category_mapping[solved_category.id] = int(hunt_id)
-                    GuildSettingsDb.commit(settings)
-                if len(solved_category.channels) < 50:
-                    break
-                count += 1
-                suffix = f"-{count}"
-
-            if not solved_category:
-                avail_categories = [c.name for c in guild.categories]
-                raise ValueError(
-                    f"{solved_category_name} category does not exist; available categories: {avail_categories}"
-            )
-
-
-            for puzzle in puzzles:
-                channel = discord.utils.get(
-                    guild.channels, type=discord.ChannelType.text, id=puzzle.channel_id
-                )
-                if channel:
-                    await channel.edit(category=solved_category)
+            hunt_id = int(hunt_id)
+            async with hunt_locks(hunt_id):
+                await self.archive_hunt_puzzles(guild, hunt_id, puzzles)
+        return puzzles_to_archive
 
-                if gsheet_cog:
-                    await gsheet_cog.archive_puzzle_spreadsheet(puzzle)
+    async def archive_hunt_puzzles(self, guild: discord.Guild, hunt_id: int, puzzles: List[PuzzleData]):
+        """Move the hunt's solved puzzles to its solved categories (or archive their threads)"""
+        # re-read, puzzles may have been archived (or unsolved) while waiting for the hunt lock
+        puzzles = [
+            puzzle for puzzle in map(self.reread_puzzle, puzzles)
+            if puzzle is not None and puzzle.status == "solved" and puzzle.archive_time is None
+        ]
+        gsheet_cog = self.bot.get_cog("GoogleSheets")
+        channels = []
+        for puzzle in puzzles:
+            channel = self.channels(guild).get(puzzle.channel_id)
+            if channel is None:
+                # e.g. a thread Discord already archived, which isn't indexed after a restart
+                channel = await self.fetch_channel(guild, puzzle.channel_id)
+            channels.append(channel)
+        threads = [channel for channel in channels if channel and channel.type in THREAD_TYPES]
+        channels = [channel for channel in channels if channel and channel.type is discord.ChannelType.text]
+        for thread in threads:
+            # Threads stay where they are, archiving hides them from the channel list
+            try:
+                await thread.edit(archived=True, locked=True, reason=self.ARCHIVE_REASON)
+            except discord.HTTPException:
+                logger.exception(f"Unable to archive puzzle thread {thread.name}")
+
+        # Channel counts including moves whose channel update events haven't arrived yet
+        counts = {}
+
+        def channel_count(category):
+            return max(counts.get(category.id, 0), self.channels(guild).channel_count(category.id))
+
+        solved_categories = [
+            c for c in self.solved_categories(guild, hunt_id)
+            if channel_count(c) < self.MAX_CATEGORY_CHANNELS
+        ]
+        while channels:
+            if not solved_categories:
+                # Normally the next category was already created by prepare_solved_category
+                task = self.solved_category_tasks.get(hunt_id)
+                if task is not None and not task.done():
+                    await asyncio.wait([task])
+                solved_categories = self.solved_categories(guild, hunt_id)[-1:]
+                if not solved_categories or channel_count(solved_categories[0]) >= self.MAX_CATEGORY_CHANNELS:
+                    solved_categories = [await self.add_solved_category(guild, hunt_id)]
+            solved_category = solved_categories.pop(0)
+            # Move as many channels as fit in one request
+            count = channel_count(solved_category)
+            moved = channels[:self.MAX_CATEGORY_CHANNELS - count]
+            await self.move_channels(guild, moved, solved_category)
+            counts[solved_category.id] = count + len(moved)
+            channels = channels[len(moved):]
+        self.prepare_solved_category(guild, hunt_id, counts)
 
+        for puzzle in puzzles:
+            if puzzle.voice_channel_id:
+                await self.remove_voice_channel(guild, puzzle.voice_channel_id)
+            if gsheet_cog:
+                await gsheet_cog.archive_puzzle_spreadsheet(puzzle)
+
+            async with puzzle_locks(puzzle.channel_id):
+                # re-read, the puzzle may have been updated while it was being archived
+                puzzle = self.reread_puzzle(puzzle)
+                if puzzle is None or puzzle.status != "solved":
+                    # unsolved in the meantime, archived again once solved
+                    continue
                 puzzle.archive_time = datetime.datetime.now(tz=pytz.UTC)
                 PuzzleJsonDb.commit(puzzle)
-        return puzzles_to_archive
 
-    @commands.command()
+    @commands.hybrid_command()
     async def archive_solved(self, ctx):
         """*(admin) Archive solved puzzles. Done automatically*
 
@@ -4,25 +4,36 @@ This is a separate cog so that Google Drive integration
 can be easily disabled; simply omit this file.
 """
 
+import asyncio
 import datetime
 import logging
 import string
 import traceback
-from typing import Optional
+from typing import List, Optional, Tuple
 
+from aiogoogle.excs import HTTPError
 import discord
 from discord.ext import commands, tasks
 import gspread_asyncio
-import gspread_formatting
 import pytz
 
 from bot.base_cog import BaseCog
-from bot.utils import urls
-from bot.store import GuildSettingsDb, GuildSettings, MissingPuzzleError, PuzzleData, PuzzleJsonDb
-from bot.utils.gdrive import get_or_create_folder, rename_file
-from bot.utils.gsheet import create_spreadsheet, copy_spreadsheet, get_manager
+from bot.utils import config, urls
+from bot.store import GuildSettingsDb, GuildSettings, HuntSettings, Job, MissingPuzzleError, PuzzleData, PuzzleJsonDb
+from bot.utils import appscript, gdrive, google_auth
+from bot.utils.gdrive import (
+    batch_find_unshared_files, batch_rename_files, batch_share_with_anyone, batch_trash_files,
+    batch_update_spreadsheet, get_or_create_folder, move_file, share_with_anyone,
+)
+from bot.utils.gsheet_pool import POOL_SHEET_TITLE, sheet_pool
+from bot.utils.gsheet import (
+    clear_spreadsheet_requests, create_spreadsheet, copy_spreadsheet, get_manager, quick_links_requests,
+)
 from bot.utils.appscript import create_project, add_javascript
 from bot.utils.gsheet_nexus import update_nexus
+from bot.utils.google_quota import error_message, quota, status_code
+from bot.utils.job_queue import JobRetry
+from bot.utils.keyed_lock import puzzle_locks
 
 logger = logging.getLogger(__name__)
 
@@ -32,144 +43,465 @@ class GoogleSheets(BaseCog):
 
     def __init__(self, bot):
         self.bot = bot
+        # Running spreadsheet pool refills, hunt folder id -> task
+        self.pool_refills = {}
+        # Worksheet ids of starter spreadsheets, starter sheet id -> list of worksheet ids
+        self.starter_tabs = {}
+        bot.jobs.register("hunt_nexus", self.run_hunt_nexus_job, on_give_up=self.give_up_hunt_nexus_job)
+        bot.jobs.register("puzzle_sheet", self.run_puzzle_sheet_job, on_give_up=self.give_up_puzzle_sheet_job)
+        bot.jobs.register("quick_links", self.run_quick_links_job)
+        bot.jobs.register("sheet_pool_release", self.run_sheet_pool_release_job)
+        # Wait a bit so that renames of puzzles archived together go in a single batch request
+        bot.jobs.register_batch("archive_rename", self.run_archive_rename_jobs, delay=10.0)
+        # Keep access tokens fresh in the background, so that Google calls don't wait on a token refresh
+        google_auth.credentials.start_refresh()
         self.refresh_nexus.start()
+        self.refill_sheet_pools.start()
+        self.verify_hunt_sharing.start()
+        if config.puzzle_addons_path:
+            self.refresh_addons.start()
+
+    async def cog_unload(self):
+        self.refresh_nexus.cancel()
+        self.refill_sheet_pools.cancel()
+        self.verify_hunt_sharing.cancel()
+        self.refresh_addons.cancel()
+        for task in self.pool_refills.values():
+            task.cancel()
+        google_auth.credentials.stop_refresh()
+        # Close the pooled HTTP sessions of the shared Google API clients
+        await gdrive.client.close()
+        await appscript.client.close()
 
     def cap_name(self, name):
         """Capitalize name for easy comprehension"""
         return string.capwords(name.replace("-", " "))
 
+    def puzzle_sheet_title(self, puzzle: PuzzleData) -> str:
+        """Title given to the puzzle spreadsheet when it is created"""
+        name = self.cap_name(puzzle.name)
+        if puzzle.name == "meta":
+            # Distinguish metas between different rounds
+            name = f"{name} ({self.cap_name(puzzle.round_name)})"
+        return name
+
     async def create_nexus_spreadsheet(self, text_channel: discord.TextChannel, hunt_name: str):
         guild_id = text_channel.guild.id
         settings = GuildSettingsDb.get(guild_id)
         folder_name = self.cap_name(hunt_name)
         if not settings.drive_parent_id:
             return
-        try:
-            hunt_folder = await get_or_create_folder(
-                name= folder_name, parent_id=settings.drive_parent_id,
-            )
+        hunt_folder = await get_or_create_folder(
+            name= folder_name, parent_id=settings.drive_parent_id,
+        )
 
-            hunt_folder_id = hunt_folder["id"]
-            spreadsheet = await create_spreadsheet(agcm=self.agcm, title="Nexus", folder_id=hunt_folder_id)
-            url = urls.spreadsheet_url(spreadsheet.id)
-            embed = discord.Embed(
-                description=f":ladder: :dog: I've created a spreadsheet for you at {url} Check out the `Quick Links` tab for more info!"
-            )
-            await text_channel.send(embed=embed)
-        except Exception as exc:
-            logger.exception(f"Unable to create nexus spreadsheet for {hunt_name}")
-            await text_channel.send(f":exclamation: Unable to create nexus spreadsheet for {hunt_name}: {exc}")
-            return
+        hunt_folder_id = hunt_folder["id"]
+        # Share the whole hunt folder once, so that spreadsheets created in it
+        # don't each need their own permission call
+        await share_with_anyone(hunt_folder_id)
+        spreadsheet = await create_spreadsheet(agcm=self.agcm, title="Nexus", folder_id=hunt_folder_id, share_anyone=False)
+        url = urls.spreadsheet_url(spreadsheet.id)
+        embed = discord.Embed(
+            description=f":ladder: :dog: I've created a spreadsheet for you at {url} Check out the `Quick Links` tab for more info!"
+        )
+        await text_channel.send(embed=embed)
 
         return (spreadsheet, hunt_folder)
 
+    def enqueue_hunt_nexus(self, text_channel: discord.TextChannel, hunt_settings: HuntSettings):
+        """Create hunt folder and nexus spreadsheet in the background"""
+        guild_id = text_channel.guild.id
+        self.bot.jobs.enqueue(
+            "hunt_nexus",
+            key=f"hunt-nexus-{guild_id}-{hunt_settings.hunt_id}",
+            payload={"guild_id": guild_id, "hunt_id": hunt_settings.hunt_id, "channel_id": text_channel.id},
+        )
 
-    async def create_puzzle_spreadsheet(self, text_channel: discord.TextChannel, puzzle: PuzzleData):
+    async def run_hunt_nexus_job(self, job: Job):
+        guild_id, hunt_id = job.payload["guild_id"], job.payload["hunt_id"]
+        hunt_settings = GuildSettingsDb.get(guild_id).hunt_settings.get(hunt_id)
+        text_channel = self.bot.get_channel(job.payload["channel_id"])
+        if hunt_settings is None or hunt_settings.drive_nexus_sheet_id or text_channel is None:
+            # hunt was cleaned up, or nexus already created
+            return
+        result = await self.create_nexus_spreadsheet(text_channel, hunt_settings.hunt_name)
+        if result is None:
+            return
+        spreadsheet, hunt_folder = result
+        # Re-read settings, which may have been updated in the meantime
+        settings = GuildSettingsDb.get(guild_id)
+        settings.hunt_settings[hunt_id].drive_nexus_sheet_id = spreadsheet.id
+        settings.hunt_settings[hunt_id].drive_parent_id = hunt_folder["id"]
+        GuildSettingsDb.commit(settings)
+
+    async def give_up_hunt_nexus_job(self, job: Job, error: str):
+        text_channel = self.bot.get_channel(job.payload["channel_id"])
+        if text_channel is not None:
+            await text_channel.send(f":exclamation: Unable to create nexus spreadsheet: {error}")
+
+
+    async def create_puzzle_spreadsheet(
+        self, text_channel: discord.TextChannel, puzzle: PuzzleData, job: Optional[Job] = None
+    ) -> Optional[str]:
+        """Create the puzzle's spreadsheet, and return its id
+
+        Args:
+            job: the job running this, whose payload records the spreadsheet once created or claimed,
+                so that a retry continues with it instead of making another one
+        """
+        progress = job.payload if job is not None else {}
         guild_id = text_channel.guild.id
-        name = self.cap_name(puzzle.name)
+        name = self.puzzle_sheet_title(puzzle)
         round_name = self.cap_name(puzzle.round_name)
-        if name == "meta":
-            # Distinguish metas between different rounds
-            name = f"{name} ({round_name})"
 
         settings = GuildSettingsDb.get(guild_id)
         hunt_settings = settings.hunt_settings[puzzle.hunt_id]
         if not hunt_settings.drive_parent_id:
+            if settings.drive_parent_id and self.bot.jobs.pending("hunt_nexus"):
+                raise JobRetry(f"Hunt folder for {hunt_settings.hunt_name} not created yet")
             return
 
-        try:
-            # create drive folder if needed
-            round_folder = await get_or_create_folder(
-                name=round_name, parent_id=hunt_settings.drive_parent_id
-            )
-            round_folder_id = round_folder["id"]
+        # create drive folder if needed
+        round_folder = await get_or_create_folder(
+            name=round_name, parent_id=hunt_settings.drive_parent_id
+        )
+        round_folder_id = round_folder["id"]
 
-            if settings.drive_starter_sheet_id:
-                spreadsheet = await copy_spreadsheet(agcm=self.agcm, source_id=settings.drive_starter_sheet_id, title=name, folder_id=round_folder_id)
-                await self.clear_spreadsheet(spreadsheet)
+        sheet_id = progress.get("sheet_id")
+        if not sheet_id:
+            sheet_id = sheet_pool.claim(hunt_settings.drive_parent_id)
+            if sheet_id:
+                progress.update(sheet_id=sheet_id, sheet_from_pool=True)
             else:
-                spreadsheet = await create_spreadsheet(agcm=self.agcm, title=name, folder_id=round_folder_id)
+                spreadsheet = await self.new_spreadsheet(settings, title=name, folder_id=round_folder_id)
+                sheet_id = spreadsheet.id
+                progress.update(sheet_id=sheet_id, sheet_from_pool=False)
+            if job is not None:
+                self.bot.jobs.save(job)
+            self.schedule_pool_refill(settings, hunt_settings)
+        if progress.get("sheet_from_pool"):
+            # Use a pre-made spreadsheet, only needs to be moved into the round folder
+            try:
+                await move_file(
+                    sheet_id, name=name, add_parent_id=round_folder_id, remove_parent_id=hunt_settings.drive_parent_id
+                )
+            except Exception:
+                # still unused, so give it back instead of leaking it
+                sheet_pool.add(hunt_settings.drive_parent_id, sheet_id)
+                progress.pop("sheet_id")
+                progress.pop("sheet_from_pool")
+                if job is not None:
+                    self.bot.jobs.save(job)
+                raise
+        async with puzzle_locks(puzzle.channel_id):
+            # re-read, so that e.g. a status set while the spreadsheet was being created isn't overwritten
+            try:
+                puzzle = PuzzleJsonDb.get(guild_id, puzzle.channel_id, puzzle.round_id, puzzle.hunt_id)
+            except MissingPuzzleError:
+                return sheet_id
             puzzle.google_folder_id = round_folder_id
-            puzzle.google_sheet_id = spreadsheet.id
+            puzzle.google_sheet_id = sheet_id
             PuzzleJsonDb.commit(puzzle)
 
-            # inform spreadsheet creation
-            puzzle_url = puzzle.hunt_url
-            sheet_url = urls.spreadsheet_url(spreadsheet.id)
-            emoji = GuildSettingsDb.get_cached(guild_id).discord_bot_emoji
-            embed = discord.Embed(
-                description=
-                f"{emoji} I've created a spreadsheet for you at {sheet_url}. "
-                f"Check out the `Quick Links` tab for more info! "
-                # NOTE: This next sentence might be better elsewhere, for now easy enough to add message here.
-                f"I've assumed the puzzle page is {puzzle_url}, use `!link` to update if needed."
-            )
-            await text_channel.send(embed=embed)
+        # add some helpful links
+        self.bot.jobs.enqueue("quick_links", key=f"quick-links-{guild_id}-{puzzle.channel_id}", payload=self.puzzle_payload(puzzle))
+
+        # inform spreadsheet creation
+        puzzle_url = puzzle.hunt_url
+        sheet_url = urls.spreadsheet_url(sheet_id)
+        emoji = GuildSettingsDb.get_cached(guild_id).discord_bot_emoji
+        embed = discord.Embed(
+            description=
+            f"{emoji} I've created a spreadsheet for you at {sheet_url}. "
+            f"Check out the `Quick Links` tab for more info! "
+            # NOTE: This next sentence might be better elsewhere, for now easy enough to add message here.
+            f"I've assumed the puzzle page is {puzzle_url}, use `!link` to update if needed."
+        )
+        await text_channel.send(embed=embed)
 
-            # add some helpful links
-            await self.add_quick_links_worksheet(spreadsheet, puzzle, settings)
+        # add the additional helpers
+        #  proj = await create_project(sheet_id)
+        #  await add_javascript(proj["scriptId"])
 
-            # add the additional helpers
-            #  proj = await create_project(spreadsheet.id)
-            #  await add_javascript(proj["scriptId"])
+        return sheet_id
 
-        except Exception as exc:
-            logger.exception(f"Unable to create spreadsheet for {round_name}/{name}")
-            await text_channel.send(f":exclamation: Unable to create spreadsheet for {round_name}/{name}: {exc}")
-            #  traceback.print_exc()
+    def puzzle_payload(self, puzzle: PuzzleData) -> dict:
+        """Job payload with the ids needed to look up the puzzle again"""
+        return {
+            "guild_id": puzzle.guild_id,
+            "hunt_id": puzzle.hunt_id,
+            "round_id": puzzle.round_id,
+            "channel_id": puzzle.channel_id,
+        }
+
+    def puzzle_from_job(self, job: Job) -> Optional[PuzzleData]:
+        try:
+            return PuzzleJsonDb.get(
+                job.payload["guild_id"], job.payload["channel_id"], job.payload["round_id"], job.payload["hunt_id"]
+            )
+        except MissingPuzzleError:
+            # puzzle was deleted in the meantime
+            return None
+
+    def enqueue_puzzle_spreadsheet(self, puzzle: PuzzleData, message: Optional[discord.Message] = None):
+        """Create puzzle spreadsheet in the background
+
+        Args:
+            message: bot response to the command, which will be edited with the spreadsheet link
+        """
+        payload = self.puzzle_payload(puzzle)
+        if message is not None:
+            payload.update(message_channel_id=message.channel.id, message_id=message.id, message_content=message.content)
+        self.bot.jobs.enqueue("puzzle_sheet", key=f"puzzle-sheet-{puzzle.guild_id}-{puzzle.channel_id}", payload=payload)
+
+    async def run_puzzle_sheet_job(self, job: Job):
+        puzzle = self.puzzle_from_job(job)
+        text_channel = self.bot.get_channel(job.payload["channel_id"])
+        if puzzle is None or text_channel is None or puzzle.google_sheet_id:
+            return
+        sheet_id = await self.create_puzzle_spreadsheet(text_channel, puzzle, job)
+        if sheet_id is None or "message_id" not in job.payload:
             return
 
+        message_channel = self.bot.get_channel(job.payload["message_channel_id"])
+        if message_channel is not None:
+            message = message_channel.get_partial_message(job.payload["message_id"])
+            try:
+                await message.edit(content=f"{job.payload['message_content']} Spreadsheet: <{urls.spreadsheet_url(sheet_id)}>")
+            except discord.HTTPException:
+                logger.exception(f"Unable to update message {job.payload['message_id']} with spreadsheet link")
+
+    async def give_up_puzzle_sheet_job(self, job: Job, error: str):
+        text_channel = self.bot.get_channel(job.payload["channel_id"])
+        if text_channel is not None:
+            await text_channel.send(f":exclamation: Unable to create spreadsheet for {text_channel.mention}: {error}")
+
+    async def run_quick_links_job(self, job: Job):
+        puzzle = self.puzzle_from_job(job)
+        if puzzle is None or not puzzle.google_sheet_id:
+            return
+        settings = GuildSettingsDb.get_cached(puzzle.guild_id)
+        try:
+            await self.add_quick_links_worksheet(puzzle.google_sheet_id, puzzle, settings)
+        except HTTPError as exc:
+            if "already exists" in error_message(exc):
+                # Added by a previous attempt
+                return
+            raise
+
+    async def new_spreadsheet(
+        self, settings: GuildSettings, title: str, folder_id: str
+    ) -> gspread_asyncio.AsyncioGspreadSpreadsheet:
+        """Create a blank puzzle spreadsheet, or a cleared copy of the starter sheet if configured"""
+        # Sharing is inherited from the hunt folder, see `verify_sharing`
+        if settings.drive_starter_sheet_id:
+            spreadsheet = await copy_spreadsheet(
+                agcm=self.agcm, source_id=settings.drive_starter_sheet_id, title=title, folder_id=folder_id, share_anyone=False
+            )
+            try:
+                await self.clear_spreadsheet(spreadsheet.id, settings.drive_starter_sheet_id)
+            except Exception:
+                # Don't leave a half-made copy behind, the retry makes a new one
+                await batch_trash_files([spreadsheet.id])
+                raise
+        else:
+            spreadsheet = await create_spreadsheet(agcm=self.agcm, title=title, folder_id=folder_id, share_anyone=False)
         return spreadsheet
 
-    async def clear_spreadsheet(self, spreadsheet: gspread_asyncio.AsyncioGspreadSpreadsheet):
-        await spreadsheet.add_worksheet("Sheet 1", 1000, 26, index=0)
-
-        body = {
-            "requests": [{
-                "deleteSheet": {
-                    "sheetId": ws.id
-                }
-            } for ws in await spreadsheet.worksheets() if ws.title != "Sheet 1"]
-        }
-
-        await spreadsheet.batch_update(body)
+    def schedule_pool_refill(self, settings: GuildSettings, hunt_settings: HuntSettings):
+        """Top up the hunt's spreadsheet pool in the background, if not already doing so"""
+        folder_id = hunt_settings.drive_parent_id
+        if not folder_id or settings.drive_sheet_pool_size <= 0:
+            return
+        task = self.pool_refills.get(folder_id)
+        if task is not None and not task.done():
+            return
+        self.pool_refills[folder_id] = asyncio.create_task(self.refill_sheet_pool(settings, folder_id))
 
-    def update_cell_row(self, cell_range, row: int, key: str, value: str):
-        """Update key-value row cell contents; row starts from 1"""
-        cell_range[(row - 1) * 2].value = key
-        cell_range[(row - 1) * 2 + 1].value = value
+    async def refill_sheet_pool(self, settings: GuildSettings, folder_id: str):
+        try:
+            while sheet_pool.size(folder_id) < settings.drive_sheet_pool_size:
+                spreadsheet = await self.new_spreadsheet(settings, title=POOL_SHEET_TITLE, folder_id=folder_id)
+                sheet_pool.add(folder_id, spreadsheet.id)
+                logger.info(f"Added spreadsheet {spreadsheet.id} to pool for folder {folder_id}")
+        except Exception:
+            logger.exception(f"Unable to refill spreadsheet pool for folder {folder_id}")
+
+    def release_sheet_pool(self, hunt_settings: HuntSettings):
+        """Trash unused pool spreadsheets of a hunt in the background, e.g. on cleanup"""
+        if not hunt_settings.drive_parent_id:
+            return
+        task = self.pool_refills.pop(hunt_settings.drive_parent_id, None)
+        if task is not None:
+            task.cancel()
+        self.bot.jobs.enqueue("sheet_pool_release", key=f"sheet-pool-release-{hunt_settings.drive_parent_id}", payload={
+            "folder_id": hunt_settings.drive_parent_id,
+            "hunt_name": hunt_settings.hunt_name,
+        })
+
+    async def run_sheet_pool_release_job(self, job: Job):
+        folder_id = job.payload["folder_id"]
+        sheet_ids = sheet_pool.release(folder_id)
+        if not sheet_ids:
+            return
+        try:
+            await batch_trash_files(sheet_ids)
+        except Exception:
+            # keep them in the pool, so that the retry trashes them
+            for sheet_id in sheet_ids:
+                sheet_pool.add(folder_id, sheet_id)
+            raise
+        logger.info(f"Trashed {len(sheet_ids)} unused spreadsheets for {job.payload['hunt_name']}")
+
+    @tasks.loop(minutes=5.0)
+    async def refill_sheet_pools(self):
+        """Periodically make sure that pools of active hunts are full"""
+        for guild in self.bot.guilds:
+            settings = GuildSettingsDb.get_cached(guild.id)
+            for hs in settings.hunt_settings.values():
+                if hs.end_time is None:
+                    self.schedule_pool_refill(settings, hs)
 
-    async def add_quick_links_worksheet(
-        self, spreadsheet: gspread_asyncio.AsyncioGspreadSpreadsheet, puzzle: PuzzleData, settings: GuildSettings
-    ):
-        worksheet = await spreadsheet.add_worksheet(title="Quick Links", rows=10, cols=2)
-        cell_range = await worksheet.range(1, 1, 10, 2)
+    @refill_sheet_pools.before_loop
+    async def before_refilling_sheet_pools(self):
+        await self.bot.wait_until_ready()
 
+    async def starter_sheet_tabs(self, source_id: str, refresh: bool = False) -> List[int]:
+        """Worksheet ids of the starter spreadsheet, which are kept by copies of it"""
+        if refresh or source_id not in self.starter_tabs:
+            agc = await self.agcm.authorize()
+            source = await agc.open_by_key(source_id)
+            self.starter_tabs[source_id] = [ws.id for ws in await source.worksheets()]
+        return self.starter_tabs[source_id]
+
+    async def clear_spreadsheet(self, spreadsheet_id: str, source_id: str):
+        """Replace all worksheets of a copy of the starter sheet with a blank one, in a single request"""
+        sheet_ids = await self.starter_sheet_tabs(source_id)
+        try:
+            await batch_update_spreadsheet(spreadsheet_id, clear_spreadsheet_requests(sheet_ids))
+        except HTTPError as exc:
+            if status_code(exc) != 400:
+                raise
+            # Starter sheet tabs changed since they were cached
+            logger.warning(f"Cached worksheets of {source_id} are stale, refreshing")
+            sheet_ids = await self.starter_sheet_tabs(source_id, refresh=True)
+            await batch_update_spreadsheet(spreadsheet_id, clear_spreadsheet_requests(sheet_ids))
+
+    def quick_links_rows(self, puzzle: PuzzleData, settings: GuildSettings) -> List[Tuple[str, str]]:
         hunt_settings = settings.hunt_settings[puzzle.hunt_id]
-
-        self.update_cell_row(cell_range, 1, "Hunt URL", puzzle.hunt_url)
-        self.update_cell_row(cell_range, 2, "Drive folder", urls.drive_folder_url(puzzle.google_folder_id))
         nexus_url = urls.spreadsheet_url(hunt_settings.drive_nexus_sheet_id) if hunt_settings.drive_nexus_sheet_id else ""
-        self.update_cell_row(cell_range, 3, "Nexus", nexus_url)
         resources_url = urls.spreadsheet_url(settings.drive_resources_id) if settings.drive_resources_id else ""
-        self.update_cell_row(cell_range, 4, "Resources", resources_url)
-        self.update_cell_row(cell_range, 5, "Discord channel mention", puzzle.channel_mention)
-        self.update_cell_row(
-            cell_range, 6, "Reminders", "Please create a new worksheet if you're making large changes (e.g. re-sorting)"
+        return [
+            ("Hunt URL", puzzle.hunt_url),
+            ("Drive folder", urls.drive_folder_url(puzzle.google_folder_id)),
+            ("Nexus", nexus_url),
+            ("Resources", resources_url),
+            ("Discord channel mention", puzzle.channel_mention),
+            ("Reminders", "Please create a new worksheet if you're making large changes (e.g. re-sorting)"),
+            ("", "You can use Ctrl+Alt+M to leave a comment on a cell"),
+        ]
+
+    async def add_quick_links_worksheet(self, spreadsheet_id: str, puzzle: PuzzleData, settings: GuildSettings):
+        """Add the Quick Links worksheet with its contents and formatting in a single batchUpdate"""
+        await batch_update_spreadsheet(spreadsheet_id, quick_links_requests(self.quick_links_rows(puzzle, settings)))
+
+    async def archive_puzzle_spreadsheet(self, puzzle: PuzzleData):
+        """Queue rename of spreadsheet to start with [SOLVED: ..]
+
+        Renames are sent in Drive batch requests by `run_archive_rename_jobs`,
+        so archiving doesn't wait on Google Drive.
+        """
+        if not puzzle.google_sheet_id:
+            return
+        self.bot.jobs.enqueue(
+            "archive_rename",
+            key=f"archive-rename-{puzzle.google_sheet_id}",
+            payload={
+                "sheet_id": puzzle.google_sheet_id,
+                "name": f"[SOLVED: {puzzle.solution}] {self.puzzle_sheet_title(puzzle)}",
+            },
         )
-        self.update_cell_row(cell_range, 7, "", "You can use Ctrl+Alt+M to leave a comment on a cell")
-        await worksheet.update_cells(cell_range)
-
-        # Not async
-        gspread_formatting.set_column_width(worksheet.ws, "B", 1000)
 
-    async def archive_puzzle_spreadsheet(self, puzzle: PuzzleData) -> dict:
-        def archive_puzzle_name(sheet_name):
-            if "SOLVED" in sheet_name:
-                return sheet_name
-            return f"[SOLVED: {puzzle.solution}] {sheet_name}"
+    async def run_archive_rename_jobs(self, jobs: List[Job]) -> List[str]:
+        """Send queued spreadsheet renames as Drive batch requests, returns keys of failed jobs"""
+        statuses = await batch_rename_files({job.payload["sheet_id"]: job.payload["name"] for job in jobs})
+        failed = []
+        for job in jobs:
+            status = statuses.get(job.payload["sheet_id"], 0)
+            if status == 404:
+                logger.error(f"Unable to rename spreadsheet {job.payload['sheet_id']}: not found")
+            elif not 200 <= status < 300:
+                failed.append(job.key)
+        logger.info(f"Renamed {len(jobs) - len(failed)}/{len(jobs)} archived spreadsheets")
+        return failed
+
+    async def verify_sharing(self, guild_id: int, hunt_settings: HuntSettings) -> int:
+        """Share hunt spreadsheets which didn't inherit sharing from the hunt folder, returns number repaired"""
+        if not hunt_settings.drive_parent_id:
+            return 0
+        sheet_ids = [p.google_sheet_id for p in PuzzleJsonDb.get_all(guild_id, hunt_settings.hunt_id) if p.google_sheet_id]
+        if hunt_settings.drive_nexus_sheet_id:
+            sheet_ids.append(hunt_settings.drive_nexus_sheet_id)
+        unshared = await batch_find_unshared_files([hunt_settings.drive_parent_id] + sheet_ids)
+        if not unshared:
+            return 0
+        statuses = await batch_share_with_anyone(unshared)
+        repaired = [file_id for file_id, status in statuses.items() if 200 <= status < 300]
+        logger.warning(f"Shared {len(repaired)}/{len(unshared)} files of {hunt_settings.hunt_name} which weren't shared")
+        return len(repaired)
+
+    @tasks.loop(minutes=30.0)
+    async def verify_hunt_sharing(self):
+        """Periodically repair sharing of spreadsheets of active hunts"""
+        for guild in self.bot.guilds:
+            settings = GuildSettingsDb.get_cached(guild.id)
+            for hs in settings.hunt_settings.values():
+                if hs.end_time is None:
+                    try:
+                        await self.verify_sharing(guild.id, hs)
+                    except Exception:
+                        logger.exception(f"Unable to verify sharing of {hs.hunt_name}")
+
+    @verify_hunt_sharing.before_loop
+    async def before_verifying_hunt_sharing(self):
+        await self.bot.wait_until_ready()
 
-        return await rename_file(puzzle.google_sheet_id, name_lambda=archive_puzzle_name)
+    @tasks.loop(hours=1.0)
+    async def refresh_addons(self):
+        """Pull the puzzle addons source, and redeploy it to existing script projects if it changed"""
+        try:
+            if await appscript.addon_source.refresh():
+                updated = await appscript.update_deployments()
+                logger.info(f"Puzzle addons source changed, redeployed to {updated} script projects")
+        except Exception:
+            logger.exception("Unable to refresh puzzle addons")
+
+    @commands.command()
+    @commands.has_permissions(manage_channels=True)
+    async def google_stats(self, ctx):
+        """*(admin) Show Google API request, throttling and retry counts*"""
+        embed = discord.Embed(description="Google API usage since the bot started")
+        for name, stats in quota.summary().items():
+            embed.add_field(
+                name=name,
+                value=f"requests: {stats.requests}\n"
+                f"throttled: {stats.throttled} ({stats.throttled_seconds:.1f}s)\n"
+                f"429s: {stats.rate_limited}\n"
+                f"5xx/conn errors: {stats.server_errors}\n"
+                f"retries: {stats.retries}\n"
+                f"failures: {stats.failures}",
+            )
+        if not embed.fields:
+            embed.description = "No Google API requests yet"
+        pending, failed = self.bot.jobs.pending(), self.bot.jobs.failed()
+        if pending or failed:
+            embed.add_field(
+                name="background jobs",
+                value=f"pending: {len(pending)}\nfailed: {len(failed)}"
+                + "".join(f"\n`{job.key}`: {job.last_error[:100]}" for job in failed[:5]),
+                inline=False,
+            )
+        await ctx.send(embed=embed)
 
     @tasks.loop(seconds=60.0)
     async def refresh_nexus(self):
@@ -178,8 +510,11 @@ class GoogleSheets(BaseCog):
             settings = GuildSettingsDb.get_cached(guild.id)
             for key, hs in settings.hunt_settings.items():
                 if hs.drive_nexus_sheet_id and hs.end_time is None:
-                    puzzles = PuzzleJsonDb.get_all(guild.id, key)
-                    await update_nexus(agcm=self.agcm, file_id=hs.drive_nexus_sheet_id, puzzles=puzzles)
+                    try:
+                        puzzles = PuzzleJsonDb.get_all(guild.id, key)
+                        await update_nexus(agcm=self.agcm, file_id=hs.drive_nexus_sheet_id, puzzles=puzzles)
+                    except Exception:
+                        logger.exception(f"Unable to update nexus of {hs.hunt_name}")
 
     @refresh_nexus.before_loop
     async def before_refreshing_nexus(self):
@@ -7,8 +7,6 @@ The settings here are unrelated to puzzle_settings.py
 import discord
 from discord.ext import commands
 
-import bot.database as db
-from bot.database.models import Guild
 from bot.utils import get_guild_prefix
 from bot.base_cog import BaseCog
 
@@ -17,11 +15,6 @@ class Settings(BaseCog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_guild_join(self, guild):
-        """Add new guilds to the database"""
-        _ = await db.query_guild(guild.id)
-
     @commands.has_permissions(manage_guild=True)
     @commands.command()
     async def prefix(self, ctx, new_prefix: str = None):
@@ -35,14 +28,10 @@ class Settings(BaseCog):
             await ctx.send(embed=embed)
             return
         embed = discord.Embed(description="Prefix changed")
-        guild = await Guild.get(ctx.guild.id)
-        if guild is None:
-            await Guild.create(id=ctx.guild.id, prefix=new_prefix)
-            self.bot.guild_data[ctx.guild.id] = {"prefix": new_prefix}
-        else:
-            embed.add_field(name="From", value=guild.prefix)
-            await guild.update(prefix=new_prefix).apply()
-            self.bot.guild_data[ctx.guild.id].update({"prefix": new_prefix})
+        embed.add_field(name="From", value=get_guild_prefix(self.bot, ctx.guild.id))
+        # write-through: stored first, so that the prefix in use is never one that wasn't saved
+        await self.bot.prefixes.set(ctx.guild.id, new_prefix)
+        self.bot.guild_data.setdefault(ctx.guild.id, {})["prefix"] = new_prefix
 
         embed.add_field(name="To", value=new_prefix)
         await ctx.channel.send(embed=embed)
@@ -0,0 +1,163 @@
+""" Pinned status board of each hunt's puzzles
+
+The board lists all puzzles of the hunt by round, over as many messages as needed
+(see `bot.utils.puzzle_list`), and is edited in place whenever puzzles change.
+Changes are debounced, and messages whose content didn't change aren't edited.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+from discord.ext import commands
+
+from bot.base_cog import BaseCog
+from bot.store import GuildSettingsDb, PuzzleData, PuzzleJsonDb
+from bot.utils.puzzle_list import embed_digest, listings
+
+logger = logging.getLogger(__name__)
+
+
+class StatusBoard(BaseCog):
+    GENERAL_CHANNEL_NAME = "general"
+    # Seconds to wait after a puzzle change before updating, so that bursts of changes are a single update
+    UPDATE_DELAY = 10.0
+
+    def __init__(self, bot):
+        self.bot = bot
+        # (guild id, hunt id) of boards with pending changes, and their update task
+        self.dirty: Set[Tuple[int, int]] = set()
+        self.updates: Dict[Tuple[int, int], asyncio.Task] = {}
+        # Digest of the embed shown by each board message, message id -> digest
+        self.digests: Dict[int, str] = {}
+        PuzzleJsonDb.add_listener(self.on_puzzle_commit)
+
+    async def cog_unload(self):
+        PuzzleJsonDb.remove_listener(self.on_puzzle_commit)
+        for task in self.updates.values():
+            task.cancel()
+
+    def on_puzzle_commit(self, puzzle: PuzzleData):
+        hunt_settings = GuildSettingsDb.get_cached(puzzle.guild_id).hunt_settings.get(puzzle.hunt_id)
+        if hunt_settings is not None and hunt_settings.status_board_channel_id:
+            self.schedule_update(puzzle.guild_id, puzzle.hunt_id)
+
+    def schedule_update(self, guild_id: int, hunt_id: int):
+        key = (guild_id, hunt_id)
+        self.dirty.add(key)
+        if key not in self.updates:
+            self.updates[key] = asyncio.create_task(self.run_updates(key))
+
+    async def run_updates(self, key: Tuple[int, int]):
+        try:
+            while key in self.dirty:
+                await asyncio.sleep(self.UPDATE_DELAY)
+                # changes made while updating trigger another update
+                self.dirty.discard(key)
+                try:
+                    await self.update_board(*key)
+                except Exception:
+                    logger.exception(f"Unable to update status board of hunt {key[1]}")
+        finally:
+            self.updates.pop(key, None)
+
+    def board_title(self, hunt_name: str) -> str:
+        return f"{hunt_name} puzzles"
+
+    async def update_board(self, guild_id: int, hunt_id: int):
+        """Edit the board messages to show current puzzles, posting (or deleting) messages as pages change"""
+        guild = self.bot.get_guild(guild_id)
+        hunt_settings = GuildSettingsDb.get_cached(guild_id).hunt_settings.get(hunt_id)
+        if guild is None or hunt_settings is None or not hunt_settings.status_board_channel_id:
+            return
+        channel = self.bot.channel_index(guild).get(hunt_settings.status_board_channel_id)
+        if channel is None:
+            return
+
+        title = self.board_title(hunt_settings.hunt_name)
+        embeds = listings.get(guild_id, hunt_id, title=title) or [discord.Embed(title=title, description="No puzzles yet")]
+        message_ids = list(hunt_settings.status_board_message_ids)
+        new_message_ids = await self.show_pages(channel, message_ids, embeds)
+        if new_message_ids != message_ids:
+            settings = GuildSettingsDb.get(guild_id)
+            settings.hunt_settings[hunt_id].status_board_message_ids = new_message_ids
+            GuildSettingsDb.commit(settings)
+
+    async def show_pages(self, channel, message_ids: List[int], embeds: List[discord.Embed]) -> List[int]:
+        """Show an embed per message, returns the ids of the board messages"""
+        new_message_ids = []
+        for index, embed in enumerate(embeds):
+            digest = embed_digest(embed)
+            if index < len(message_ids):
+                message_id = message_ids[index]
+                if self.digests.get(message_id) == digest:
+                    new_message_ids.append(message_id)
+                    continue
+                try:
+                    await channel.get_partial_message(message_id).edit(content=None, embed=embed)
+                    self.digests[message_id] = digest
+                    new_message_ids.append(message_id)
+                    continue
+                except discord.NotFound:
+                    # someone deleted the message, repost the remaining pages so they stay in order
+                    await self.delete_messages(channel, message_ids[index + 1:])
+                    message_ids = message_ids[:index]
+            message = await channel.send(embed=embed)
+            self.digests[message.id] = digest
+            new_message_ids.append(message.id)
+            try:
+                await message.pin(reason="Puzzle status board")
+            except discord.HTTPException:
+                logger.warning(f"Unable to pin status board message in {channel.name}")
+        await self.delete_messages(channel, message_ids[len(embeds):])
+        return new_message_ids
+
+    async def delete_messages(self, channel, message_ids: List[int]):
+        for message_id in message_ids:
+            self.digests.pop(message_id, None)
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
+
+    def enable(self, guild: discord.Guild, hunt_id: int, channel: discord.abc.GuildChannel):
+        """Post the hunt's board to the channel, replacing a board posted elsewhere"""
+        settings = GuildSettingsDb.get(guild.id)
+        hunt_settings = settings.hunt_settings[hunt_id]
+        if hunt_settings.status_board_channel_id != channel.id:
+            hunt_settings.status_board_channel_id = channel.id
+            hunt_settings.status_board_message_ids = []
+            GuildSettingsDb.commit(settings)
+        self.schedule_update(guild.id, hunt_id)
+
+    @commands.command()
+    @commands.has_permissions(manage_channels=True)
+    async def board(self, ctx, action: Optional[str] = None):
+        """*(admin) Pin a status board of the hunt's puzzles here: !board, or !board off*
+
+        Posted in the #general channel of the hunt, and kept up to date as puzzles change.
+        """
+        if ctx.channel.name != self.GENERAL_CHANNEL_NAME:
+            return
+        hunt_id = ctx.channel.category.id
+        settings = GuildSettingsDb.get(ctx.guild.id)
+        hunt_settings = settings.hunt_settings.get(hunt_id)
+        if hunt_settings is None:
+            raise ValueError(f"Hunt not found for {ctx.channel.category.name}")
+
+        if action == "off":
+            channel = self.bot.channel_index(ctx.guild).get(hunt_settings.status_board_channel_id)
+            if channel is not None:
+                await self.delete_messages(channel, hunt_settings.status_board_message_ids)
+            hunt_settings.status_board_channel_id = 0
+            hunt_settings.status_board_message_ids = []
+            GuildSettingsDb.commit(settings)
+            await ctx.send("Status board removed")
+            return
+
+        self.enable(ctx.guild, hunt_id, ctx.channel)
+        await ctx.send(f":white_check_mark: Status board will be posted in {ctx.channel.mention} shortly")
+
+
+async def setup(bot):
+    await bot.add_cog(StatusBoard(bot))
@@ -7,6 +7,7 @@ from discord.ext import commands
 
 from bot import utils
 from bot.base_cog import BaseCog
+from bot.utils.keyed_lock import hunt_locks, puzzle_locks
 
 PY_VERSION = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
 
@@ -89,6 +90,61 @@ class Utility(BaseCog):
         embed.set_footer(text=":ladder: :dog:", icon_url=self.bot.user.avatar_url)
         await ctx.send(embed=embed)
 
+    @commands.command()
+    @commands.has_permissions(manage_channels=True)
+    async def loop_stats(self, ctx):
+        """*(admin) Show event loop lag and the calls that blocked it*"""
+        monitor = self.bot.loop_monitor
+        histogram = monitor.histogram
+        embed = discord.Embed(description="Event loop lag since the bot started")
+        if histogram.samples:
+            embed.add_field(
+                name="lag",
+                value=f"mean: {histogram.total / histogram.samples * 1000:.1f}ms\n"
+                f"max: {histogram.max * 1000:.0f}ms\n"
+                f"samples: {histogram.samples}",
+            )
+            embed.add_field(
+                name="histogram",
+                value="\n".join(f"{label}: {count}" for label, count in histogram.buckets()),
+            )
+        blocking = monitor.locations.most_common(5)
+        if blocking:
+            embed.add_field(
+                name=f"blocking calls (>{monitor.threshold * 1000:.0f}ms)",
+                value="\n".join(f"{count}x `{location}`" for location, count in blocking)[:1024],
+                inline=False,
+            )
+        lock_stats = [(locks.name, locks.stats) for locks in (puzzle_locks, hunt_locks) if locks.stats.acquired]
+        if lock_stats:
+            embed.add_field(
+                name="lock waits",
+                value="\n".join(
+                    f"{name}: {stats.contended}/{stats.acquired} waited, "
+                    f"total {stats.total_wait:.1f}s, max {stats.max_wait * 1000:.0f}ms"
+                    for name, stats in lock_stats
+                ),
+                inline=False,
+            )
+        if monitor.stalls:
+            embed.add_field(
+                name="recent stalls",
+                value="\n".join(
+                    f"{datetime.fromtimestamp(stall.started):%H:%M:%S} {stall.duration:.2f}s `{stall.location}`"
+                    for stall in list(monitor.stalls)[-5:]
+                )[:1024],
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(manage_guild=True)
+    async def sync(self, ctx):
+        """*(admin) Register slash commands with discord for this server*"""
+        self.bot.tree.copy_global_to(guild=ctx.guild)
+        synced = await self.bot.tree.sync(guild=ctx.guild)
+        await ctx.send(f"Synced {len(synced)} slash commands")
+
     @commands.command(aliases=["socials", "links", "support"])
     async def invite(self, ctx):
         """*Shows invite link and other socials for the bot*
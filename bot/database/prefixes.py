@@ -0,0 +1,96 @@
+"""
+Storage of the guilds' command prefixes, set with `!prefix`
+
+Prefixes are loaded once at startup into `bot.guild_data`, which `get_prefix` reads
+for every message, and written through to the store when changed. The store is
+picked from the `database` url: Postgres via gino, or SQLite (e.g.
+`sqlite:///data/guilds.sqlite3`) with the same `guilds` table, which needs no
+database server and is handy for development and tests. Without a `database`,
+prefixes are only kept in memory.
+"""
+import asyncio
+import sqlite3
+from contextlib import closing
+from typing import Dict, Optional
+
+from bot.database import query_guild, setup, shutdown
+from bot.database.models import Guild
+
+SQLITE_SCHEME = "sqlite:///"
+
+
+class PrefixStore:
+    async def setup(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def load_all(self) -> Dict[int, str]:
+        """Prefix of each guild which has set one"""
+        pass
+
+    async def set(self, guild_id: int, prefix: str):
+        """Save the guild's prefix"""
+        pass
+
+
+class MemoryPrefixStore(PrefixStore):
+    """Used without a database, prefixes set with `!prefix` only last until the bot restarts"""
+    async def load_all(self) -> Dict[int, str]:
+        return {}
+
+    async def set(self, guild_id: int, prefix: str):
+        pass
+
+
+class GinoPrefixStore(PrefixStore):
+    async def setup(self):
+        await setup()
+
+    async def close(self):
+        await shutdown()
+
+    async def load_all(self) -> Dict[int, str]:
+        guilds = await Guild.query.gino.all()
+        return {guild.id: guild.prefix for guild in guilds if guild.prefix}
+
+    async def set(self, guild_id: int, prefix: str):
+        guild = await query_guild(guild_id)
+        await guild.update(prefix=prefix).apply()
+
+
+class SqlitePrefixStore(PrefixStore):
+    def __init__(self, path: str):
+        self.path = path
+
+    async def run(self, func, *args):
+        # sqlite3 is blocking, keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def execute(self, sql: str, params=()):
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            return connection.execute(sql, params).fetchall()
+
+    async def setup(self):
+        await self.run(self.execute, f"CREATE TABLE IF NOT EXISTS {Guild.__tablename__} (id BIGINT PRIMARY KEY, prefix TEXT)")
+
+    async def load_all(self) -> Dict[int, str]:
+        rows = await self.run(self.execute, f"SELECT id, prefix FROM {Guild.__tablename__} WHERE prefix IS NOT NULL")
+        return dict(rows)
+
+    async def set(self, guild_id: int, prefix: str):
+        await self.run(
+            self.execute,
+            f"INSERT INTO {Guild.__tablename__} (id, prefix) VALUES (?, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET prefix = excluded.prefix",
+            (guild_id, prefix),
+        )
+
+
+def prefix_store(url: Optional[str]) -> PrefixStore:
+    if not url:
+        return MemoryPrefixStore()
+    if url.startswith(SQLITE_SCHEME):
+        return SqlitePrefixStore(url[len(SQLITE_SCHEME):])
+    return GinoPrefixStore()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Google side of `!p` and of the nexus refresh against the fake Google server
+
+Runs the GoogleSheets cog's background jobs for new puzzles, and `update_nexus`,
+against `bot.utils.fake_google` (no credentials or network needed), and reports
+wall time and the number of Google API calls per operation.
+
+python -m bot.scripts.gdrive.benchmark --puzzles 20 --latency 0.1 [--pool-size 5] [--starter-sheet]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+
+class BenchmarkChannel:
+    """Stands in for the puzzle text channel, which the cog only sends messages to"""
+    def __init__(self, channel_id: int, guild_id: int):
+        self.id = channel_id
+        self.guild = SimpleNamespace(id=guild_id)
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class BenchmarkBot:
+    """Stands in for the discord bot: never becomes ready, so the cog's periodic loops stay idle"""
+    def __init__(self, jobs, guild_id: int):
+        self.jobs = jobs
+        self.guilds = []
+        self.guild_id = guild_id
+        self._ready = asyncio.Event()
+
+    def get_channel(self, channel_id: int) -> BenchmarkChannel:
+        return BenchmarkChannel(channel_id, self.guild_id)
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
+
+
+def summarize(name: str, durations: list, calls: Counter, count: int):
+    print(f"\n{name}: {count} runs")
+    print(
+        f"  wall time per run: mean {statistics.mean(durations):.3f}s, "
+        f"median {statistics.median(durations):.3f}s, max {max(durations):.3f}s"
+    )
+    print(f"  Google API calls per run: {sum(calls.values()) / count:.1f}")
+    for operation, num_calls in sorted(calls.items()):
+        print(f"    {operation}: {num_calls / count:.1f}")
+
+
+async def main(args):
+    # Imported here, after changing to the scratch directory, since config.json is read on import
+    from bot.store import GuildSettings, GuildSettingsDb, HuntSettings, Job, PuzzleData, PuzzleJsonDb
+    from bot.store.fs import FileJobDb
+    from bot.utils import config
+    from bot.utils.fake_google import FakeGoogle, write_service_account_file
+    from bot.utils.job_queue import JobQueue
+
+    fake = FakeGoogle(latency=args.latency, rate_limit_probability=args.rate_limit_probability, seed=0)
+    await fake.start()
+    write_service_account_file(Path("google_secrets.json"), fake.token_uri)
+    config.google_api_url = fake.url
+    PuzzleJsonDb.dir_path = GuildSettingsDb.dir_path = Path("data")
+
+    from bot.cogs.puzzles_gsheet import GoogleSheets
+    from bot.utils import appscript, gdrive
+    from bot.utils.google_quota import quota
+    from bot.utils.gsheet_nexus import update_nexus
+
+    if args.unthrottled:
+        quota.limits = {group: (1000.0, 1000) for group in quota.limits}
+
+    guild_id, hunt_id = 1, 2
+    root = await gdrive.create_folder("Puzzle hunts")
+    settings = GuildSettings(guild_id=guild_id, drive_parent_id=root["id"], drive_sheet_pool_size=args.pool_size)
+    if args.starter_sheet:
+        starter = fake.create_file({}, {"name": "Starter", "mimeType": "application/vnd.google-apps.spreadsheet"})
+        fake.batch_update(starter["id"], {}, {"requests": [
+            {"addSheet": {"properties": {"title": title}}} for title in ("Notes", "Scratch")
+        ]})
+        settings.drive_starter_sheet_id = starter["id"]
+    settings.hunt_settings[hunt_id] = HuntSettings(hunt_id=hunt_id, guild_id=guild_id, hunt_name="Benchmark Hunt", hunt_url="https://hunt")
+    GuildSettingsDb.commit(settings)
+
+    bot = BenchmarkBot(JobQueue(FileJobDb(dir_path=Path("data") / "jobs")), guild_id)
+    cog = GoogleSheets(bot)
+    try:
+        calls = fake.calls.copy()
+        start = time.perf_counter()
+        await cog.run_hunt_nexus_job(Job(key="nexus", kind="hunt_nexus", payload={
+            "guild_id": guild_id, "hunt_id": hunt_id, "channel_id": 100,
+        }))
+        summarize("Create hunt folder and nexus", [time.perf_counter() - start], fake.calls - calls, 1)
+        settings = GuildSettingsDb.get(guild_id)
+        hunt_settings = settings.hunt_settings[hunt_id]
+
+        if args.pool_size:
+            await cog.refill_sheet_pool(settings, hunt_settings.drive_parent_id)
+
+        durations = []
+        calls = fake.calls.copy()
+        puzzles = []
+        for index in range(args.puzzles):
+            puzzle = PuzzleData(
+                name=f"puzzle-{index}", hunt_id=hunt_id, hunt_name=hunt_settings.hunt_name,
+                round_name=f"round-{index % 3}", round_id=10 + index % 3, guild_id=guild_id,
+                channel_mention=f"<#{1000 + index}>", channel_id=1000 + index, hunt_url=f"https://hunt/puzzle/{index}",
+            )
+            PuzzleJsonDb.commit(puzzle)
+            payload = cog.puzzle_payload(puzzle)
+            start = time.perf_counter()
+            # The Google work of `!p`: create the spreadsheet, then add the quick links
+            await cog.run_puzzle_sheet_job(Job(key=f"sheet-{index}", kind="puzzle_sheet", payload=payload))
+            await cog.run_quick_links_job(Job(key=f"links-{index}", kind="quick_links", payload=payload))
+            durations.append(time.perf_counter() - start)
+            # Pool refills are triggered by new puzzles, but not part of the command's latency
+            refills = [task for task in cog.pool_refills.values() if not task.done()]
+            calls_before_refill = fake.calls.copy()
+            await asyncio.gather(*refills)
+            calls += fake.calls - calls_before_refill
+            puzzles.append(puzzle)
+        summarize("New puzzle spreadsheet (!p)", durations, fake.calls - calls, args.puzzles)
+
+        durations = []
+        calls = fake.calls.copy()
+        puzzles = PuzzleJsonDb.get_all(guild_id, hunt_id)
+        for _ in range(args.refreshes):
+            start = time.perf_counter()
+            await update_nexus(agcm=cog.agcm, file_id=hunt_settings.drive_nexus_sheet_id, puzzles=puzzles)
+            durations.append(time.perf_counter() - start)
+        summarize(f"Nexus refresh ({len(puzzles)} puzzles)", durations, fake.calls - calls, args.refreshes)
+
+        print(f"\nHTTP requests: {fake.http_requests}, injected/quota 429s: {fake.rate_limited}")
+        for name, stats in quota.summary().items():
+            print(f"  {name}: {stats}")
+    finally:
+        await cog.cog_unload()
+        await gdrive.client.close()
+        await appscript.client.close()
+        await fake.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--puzzles", type=int, default=20, help="Number of puzzles to create")
+    parser.add_argument("--refreshes", type=int, default=5, help="Number of nexus refreshes")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds of latency per Google API request")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Chance of a 429 per request")
+    parser.add_argument("--pool-size", type=int, default=0, help="drive_sheet_pool_size guild setting")
+    parser.add_argument("--starter-sheet", action="store_true", help="Copy a starter spreadsheet for new puzzles")
+    parser.add_argument("--unthrottled", action="store_true", help="Disable client-side rate limiting")
+    args = parser.parse_args()
+
+    # Run in a scratch directory, so that credentials, caches and puzzle data don't touch the real ones
+    sys.path.insert(0, os.getcwd())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        asyncio.run(main(args))
@@ -6,8 +6,17 @@ python -m bot.scripts.gdrive.create_folder --name [..] --parent [ID]
 """
 import asyncio
 
+from bot.utils import gdrive
 from bot.utils.gdrive import get_or_create_folder
 
+
+async def main(args):
+    try:
+        return await get_or_create_folder(args.name, args.parent)
+    finally:
+        await gdrive.client.close()
+
+
 if __name__ == "__main__":
     # Find or create a new folder
     import argparse
@@ -16,5 +25,5 @@ if __name__ == "__main__":
     parser.add_argument("--parent", required=True, help="ID of folder in which to create this folder")
     args = parser.parse_args()
 
-    result = asyncio.run(get_or_create_folder(args.name, args.parent), debug=True)
+    result = asyncio.run(main(args), debug=True)
     print(result)
@@ -6,8 +6,17 @@ python -m bot.scripts.gdrive.rename_file --id [ID] --name [..]
 """
 import asyncio
 
+from bot.utils import gdrive
 from bot.utils.gdrive import rename_file
 
+
+async def main(args):
+    try:
+        return await rename_file(args.id, lambda x: args.name)
+    finally:
+        await gdrive.client.close()
+
+
 if __name__ == "__main__":
     # Find or create a new folder
     import argparse
@@ -16,5 +25,5 @@ if __name__ == "__main__":
     parser.add_argument("--name", required=True, help="New name of file")
     args = parser.parse_args()
 
-    result = asyncio.run(rename_file(args.id, lambda x: args.name), debug=True)
+    result = asyncio.run(main(args), debug=True)
     print(result)
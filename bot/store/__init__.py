@@ -3,7 +3,8 @@ from pathlib import Path
 
 from .puzzle_settings import GuildSettings, HuntSettings, _GuildSettingsDb
 from .puzzle_data import PuzzleData, _PuzzleJsonDb, MissingPuzzleError
-from .fs import FilePuzzleJsonDb, FileGuildSettingsDb
+from .jobs import Job, _JobDb
+from .fs import FilePuzzleJsonDb, FileGuildSettingsDb, FileJobDb
 
 from bot.utils import config
 
@@ -15,6 +16,8 @@ if "LADDER_SPOT_DATA_DIR" in os.environ:
 
 PuzzleJsonDb = _PuzzleJsonDb
 GuildSettingsDb = _GuildSettingsDb
+JobDb = _JobDb()
 if config.storage == 'fs':
     PuzzleJsonDb = FilePuzzleJsonDb(dir_path=DATA_DIR)
     GuildSettingsDb = FileGuildSettingsDb(dir_path=DATA_DIR)
+    JobDb = FileJobDb(dir_path=DATA_DIR / "jobs")
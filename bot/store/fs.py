@@ -3,15 +3,17 @@ import errno
 import json
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import pytz
-from .puzzle_data import _PuzzleJsonDb, PuzzleData
+from .jobs import _JobDb, Job
+from .puzzle_data import _PuzzleJsonDb, PuzzleData, MissingPuzzleError
 from .puzzle_settings import _GuildSettingsDb, GuildSettings
 
 logger = logging.getLogger(__name__)
 class FilePuzzleJsonDb(_PuzzleJsonDb):
     def __init__(self, dir_path: Path):
+        super().__init__()
         self.dir_path = dir_path
 
     def puzzle_path(self, puzzle, round_id=None, hunt_id=None, guild_id=None) -> Path:
@@ -46,6 +48,7 @@ class FilePuzzleJsonDb(_PuzzleJsonDb):
         puzzle_path.parent.mkdir(exist_ok=True)
         with puzzle_path.open("w") as fp:
             fp.write(puzzle_data.to_json(indent=4))
+        self.notify(puzzle_data)
 
     def delete(self, puzzle_data):
         puzzle_path = self.puzzle_path(puzzle_data)
@@ -53,6 +56,7 @@ class FilePuzzleJsonDb(_PuzzleJsonDb):
             puzzle_path.unlink()
         except IOError:
             pass
+        self.notify(puzzle_data)
 
     def get(self, guild_id, puzzle_id, round_id, hunt_id) -> PuzzleData:
         try:
@@ -140,3 +144,41 @@ class FileGuildSettingsDb():
         with settings_path.open("w") as fp:
             fp.write(settings.to_json(indent=4))
         self.cached_settings[settings.guild_id] = settings
+
+
+class FileJobDb(_JobDb):
+    def __init__(self, dir_path: Path):
+        self.dir_path = dir_path
+
+    def job_path(self, key: str) -> Path:
+        # Job keys are built from ASCII ids, e.g. `puzzle-sheet-{guild_id}-{channel_id}`
+        return (self.dir_path / key).with_suffix(".json")
+
+    def commit(self, job: Job):
+        job_path = self.job_path(job.key)
+        job_path.parent.mkdir(parents=True, exist_ok=True)
+        with job_path.open("w") as fp:
+            fp.write(job.to_json(indent=4))
+
+    def delete(self, job: Job):
+        try:
+            self.job_path(job.key).unlink()
+        except IOError:
+            pass
+
+    def get(self, key: str) -> Optional[Job]:
+        job_path = self.job_path(key)
+        if not job_path.exists():
+            return None
+        with job_path.open() as fp:
+            return Job.from_json(fp.read())
+
+    def get_all(self) -> List[Job]:
+        jobs = []
+        for path in sorted(self.dir_path.glob("*.json")):
+            try:
+                with path.open() as fp:
+                    jobs.append(Job.from_json(fp.read()))
+            except Exception:
+                logger.exception(f"Unable to load job from {path}")
+        return jobs
@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+from dataclasses_json import dataclass_json
+import datetime
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass_json
+@dataclass
+class Job:
+    """Background job, e.g. creating the Google spreadsheet for a new puzzle
+
+    The key is unique per job, so enqueueing the same work twice is a no-op.
+    """
+    key: str
+    kind: str
+    payload: dict = field(default_factory=dict)
+    status: str = "pending"  # pending / failed
+    attempts: int = 0
+    last_error: str = ""
+    created_time: Optional[datetime.datetime] = None
+    next_attempt_time: Optional[datetime.datetime] = None
+
+
+class _JobDb:
+    """Job store for storage backends without persisted jobs
+
+    Jobs then only live in the queue's memory and are lost on restart.
+    """
+    def commit(self, job: Job):
+        pass
+    def delete(self, job: Job):
+        pass
+    def get(self, key: str) -> Optional[Job]:
+        pass
+    def get_all(self) -> List[Job]:
+        return []
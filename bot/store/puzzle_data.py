@@ -3,7 +3,7 @@ from dataclasses_json import dataclass_json
 from google.cloud import datastore
 import datetime
 import logging
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +16,12 @@ class MissingPuzzleError(RuntimeError):
 class PuzzleData:
     name: str
     hunt_name: str=""
-    hunt_id: str = 0
+    hunt_id: int = 0
     round_name: str = ""
     round_id: int = 0  # round = category channel
     guild_id: int = 0
     #  guild_name: str = ""
-    channel_id: int = 0
+    channel_id: int = 0  # text channel id, or thread id if the puzzle is a thread
     channel_mention: str = ""
     voice_channel_id: int = 0
     hunt_url: str = ""
@@ -108,6 +108,31 @@ class PuzzleData:
         return sorted(puzzles, key=lambda p: (round_start_times.get(p.round_name, 0), p.start_time or 0))
 
 class _PuzzleJsonDb:
+    def __init__(self):
+        # Called with the puzzle data after each commit or delete
+        self.listeners: List[Callable[[PuzzleData], None]] = []
+        # Number of changes per (guild id, hunt id), to know when data derived from a hunt's puzzles is stale
+        self.versions: Dict[Tuple[int, int], int] = {}
+
+    def add_listener(self, listener: Callable[[PuzzleData], None]):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[PuzzleData], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def version(self, guild_id, hunt_id) -> int:
+        return self.versions.get((guild_id, hunt_id), 0)
+
+    def notify(self, puzzle_data):
+        key = (puzzle_data.guild_id, puzzle_data.hunt_id)
+        self.versions[key] = self.versions.get(key, 0) + 1
+        for listener in self.listeners:
+            try:
+                listener(puzzle_data)
+            except Exception:
+                logger.exception(f"Puzzle listener {listener} failed for {puzzle_data.name}")
+
     def commit(self, puzzle_data):
         pass
     def delete(self, puzzle_data):
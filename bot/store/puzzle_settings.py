@@ -20,6 +20,9 @@ class HuntSettings:
     role_id: int = 0
     end_time: Optional[datetime.datetime] = None             # End time of the hunt
     start_time: Optional[datetime.datetime] = None           # Start time of the hunt
+    solved_category_ids: List[int] = field(default_factory=list)  # Chain of solved puzzle categories, in order
+    status_board_channel_id: int = 0  # Channel of the pinned status board, 0 if disabled
+    status_board_message_ids: List[int] = field(default_factory=list)  # Status board messages, one per page
 
     def to_entity(self, client: datastore.Client):
         key = client.key('Hunt', self.hunt_id, 'Guild', self.guild_id)
@@ -32,6 +35,9 @@ class HuntSettings:
         entity['role_id'] = self.role_id
         entity['start_time'] = self.start_time
         entity['end_time'] = self.end_time
+        entity['solved_category_ids'] = self.solved_category_ids
+        entity['status_board_channel_id'] = self.status_board_channel_id
+        entity['status_board_message_ids'] = self.status_board_message_ids
         return entity
 
     @classmethod
@@ -48,6 +54,9 @@ class HuntSettings:
         hunt.role_id = entity['role_id']
         hunt.start_time = entity['start_time']
         hunt.end_time = entity['end_time']
+        hunt.solved_category_ids = list(entity.get('solved_category_ids', []))
+        hunt.status_board_channel_id = entity.get('status_board_channel_id', 0)
+        hunt.status_board_message_ids = list(entity.get('status_board_message_ids', []))
         return hunt
 
 
@@ -59,13 +68,16 @@ class GuildSettings:
     guild_name: str = ""
     discord_bot_channel: str = ""   # Channel to listen for bot commands
     discord_bot_emoji: str = ":ladder: :dog:"  # Short description string or emoji for bot messages
-    discord_use_voice_channels: bool = False  # Whether to create voice channels for puzzles
+    discord_use_voice_channels: bool = False  # Whether puzzle voice channels can be created, via !voice
+    discord_voice_idle_minutes: int = 30  # Delete puzzle voice channels after being empty this long
     drive_parent_id: str = ""
     drive_resources_id: str = ""    # Document with resources links, etc
     hunt_settings: Dict[int, HuntSettings] = field(default_factory=dict)
     category_mapping: Dict[int, int] = field(default_factory=dict)
     past_hunts_category_id: int = 0
     drive_starter_sheet_id: str = ""
+    drive_sheet_pool_size: int = 0   # Number of spreadsheets to prepare ahead of time per hunt
+    discord_puzzle_threads: str = ""  # "meta" or "forum" to create puzzles as threads instead of channels
 
     def to_entity(self, client: datastore.Client):
         key = client.key('Guild', self.guild_id)
@@ -74,10 +86,13 @@ class GuildSettings:
         entity['discord_bot_channel'] = self.discord_bot_channel
         entity['discord_bot_emoji'] = self.discord_bot_emoji
         entity['discord_use_voice_channels'] = self.discord_use_voice_channels
+        entity['discord_voice_idle_minutes'] = self.discord_voice_idle_minutes
         entity['drive_parent_id'] = self.drive_parent_id
         entity['drive_resources_id'] = self.drive_resources_id
         entity['past_hunts_category_id'] = self.past_hunts_category_id
         entity['sheet_tempalte_id'] = self.drive_starter_sheet_id
+        entity['drive_sheet_pool_size'] = self.drive_sheet_pool_size
+        entity['discord_puzzle_threads'] = self.discord_puzzle_threads
         return entity
 
     @classmethod
@@ -89,10 +104,13 @@ class GuildSettings:
         guild.discord_bot_channel = entity['discord_bot_channel']
         guild.discord_bot_emoji = entity['discord_bot_emoji']
         guild.discord_use_voice_channels = entity['discord_use_voice_channels']
+        guild.discord_voice_idle_minutes = entity.get('discord_voice_idle_minutes', 30)
         guild.drive_parent_id = entity['drive_parent_id']
         guild.drive_resources_id = entity['drive_resources_id']
         guild.past_hunts_category_id = entity['past_hunts_category_id']
         guild.puzzle_template_id = entity['drive_starter_sheet_id']
+        guild.drive_sheet_pool_size = entity.get('drive_sheet_pool_size', 0)
+        guild.discord_puzzle_threads = entity.get('discord_puzzle_threads', "")
 
         return guild
 
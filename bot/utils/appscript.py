@@ -1,61 +1,144 @@
+import asyncio
+import hashlib
 import json
 from pathlib import Path
 
-from typing import Optional
+from typing import Dict, Optional
 from git import Repo
-from google.oauth2.service_account import Credentials
-from aiogoogle import Aiogoogle
-from aiogoogle.auth.creds import ServiceAccountCreds
 
 from . import config
+from .google_api import GoogleApiClient
+from .google_auth import SCRIPT_SCOPES
 
-creds = ServiceAccountCreds(
-    scopes=["https://www.googleapis.com/auth/script.projects"],
-    subject=config.owner_email,
-    **json.load(open("google_secrets.json")),
-)
+# Shared client, reuses a single HTTP session and the cached discovery document
+client = GoogleApiClient(SCRIPT_SCOPES, subject=config.owner_email)
 
 async def create_project(parent_id: str) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        scripts = await aiogoogle.discover("script", "v1")
-        payload = {"title": "Puzzle Utils", "parentId": parent_id}
-        result = await aiogoogle.as_service_account(
-            scripts.projects.create(json=payload)
-        )
+    scripts = await client.discover("script", "v1")
+    payload = {"title": "Puzzle Utils", "parentId": parent_id}
+    result = await client.as_service_account(
+        scripts.projects.create(json=payload)
+    )
     return result
 
-async def add_javascript(script_id: str) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        scripts = await aiogoogle.discover("script", "v1")
-        content = await aiogoogle.as_service_account(
-            scripts.projects.getContent(
-                scriptId=script_id,
-            )
-        )
-        payload = {"files": content["files"] }
-        files.append({
-            "name": "Code",
-            "type": "SERVER_JS",
-            "source": get_puzzle_addons_source(),
-        })
-        result = await aiogoogle.as_service_account(
-            scripts.projects.updateContent(
-                scriptId=script_id,
-                json=payload,
-            )
+
+# Manifest for projects which don't have one yet, projects' own manifests are kept when deploying
+DEFAULT_MANIFEST = {
+    "name": "appsscript",
+    "type": "JSON",
+    "source": json.dumps({"timeZone": "America/New_York", "exceptionLogging": "STACKDRIVER", "runtimeVersion": "V8"}),
+}
+
+
+class AddonSource:
+    """Puzzle addons Apps Script source, read once and identified by a content hash
+
+    `refresh` pulls the addons repo in a worker thread, so nothing on the command
+    path waits on git.
+    """
+    def __init__(self, path: Optional[str], filename: str = "Main.gs"):
+        self.path = Path(path) if path else None
+        self.filename = filename
+        self._source: Optional[str] = None
+        self.hash = ""
+
+    @property
+    def source(self) -> str:
+        if self._source is None:
+            self.load()
+        return self._source
+
+    def load(self) -> bool:
+        """Re-read source from disk, returns whether it changed"""
+        source = ""
+        if self.path is not None:
+            with open(self.path / self.filename, "r") as file:
+                source = file.read()
+        changed = source != self._source
+        self._source = source
+        self.hash = hashlib.sha256(source.encode()).hexdigest()
+        return changed
+
+    def pull(self):
+        Repo(self.path).remotes.origin.pull()
+
+    async def refresh(self) -> bool:
+        """Pull latest source in the background, returns whether it changed"""
+        if self.path is None:
+            return False
+        await asyncio.get_running_loop().run_in_executor(None, self.pull)
+        return self.load()
+
+
+class Deployments:
+    """Persistent script id -> hash of the addon source last deployed to it"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.hashes: Optional[Dict[str, str]] = None
+
+    def load(self) -> Dict[str, str]:
+        if self.hashes is None:
+            self.hashes = {}
+            if self.path.exists():
+                with self.path.open() as fp:
+                    self.hashes = json.load(fp)
+        return self.hashes
+
+    def get(self, script_id: str) -> Optional[str]:
+        return self.load().get(script_id)
+
+    def set(self, script_id: str, source_hash: str):
+        self.load()[script_id] = source_hash
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w") as fp:
+            json.dump(self.hashes, fp, indent=4)
+
+
+addon_source = AddonSource(config.puzzle_addons_path)
+deployments = Deployments(Path(config.google_cache_dir) / "appscript_deployments.json")
+
+
+async def add_javascript(script_id: str) -> Optional[dict]:
+    """Deploy the puzzle addons source to a project, unless it already has the current version"""
+    source = addon_source.source
+    if deployments.get(script_id) == addon_source.hash:
+        return None
+    scripts = await client.discover("script", "v1")
+    # updateContent replaces the whole project, so keep its other files (and manifest) as they are
+    content = await client.as_service_account(scripts.projects.getContent(scriptId=script_id))
+    files = [
+        {"name": f["name"], "type": f["type"], "source": f["source"]}
+        for f in content.get("files", []) if f["name"] != "Code"
+    ]
+    if not any(f["name"] == DEFAULT_MANIFEST["name"] for f in files):
+        files.insert(0, DEFAULT_MANIFEST)
+    files.append({
+        "name": "Code",
+        "type": "SERVER_JS",
+        "source": source,
+    })
+    payload = {"files": files}
+    result = await client.as_service_account(
+        scripts.projects.updateContent(
+            scriptId=script_id,
+            json=payload,
         )
+    )
+    deployments.set(script_id, addon_source.hash)
     return result
 
-def get_puzzle_addons_source(filename="Main.gs") -> str:
-    if not config.puzzle_addons_path:
-        return ""
 
-    repo = Repo(config.puzzle_addons_path)
-    repo.remotes.origin.pull()
-    with open(Path(config.puzzle_addons_path) / filename, "r") as file:
-        data = file.read()
-    return data
+async def update_deployments() -> int:
+    """Redeploy to all projects which have an outdated version of the source, returns number updated"""
+    updated = 0
+    for script_id in list(deployments.load()):
+        if await add_javascript(script_id) is not None:
+            updated += 1
+    return updated
 
 
+def get_puzzle_addons_source(filename="Main.gs") -> str:
+    """Cached source, see `AddonSource.refresh` to pull the latest version"""
+    if filename != addon_source.filename:
+        return AddonSource(config.puzzle_addons_path, filename).source
+    return addon_source.source
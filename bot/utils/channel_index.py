@@ -0,0 +1,142 @@
+"""
+Per-guild index of channels and categories
+
+`discord.utils.get(guild.channels, ...)` scans every channel of the guild, which
+adds up for hunts with hundreds of puzzle channels (e.g. one scan per puzzle in
+`!cleanup`). Instead channels are indexed by id and by (category id, type, name),
+built from the guild's channels on first use and kept up to date from the
+`on_guild_channel_create/update/delete` events. Threads are indexed too, by
+(parent channel id, type, name), from the `on_thread_*` events. The number of channels in each
+category is tracked too, e.g. to know when a solved category is nearly full.
+"""
+import logging
+from collections import Counter
+from typing import Dict, Hashable, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+ChannelKey = Tuple[Optional[int], discord.ChannelType, str]
+
+
+THREAD_TYPES = (discord.ChannelType.public_thread, discord.ChannelType.private_thread, discord.ChannelType.news_thread)
+
+
+def channel_key(channel) -> ChannelKey:
+    if channel.type in THREAD_TYPES:
+        return (channel.parent_id, channel.type, channel.name)
+    return (channel.category_id, channel.type, channel.name)
+
+
+class GuildChannelIndex:
+    def __init__(self, channels=()):
+        self.by_id: Dict[int, discord.abc.GuildChannel] = {}
+        self.by_key: Dict[ChannelKey, discord.abc.GuildChannel] = {}
+        # Key each channel is indexed under, since channel objects are updated in place
+        self.keys: Dict[int, ChannelKey] = {}
+        # Number of channels per category id
+        self.counts: Counter = Counter()
+        for channel in channels:
+            self.add(channel)
+
+    def add(self, channel):
+        """Index a channel, also used after creating a channel so it is found before its create event"""
+        if channel.id in self.keys:
+            self.remove(channel)
+        key = channel_key(channel)
+        self.by_id[channel.id] = channel
+        self.keys[channel.id] = key
+        if key[0] is not None:
+            self.counts[key[0]] += 1
+        # Like discord.utils.get, duplicate names resolve to one of the channels
+        self.by_key.setdefault(key, channel)
+
+    def remove(self, channel):
+        self.by_id.pop(channel.id, None)
+        key = self.keys.pop(channel.id, None)
+        if key is not None and key[0] is not None:
+            self.counts[key[0]] -= 1
+        if key is not None and self.by_key.get(key) is not None and self.by_key[key].id == channel.id:
+            del self.by_key[key]
+            # fall back to another channel with the same name, if any
+            for other_id, other_key in self.keys.items():
+                if other_key == key:
+                    self.by_key[key] = self.by_id[other_id]
+                    break
+
+    def get(self, channel_id: int, channel_type: Optional[discord.ChannelType] = None):
+        channel = self.by_id.get(channel_id)
+        if channel is not None and channel_type is not None and channel.type != channel_type:
+            return None
+        return channel
+
+    def find(self, category, channel_type: discord.ChannelType, name: str):
+        """Channel by name within a category (or outside of categories if category is None)
+
+        For threads, category is the parent channel instead.
+        """
+        category_id = category.id if category is not None else None
+        return self.by_key.get((category_id, channel_type, name))
+
+    def category(self, name: str) -> Optional[discord.CategoryChannel]:
+        return self.by_key.get((None, discord.ChannelType.category, name))
+
+    def category_by_id(self, category_id: int) -> Optional[discord.CategoryChannel]:
+        return self.get(category_id, discord.ChannelType.category)
+
+    def channel_count(self, category_id: int) -> int:
+        """Number of channels in the category, without scanning guild channels like category.channels"""
+        return self.counts[category_id]
+
+
+class ChannelIndex:
+    """Channel indexes of all guilds, the event listeners are registered on the bot"""
+    def __init__(self):
+        self.guilds: Dict[Hashable, GuildChannelIndex] = {}
+
+    def __call__(self, guild: discord.Guild) -> GuildChannelIndex:
+        if guild.id not in self.guilds:
+            # guild.threads only has active threads, archived ones are added once seen
+            self.guilds[guild.id] = GuildChannelIndex(list(guild.channels) + list(guild.threads))
+        return self.guilds[guild.id]
+
+    async def on_guild_channel_create(self, channel):
+        if channel.guild.id in self.guilds:
+            self.guilds[channel.guild.id].add(channel)
+
+    async def on_guild_channel_update(self, before, after):
+        if after.guild.id in self.guilds:
+            self.guilds[after.guild.id].add(after)
+
+    async def on_guild_channel_delete(self, channel):
+        if channel.guild.id in self.guilds:
+            self.guilds[channel.guild.id].remove(channel)
+
+    async def on_thread_create(self, thread):
+        await self.on_guild_channel_create(thread)
+
+    async def on_thread_join(self, thread):
+        # also dispatched for threads the bot didn't have cached, e.g. unarchived threads
+        await self.on_guild_channel_create(thread)
+
+    async def on_thread_update(self, before, after):
+        await self.on_guild_channel_update(before, after)
+
+    async def on_thread_delete(self, thread):
+        await self.on_guild_channel_delete(thread)
+
+    async def on_guild_available(self, guild):
+        # rebuilt on next use, e.g. after reconnecting
+        self.guilds.pop(guild.id, None)
+
+    async def on_guild_remove(self, guild):
+        self.guilds.pop(guild.id, None)
+
+    def register(self, bot):
+        for listener in (
+            self.on_guild_channel_create, self.on_guild_channel_update, self.on_guild_channel_delete,
+            self.on_thread_create, self.on_thread_join, self.on_thread_update, self.on_thread_delete,
+            self.on_guild_available, self.on_guild_remove,
+        ):
+            bot.add_listener(listener)
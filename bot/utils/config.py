@@ -4,8 +4,9 @@ import os
 default_config = {
     "discord_bot_token": "",
     "prefix": "!",
-    "database": "postgresql://localhost/postgres",
     "storage": "fs",
+    "google_cache_dir": ".google_cache",
+    "loop_lag_threshold_ms": 250,
 }
 
 class Config:
@@ -23,8 +24,14 @@ class Config:
         self.owner_email = self.config.get("owner_email", None)
         self.storage = self.config.get("storage", default_config.get("storage"))
         self.puzzle_addons_path = self.config.get("puzzle_addons_path", None)
+        self.google_cache_dir = self.config.get("google_cache_dir", default_config.get("google_cache_dir"))
+        # Send Google API requests to another server, e.g. bot.utils.fake_google for offline testing
+        self.google_api_url = self.config.get("google_api_url", None)
+        # Event loop stalls longer than this are logged with the blocking stack
+        self.loop_lag_threshold_ms = self.config.get("loop_lag_threshold_ms", default_config.get("loop_lag_threshold_ms"))
         if not self.database:
-            self.database = self.config.get("database", default_config.get("database"))
+            # optional, only needed to keep prefixes set with `!prefix`
+            self.database = self.config.get("database")
 
     def store(self):
         data = {"prefix": self.prefix, "discord_bot_token": self.token, "database": self.database}
@@ -0,0 +1,600 @@
+"""
+In-process fake of the subset of Google Drive v3, Sheets v4 and Apps Script v1 used by the bot
+
+Used by tests and `bot/scripts/gdrive/benchmark.py` to exercise the Google
+integration offline. Start a `FakeGoogle` server, write credentials pointing at
+its token endpoint with `write_service_account_file`, and set
+`config.google_api_url` to its url: `GoogleApiClient` and the gspread client
+manager then send all *.googleapis.com requests to it.
+
+Latency, per-minute quotas and random 429 responses can be configured to see how
+the bot behaves under throttling. Every request is counted in `calls`, keyed by
+operation, e.g. "drive.files.create".
+"""
+import asyncio
+import copy
+import datetime
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+SPREADSHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+
+QuotaGroup = Tuple[str, str]
+Result = Tuple[int, Optional[dict]]
+
+
+def _method(http_method: str, path: str, params: Dict[str, dict], order: List[str]) -> dict:
+    return {
+        "httpMethod": http_method,
+        "path": path,
+        "parameters": {
+            name: dict(location="path" if name in order else "query", type="string", required=name in order, **spec)
+            for name, spec in params.items()
+        },
+        "parameterOrder": order,
+    }
+
+
+def discovery_document(api_name: str, api_version: str) -> Optional[dict]:
+    """Minimal discovery document for the methods the bot uses"""
+    global_parameters = {name: {"type": "string", "location": "query"} for name in ("fields", "alt", "key")}
+    file_id = {"fileId": {}}
+    if (api_name, api_version) == ("drive", "v3"):
+        query = {name: {} for name in ("q", "spaces", "fields", "orderBy", "pageSize", "pageToken")}
+        return {
+            "name": "drive", "version": "v3",
+            "rootUrl": "https://www.googleapis.com/", "servicePath": "drive/v3/", "batchPath": "batch/drive/v3",
+            "parameters": global_parameters,
+            "schemas": {},
+            "resources": {
+                "files": {"methods": {
+                    "list": _method("GET", "files", query, []),
+                    "create": _method("POST", "files", {}, []),
+                    "get": _method("GET", "files/{fileId}", file_id, ["fileId"]),
+                    "update": _method(
+                        "PATCH", "files/{fileId}", dict(file_id, addParents={}, removeParents={}), ["fileId"]
+                    ),
+                    "copy": _method("POST", "files/{fileId}/copy", file_id, ["fileId"]),
+                    "delete": _method("DELETE", "files/{fileId}", file_id, ["fileId"]),
+                }},
+                "permissions": {"methods": {
+                    "list": _method("GET", "files/{fileId}/permissions", file_id, ["fileId"]),
+                    "create": _method("POST", "files/{fileId}/permissions", file_id, ["fileId"]),
+                }},
+            },
+        }
+    if (api_name, api_version) == ("sheets", "v4"):
+        spreadsheet_id = {"spreadsheetId": {}}
+        return {
+            "name": "sheets", "version": "v4",
+            "rootUrl": "https://sheets.googleapis.com/", "servicePath": "", "batchPath": "batch",
+            "parameters": global_parameters,
+            "schemas": {},
+            "resources": {
+                "spreadsheets": {"methods": {
+                    "create": _method("POST", "v4/spreadsheets", {}, []),
+                    "get": _method("GET", "v4/spreadsheets/{spreadsheetId}", spreadsheet_id, ["spreadsheetId"]),
+                    "batchUpdate": _method(
+                        "POST", "v4/spreadsheets/{spreadsheetId}:batchUpdate", spreadsheet_id, ["spreadsheetId"]
+                    ),
+                }},
+            },
+        }
+    if (api_name, api_version) == ("script", "v1"):
+        script_id = {"scriptId": {}}
+        return {
+            "name": "script", "version": "v1",
+            "rootUrl": "https://script.googleapis.com/", "servicePath": "", "batchPath": "batch",
+            "parameters": global_parameters,
+            "schemas": {},
+            "resources": {
+                "projects": {"methods": {
+                    "create": _method("POST", "v1/projects", {}, []),
+                    "getContent": _method("GET", "v1/projects/{scriptId}/content", script_id, ["scriptId"]),
+                    "updateContent": _method("PUT", "v1/projects/{scriptId}/content", script_id, ["scriptId"]),
+                }},
+            },
+        }
+    return None
+
+
+def write_service_account_file(path: Path, token_uri: str):
+    """Write service account credentials, with a throwaway private key, that authenticate against `token_uri`"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    with Path(path).open("w") as fp:
+        json.dump({
+            "type": "service_account",
+            "project_id": "fake",
+            "private_key_id": "fake",
+            "private_key": private_key,
+            "client_email": "bot@fake.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": token_uri,
+        }, fp)
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def parse_a1_range(a1: str) -> Tuple[Optional[str], int, int]:
+    """Sheet title (if any) and 0-based row, column of the top left cell of an A1 range"""
+    title = None
+    if "!" in a1:
+        title, a1 = a1.rsplit("!", 1)
+        title = title.strip("'")
+    match = re.match(r"([A-Za-z]*)(\d*)", a1.split(":")[0])
+    col = _column_index(match.group(1)) if match.group(1) else 0
+    row = int(match.group(2)) - 1 if match.group(2) else 0
+    return title, row, col
+
+
+class GoogleError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+    def body(self) -> dict:
+        return {"error": {"code": self.status, "message": self.message}}
+
+
+class FakeGoogle:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        quotas: Optional[Dict[QuotaGroup, int]] = None,
+        rate_limit_probability: float = 0.0,
+        inherit_permissions: bool = True,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            latency: seconds added to every HTTP request
+            quotas: maximum requests per minute for quota groups, e.g. {("sheets", "write"): 60}
+            rate_limit_probability: chance of failing any request with a 429
+            inherit_permissions: whether files get the permissions of their parent folders
+        """
+        self.latency = latency
+        self.quotas = quotas or {}
+        self.rate_limit_probability = rate_limit_probability
+        self.inherit_permissions = inherit_permissions
+        self.random = random.Random(seed)
+
+        self.files: Dict[str, dict] = {}
+        self.spreadsheets: Dict[str, dict] = {}
+        self.projects: Dict[str, dict] = {}
+
+        # operation -> number of calls, batched calls are counted individually
+        self.calls: Counter = Counter()
+        # number of HTTP requests received, a batch request is a single HTTP request
+        self.http_requests = 0
+        self.rate_limited = 0
+        self._quota_windows: Dict[QuotaGroup, Deque[float]] = defaultdict(deque)
+
+        self._routes = [
+            ("GET", r"/drive/v3/files", "drive.files.list", self.list_files),
+            ("POST", r"/drive/v3/files", "drive.files.create", self.create_file),
+            ("GET", r"/drive/v3/files/([^/]+)", "drive.files.get", self.get_file),
+            ("PATCH", r"/drive/v3/files/([^/]+)", "drive.files.update", self.update_file),
+            ("DELETE", r"/drive/v3/files/([^/]+)", "drive.files.delete", self.delete_file),
+            ("POST", r"/drive/v3/files/([^/]+)/copy", "drive.files.copy", self.copy_file),
+            ("GET", r"/drive/v3/files/([^/]+)/comments", "drive.comments.list", self.list_comments),
+            ("GET", r"/drive/v3/files/([^/]+)/permissions", "drive.permissions.list", self.list_permissions),
+            ("POST", r"/drive/v3/files/([^/]+)/permissions", "drive.permissions.create", self.create_permission),
+            ("POST", r"/v4/spreadsheets", "sheets.spreadsheets.create", self.create_spreadsheet),
+            ("GET", r"/v4/spreadsheets/([^/:]+)", "sheets.spreadsheets.get", self.get_spreadsheet),
+            ("POST", r"/v4/spreadsheets/([^/:]+):batchUpdate", "sheets.spreadsheets.batchUpdate", self.batch_update),
+            ("PUT", r"/v4/spreadsheets/([^/:]+)/values/(.+)", "sheets.values.update", self.update_values),
+            ("GET", r"/v4/spreadsheets/([^/:]+)/values/(.+)", "sheets.values.get", self.get_values),
+            ("POST", r"/v1/projects", "script.projects.create", self.create_project),
+            ("GET", r"/v1/projects/([^/]+)/content", "script.projects.getContent", self.get_content),
+            ("PUT", r"/v1/projects/([^/]+)/content", "script.projects.updateContent", self.update_content),
+        ]
+
+        self.app = web.Application()
+        self.app.router.add_route("*", "/{path:.*}", self.handle)
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @property
+    def token_uri(self) -> str:
+        return f"{self.url}/token"
+
+    # --- HTTP plumbing ---
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        if path == "/token":
+            self.calls["oauth2.token"] += 1
+            return web.json_response({"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+        match = re.fullmatch(r"/discovery/v1/apis/([^/]+)/([^/]+)/rest", path)
+        if match:
+            document = discovery_document(*match.groups())
+            if document is None:
+                return web.json_response(GoogleError(404, "Unknown API").body(), status=404)
+            return web.json_response(document)
+
+        self.http_requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = await request.read()
+
+        if path.startswith("/batch/"):
+            return await self.handle_batch(request.headers.get("Content-Type", ""), body.decode())
+
+        status, payload = self.dispatch(request.method, path, dict(request.query), body)
+        return web.json_response(payload, status=status)
+
+    def quota_group(self, method: str, path: str) -> QuotaGroup:
+        if path.startswith("/v4/"):
+            api = "sheets"
+        elif path.startswith("/v1/projects"):
+            api = "script"
+        else:
+            api = "drive"
+        return (api, "read" if method == "GET" else "write")
+
+    def check_quota(self, method: str, path: str):
+        if self.rate_limit_probability and self.random.random() < self.rate_limit_probability:
+            self.rate_limited += 1
+            raise GoogleError(429, "Rate limit exceeded (injected)")
+        group = self.quota_group(method, path)
+        limit = self.quotas.get(group)
+        if limit is None:
+            return
+        window = self._quota_windows[group]
+        now = time.monotonic()
+        while window and now - window[0] > 60:
+            window.popleft()
+        if len(window) >= limit:
+            self.rate_limited += 1
+            raise GoogleError(429, f"Quota exceeded for quota group {group[0]} {group[1]} requests per minute")
+        window.append(now)
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str], body: bytes) -> Result:
+        for route_method, pattern, operation, handler in self._routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                self.calls[operation] += 1
+                try:
+                    self.check_quota(method, path)
+                    data = json.loads(body) if body else {}
+                    args = [unquote(arg) for arg in match.groups()]
+                    return 200, handler(*args, query=query, body=data)
+                except GoogleError as exc:
+                    return exc.status, exc.body()
+        logger.warning(f"Fake Google API has no route for {method} {path}")
+        return 404, GoogleError(404, f"No fake route for {method} {path}").body()
+
+    async def handle_batch(self, content_type: str, body: str) -> web.Response:
+        boundary = content_type.split("boundary=", 1)[1].strip('"')
+        parts = []
+        for part in body.replace("\r\n", "\n").split(f"--{boundary}"):
+            sections = part.strip().split("\n\n", 2)
+            if len(sections) < 2:
+                continue
+            content_id = next(
+                (line.split(":", 1)[1].strip() for line in sections[0].splitlines() if line.lower().startswith("content-id")),
+                "",
+            )
+            request_line = sections[1].splitlines()[0]
+            method, url = request_line.split()[:2]
+            split = urlsplit(url)
+            inner_body = sections[2].strip().encode() if len(sections) == 3 else b""
+            status, payload = self.dispatch(method, split.path, dict(parse_qsl(split.query)), inner_body)
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id.strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return web.Response(
+            body="".join(parts).encode(), headers={"Content-Type": f"multipart/mixed; boundary={boundary}"}
+        )
+
+    # --- Drive ---
+
+    def new_file(self, name: str, mime_type: str, parents: List[str]) -> dict:
+        file = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "mimeType": mime_type,
+            "parents": list(parents),
+            "trashed": False,
+            "createdTime": datetime.datetime.utcnow().isoformat() + "Z",
+            "permissions": [{"type": "user", "role": "owner"}],
+        }
+        self.files[file["id"]] = file
+        if mime_type == SPREADSHEET_MIME_TYPE:
+            self.spreadsheets[file["id"]] = {"sheets": [self.new_sheet(0, "Sheet1", 0)], "values": {}}
+        return file
+
+    def new_sheet(self, sheet_id: int, title: str, index: int, rows: int = 1000, cols: int = 26) -> dict:
+        return {
+            "properties": {
+                "sheetId": sheet_id,
+                "title": title,
+                "index": index,
+                "sheetType": "GRID",
+                "gridProperties": {"rowCount": rows, "columnCount": cols},
+            }
+        }
+
+    def file(self, file_id: str) -> dict:
+        if file_id not in self.files:
+            raise GoogleError(404, f"File not found: {file_id}")
+        return self.files[file_id]
+
+    def file_resource(self, file: dict) -> dict:
+        return {key: value for key, value in file.items() if key != "permissions"}
+
+    def matches(self, file: dict, clause: str) -> bool:
+        clause = clause.strip()
+        match = re.fullmatch(r"'(.*)' in parents|parents in '(.*)'", clause)
+        if match:
+            return (match.group(1) or match.group(2)) in file["parents"]
+        match = re.fullmatch(r"(name|mimeType)\s*(=|!=)\s*'((?:[^'\\]|\\.)*)'", clause)
+        if match:
+            key, op, value = match.groups()
+            value = value.replace("\\'", "'").replace("\\\\", "\\")
+            return (file[key] == value) == (op == "=")
+        match = re.fullmatch(r"trashed\s*=\s*(true|false)", clause)
+        if match:
+            return file["trashed"] == (match.group(1) == "true")
+        raise GoogleError(400, f"Unsupported query clause: {clause}")
+
+    def list_files(self, query: dict, body: dict) -> dict:
+        clauses = [c for c in re.split(r"\s+and\s+", query.get("q", "")) if c.strip()]
+        files = [f for f in self.files.values() if all(self.matches(f, c) for c in clauses)]
+        return {"files": [self.file_resource(f) for f in files]}
+
+    def create_file(self, query: dict, body: dict) -> dict:
+        file = self.new_file(body.get("name", "Untitled"), body.get("mimeType", ""), body.get("parents", []))
+        return self.file_resource(file)
+
+    def get_file(self, file_id: str, query: dict, body: dict) -> dict:
+        return self.file_resource(self.file(file_id))
+
+    def update_file(self, file_id: str, query: dict, body: dict) -> dict:
+        file = self.file(file_id)
+        for key in ("name", "trashed"):
+            if key in body:
+                file[key] = body[key]
+        for parent in query.get("removeParents", "").split(","):
+            if parent in file["parents"]:
+                file["parents"].remove(parent)
+        for parent in query.get("addParents", "").split(","):
+            if parent and parent not in file["parents"]:
+                file["parents"].append(parent)
+        return self.file_resource(file)
+
+    def delete_file(self, file_id: str, query: dict, body: dict) -> dict:
+        self.file(file_id)
+        del self.files[file_id]
+        self.spreadsheets.pop(file_id, None)
+        return {}
+
+    def copy_file(self, file_id: str, query: dict, body: dict) -> dict:
+        source = self.file(file_id)
+        file = self.new_file(
+            body.get("name", f"Copy of {source['name']}"), source["mimeType"], body.get("parents", source["parents"])
+        )
+        if file_id in self.spreadsheets:
+            # Copies keep the worksheet ids of the source
+            self.spreadsheets[file["id"]] = copy.deepcopy(self.spreadsheets[file_id])
+        return self.file_resource(file)
+
+    def list_comments(self, file_id: str, query: dict, body: dict) -> dict:
+        self.file(file_id)
+        return {"comments": []}
+
+    def permissions(self, file: dict) -> List[dict]:
+        permissions = list(file["permissions"])
+        if self.inherit_permissions:
+            for parent in file["parents"]:
+                if parent in self.files:
+                    permissions.extend(p for p in self.permissions(self.files[parent]) if p not in permissions)
+        return permissions
+
+    def list_permissions(self, file_id: str, query: dict, body: dict) -> dict:
+        return {"permissions": self.permissions(self.file(file_id))}
+
+    def create_permission(self, file_id: str, query: dict, body: dict) -> dict:
+        file = self.file(file_id)
+        permission = {"type": body.get("type"), "role": body.get("role")}
+        if permission not in file["permissions"]:
+            file["permissions"].append(permission)
+        return dict(permission, id=uuid.uuid4().hex)
+
+    # --- Sheets ---
+
+    def spreadsheet(self, spreadsheet_id: str) -> dict:
+        if spreadsheet_id not in self.spreadsheets:
+            raise GoogleError(404, f"Requested entity was not found: {spreadsheet_id}")
+        return self.spreadsheets[spreadsheet_id]
+
+    def spreadsheet_resource(self, spreadsheet_id: str) -> dict:
+        spreadsheet = self.spreadsheet(spreadsheet_id)
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "properties": {"title": self.files[spreadsheet_id]["name"], "locale": "en_US", "timeZone": "Etc/GMT"},
+            "sheets": sorted(spreadsheet["sheets"], key=lambda s: s["properties"]["index"]),
+            "spreadsheetUrl": f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit",
+        }
+
+    def create_spreadsheet(self, query: dict, body: dict) -> dict:
+        title = body.get("properties", {}).get("title", "Untitled spreadsheet")
+        file = self.new_file(title, SPREADSHEET_MIME_TYPE, [])
+        return self.spreadsheet_resource(file["id"])
+
+    def get_spreadsheet(self, spreadsheet_id: str, query: dict, body: dict) -> dict:
+        return self.spreadsheet_resource(spreadsheet_id)
+
+    def sheet(self, spreadsheet: dict, title: Optional[str] = None, sheet_id: Optional[int] = None) -> dict:
+        sheets = sorted(spreadsheet["sheets"], key=lambda s: s["properties"]["index"])
+        for sheet in sheets:
+            properties = sheet["properties"]
+            if (title is None and sheet_id is None) or properties["title"] == title or properties["sheetId"] == sheet_id:
+                return sheet
+        raise GoogleError(400, f"Unable to parse range: {title or sheet_id}")
+
+    def batch_update(self, spreadsheet_id: str, query: dict, body: dict) -> dict:
+        # Requests are applied atomically: either all of them or none
+        spreadsheet = copy.deepcopy(self.spreadsheet(spreadsheet_id))
+        replies = []
+        for index, request in enumerate(body.get("requests", [])):
+            (kind, params), = request.items()
+            try:
+                replies.append(self.apply_request(spreadsheet, kind, params))
+            except GoogleError as exc:
+                raise GoogleError(exc.status, f"Invalid requests[{index}].{kind}: {exc.message}")
+        self.spreadsheets[spreadsheet_id] = spreadsheet
+        return {"spreadsheetId": spreadsheet_id, "replies": replies}
+
+    def apply_request(self, spreadsheet: dict, kind: str, params: dict) -> dict:
+        sheets = spreadsheet["sheets"]
+        if kind == "addSheet":
+            properties = params.get("properties", {})
+            sheet_id = properties.get("sheetId", max([s["properties"]["sheetId"] for s in sheets], default=0) + 1)
+            title = properties.get("title", f"Sheet{len(sheets) + 1}")
+            if any(s["properties"]["sheetId"] == sheet_id for s in sheets):
+                raise GoogleError(400, f"A sheet with the id {sheet_id} already exists")
+            if any(s["properties"]["title"] == title for s in sheets):
+                raise GoogleError(400, f'A sheet with the name "{title}" already exists. Please enter another name.')
+            index = properties.get("index", len(sheets))
+            for sheet in sheets:
+                if sheet["properties"]["index"] >= index:
+                    sheet["properties"]["index"] += 1
+            grid = properties.get("gridProperties", {})
+            sheet = self.new_sheet(sheet_id, title, index, grid.get("rowCount", 1000), grid.get("columnCount", 26))
+            sheets.append(sheet)
+            return {"addSheet": sheet}
+        if kind == "deleteSheet":
+            sheet = self.sheet(spreadsheet, sheet_id=params["sheetId"])
+            if len(sheets) == 1:
+                raise GoogleError(400, "You can't remove all the sheets in a document.")
+            sheets.remove(sheet)
+            for other in sheets:
+                if other["properties"]["index"] > sheet["properties"]["index"]:
+                    other["properties"]["index"] -= 1
+            return {}
+        if kind == "updateCells":
+            start = params["start"]
+            sheet = self.sheet(spreadsheet, sheet_id=start["sheetId"])
+            values = spreadsheet["values"].setdefault(sheet["properties"]["title"], {})
+            for r, row in enumerate(params.get("rows", [])):
+                for c, cell in enumerate(row.get("values", [])):
+                    value = next(iter(cell.get("userEnteredValue", {"stringValue": ""}).values()))
+                    values[(start.get("rowIndex", 0) + r, start.get("columnIndex", 0) + c)] = value
+            return {}
+        if kind == "updateSheetProperties":
+            properties = params["properties"]
+            sheet = self.sheet(spreadsheet, sheet_id=properties["sheetId"])
+            grid = sheet["properties"]["gridProperties"]
+            for field in params["fields"].split(","):
+                if field.startswith("gridProperties/"):
+                    key = field.split("/", 1)[1]
+                    grid[key] = properties["gridProperties"][key]
+            # cells outside of a shrunk grid are deleted
+            values = spreadsheet["values"].get(sheet["properties"]["title"], {})
+            for r, c in list(values):
+                if r >= grid["rowCount"] or c >= grid["columnCount"]:
+                    del values[(r, c)]
+            return {}
+        if kind == "updateDimensionProperties":
+            self.sheet(spreadsheet, sheet_id=params["range"]["sheetId"])
+            return {}
+        # Other requests (formatting etc.) are accepted without effect
+        return {}
+
+    def update_values(self, spreadsheet_id: str, a1: str, query: dict, body: dict) -> dict:
+        spreadsheet = self.spreadsheet(spreadsheet_id)
+        title, row, col = parse_a1_range(a1)
+        sheet = self.sheet(spreadsheet, title=title)
+        values = spreadsheet["values"].setdefault(sheet["properties"]["title"], {})
+        rows = body.get("values", [])
+        for r, row_values in enumerate(rows):
+            for c, value in enumerate(row_values):
+                values[(row + r, col + c)] = value
+        # the grid grows to fit, like with the real API
+        grid = sheet["properties"]["gridProperties"]
+        grid["rowCount"] = max(grid["rowCount"], row + len(rows))
+        grid["columnCount"] = max(grid["columnCount"], col + max(map(len, rows), default=0))
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "updatedRange": a1,
+            "updatedRows": len(rows),
+            "updatedCells": sum(len(r) for r in rows),
+        }
+
+    def get_values(self, spreadsheet_id: str, a1: str, query: dict, body: dict) -> dict:
+        return {"range": a1, "majorDimension": "ROWS", "values": self.sheet_values(spreadsheet_id, parse_a1_range(a1)[0])}
+
+    def sheet_values(self, spreadsheet_id: str, title: Optional[str] = None) -> List[List[str]]:
+        """Contents of a worksheet (the first one by default) as a list of rows"""
+        spreadsheet = self.spreadsheet(spreadsheet_id)
+        sheet = self.sheet(spreadsheet, title=title)
+        values = spreadsheet["values"].get(sheet["properties"]["title"], {})
+        if not values:
+            return []
+        num_rows = max(r for r, _ in values) + 1
+        num_cols = max(c for _, c in values) + 1
+        return [[values.get((r, c), "") for c in range(num_cols)] for r in range(num_rows)]
+
+    # --- Apps Script ---
+
+    def create_project(self, query: dict, body: dict) -> dict:
+        project = {"scriptId": uuid.uuid4().hex, "title": body.get("title", ""), "parentId": body.get("parentId")}
+        self.projects[project["scriptId"]] = dict(project, files=[])
+        return project
+
+    def get_content(self, script_id: str, query: dict, body: dict) -> dict:
+        if script_id not in self.projects:
+            raise GoogleError(404, f"Project not found: {script_id}")
+        return {"scriptId": script_id, "files": self.projects[script_id]["files"]}
+
+    def update_content(self, script_id: str, query: dict, body: dict) -> dict:
+        if script_id not in self.projects:
+            raise GoogleError(404, f"Project not found: {script_id}")
+        self.projects[script_id]["files"] = body.get("files", [])
+        return {"scriptId": script_id, "files": self.projects[script_id]["files"]}
@@ -1,63 +1,195 @@
 """
-aiogoogle utilities for finding and creating folders in Google Drive
+aiogoogle utilities for finding and creating folders in Google Drive, and updating spreadsheets
 """
 import asyncio
 import json
-from typing import Optional
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
-from aiogoogle import Aiogoogle
-from aiogoogle.auth.creds import ServiceAccountCreds
+from . import config
+from .google_api import GoogleApiClient
+from .google_auth import DRIVE_SCOPES
 
-# Not sure if this can be consolidated with the gspread_asyncio credentials?
-creds = ServiceAccountCreds(scopes=["https://www.googleapis.com/auth/drive"], **json.load(open("google_secrets.json")))
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# Shared client, reuses a single HTTP session and the cached discovery document.
+# Credentials are loaded on first request. Drive requests are made as the service account
+# itself, while gspread acts as `owner_email` if that is configured: the access token is only
+# shared with gspread when it isn't, and otherwise the service account needs edit access to
+# the spreadsheets gspread creates (e.g. by sharing the hunt folders with it).
+client = GoogleApiClient(DRIVE_SCOPES)
 
 
 async def create_folder(name: str, parent_id: Optional[str] = None) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        payload = {"name": name, "mimeType": "application/vnd.google-apps.folder"}
-        if parent_id:
-            payload["parents"] = [parent_id]
-        result = await aiogoogle.as_service_account(
-            drive_v3.files.create(json=payload, fields="id")
-        )
+    drive_v3 = await client.discover("drive", "v3")
+    payload = {"name": name, "mimeType": FOLDER_MIME_TYPE}
+    if parent_id:
+        payload["parents"] = [parent_id]
+    result = await client.as_service_account(
+        drive_v3.files.create(json=payload, fields="id")
+    )
     return result  # {"id": ".. folder_id .."}
 
 
 async def find_folder(name: str, parent_id: str) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        result = await aiogoogle.as_service_account(
+    drive_v3 = await client.discover("drive", "v3")
+    result = await client.as_service_account(
+        drive_v3.files.list(
+            q=f"mimeType='{FOLDER_MIME_TYPE}' "
+            f"and name = '{escape_query(name)}' and parents in '{parent_id}'",
+            spaces="drive",
+            fields="files(id, name)"
+        )
+    )
+    return result  # {"files": [{"id": .., "name": ..}]}
+
+
+async def list_child_folders(parent_id: str) -> List[dict]:
+    """List all folders directly inside the parent folder, following pagination"""
+    drive_v3 = await client.discover("drive", "v3")
+    folders = []
+    page_token = None
+    while True:
+        kwargs = {"pageToken": page_token} if page_token else {}
+        result = await client.as_service_account(
             drive_v3.files.list(
-                q=f"mimeType='application/vnd.google-apps.folder' "
-                f"and name = '{name}' and parents in '{parent_id}'",
+                q=f"mimeType='{FOLDER_MIME_TYPE}' and '{parent_id}' in parents and trashed = false",
                 spaces="drive",
-                fields="files(id, name)"
+                orderBy="createdTime",
+                pageSize=1000,
+                fields="nextPageToken, files(id, name)",
+                **kwargs,
             )
         )
-    return result  # {"files": [{"id": .., "name": ..}]}
+        folders.extend(result.get("files", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return folders
 
 
-async def get_or_create_folder(name: str, parent_id: str) -> dict:
-    """Find folder inside existing folder
+def escape_query(value: str) -> str:
+    """Escape string literal for use in a Drive files.list query"""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
 
-    Args:
-        parent_id: ID of parent folder in Drive URL
+
+class FolderCache:
+    """Persistent (name, parent_id) -> folder_id cache
+
+    Folders are never renamed or moved by the bot, so once a folder id is known
+    it can be reused indefinitely. The cache is warmed by listing all child
+    folders of a parent at once, rather than searching for each name.
     """
-    existing_folder = await find_folder(name, parent_id)
-    if existing_folder.get("files"):
-        existing_folder = existing_folder["files"][0]
-        existing_folder["created"] = False
-        return existing_folder
+    def __init__(self, path: Path):
+        self.path = path
+        self.folders: Optional[Dict[str, Dict[str, str]]] = None  # parent_id -> {name: folder_id}
+        self.warmed_parents: Set[str] = set()
+
+    def load(self) -> Dict[str, Dict[str, str]]:
+        if self.folders is None:
+            self.folders = {}
+            if self.path.exists():
+                try:
+                    with self.path.open() as fp:
+                        self.folders = json.load(fp)
+                except (IOError, ValueError):
+                    logger.exception(f"Unable to load folder cache from {self.path}")
+        return self.folders
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w") as fp:
+            json.dump(self.load(), fp, indent=4)
+
+    def get(self, name: str, parent_id: str) -> Optional[str]:
+        return self.load().get(parent_id, {}).get(name)
+
+    def set(self, name: str, parent_id: str, folder_id: str, save: bool = True):
+        self.load().setdefault(parent_id, {})[name] = folder_id
+        if save:
+            self.save()
+
+    def forget(self, name: str, parent_id: str):
+        if self.load().get(parent_id, {}).pop(name, None) is not None:
+            self.save()
+
+    async def warm(self, parent_id: str):
+        """Populate cache with all child folders of parent, in a single paginated listing"""
+        for folder in await list_child_folders(parent_id):
+            # Listing is ordered by creation time, keep the oldest of any duplicate names
+            if self.get(folder["name"], parent_id) is None:
+                self.set(folder["name"], parent_id, folder["id"], save=False)
+        self.warmed_parents.add(parent_id)
+        self.save()
+
+
+folder_cache = FolderCache(Path(config.google_cache_dir) / "drive_folders.json")
+
+# In-flight lookups, so that concurrent calls for the same folder share one result
+_pending_folders: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+async def _find_or_create_folder(name: str, parent_id: str) -> dict:
+    if parent_id not in folder_cache.warmed_parents:
+        await folder_cache.warm(parent_id)
+        folder_id = folder_cache.get(name, parent_id)
+        if folder_id:
+            return {"id": folder_id, "name": name, "created": False}
 
     created_folder = await create_folder(name, parent_id)
+    folder_cache.set(name, parent_id, created_folder["id"])
     created_folder["name"] = name
     created_folder["created"] = True
     return created_folder
 
 
+async def get_or_create_folder(name: str, parent_id: str) -> dict:
+    """Find folder inside existing folder, or create it
+
+    Folder ids are served from `folder_cache` when known, and concurrent
+    calls for the same folder are coalesced so only one folder gets created.
+
+    Args:
+        parent_id: ID of parent folder in Drive URL
+    """
+    key = (name, parent_id)
+    while True:
+        folder_id = folder_cache.get(name, parent_id)
+        if folder_id:
+            return {"id": folder_id, "name": name, "created": False}
+        pending = _pending_folders.get(key)
+        if pending is None:
+            break
+        try:
+            result = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                # this call was cancelled itself
+                raise
+            # the call creating the folder was cancelled, try again
+            continue
+        return dict(result, created=False)
+
+    future = asyncio.get_running_loop().create_future()
+    _pending_folders[key] = future
+    try:
+        result = await _find_or_create_folder(name, parent_id)
+        future.set_result(result)
+        return result
+    except Exception as exc:
+        future.set_exception(exc)
+        # Mark exception as retrieved in case nobody else is waiting on it
+        future.exception()
+        raise
+    finally:
+        del _pending_folders[key]
+        if not future.done():
+            # e.g. cancelled, the calls waiting on it try again instead of being cancelled too
+            future.cancel()
+
+
 async def rename_file(file_id: str, name_lambda: callable) -> dict:
     """Rename file
 
@@ -66,22 +198,128 @@ async def rename_file(file_id: str, name_lambda: callable) -> dict:
     Args:
         name_lambda: method which takes original name and returns new name
     """
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        result = await aiogoogle.as_service_account(
-            drive_v3.files.get(
+    drive_v3 = await client.discover("drive", "v3")
+    result = await client.as_service_account(
+        drive_v3.files.get(
+            fileId=file_id,
+        )
+    )
+    name = result["name"]
+    new_name = name_lambda(name)
+    if name != new_name:
+        payload = {"name": new_name}
+        result = await client.as_service_account(
+            drive_v3.files.update(
+                json=payload,
                 fileId=file_id,
             )
         )
-        name = result["name"]
-        new_name = name_lambda(name)
-        if name != new_name:
-            payload = {"name": new_name}
-            result = await aiogoogle.as_service_account(
-                drive_v3.files.update(
-                    json=payload,
-                    fileId=file_id,
-                )
-            )
     return result  # {"name": .., "id": .., "kind": .., "mimeType": ..}
+
+
+async def move_file(file_id: str, name: str, add_parent_id: str, remove_parent_id: str) -> dict:
+    """Rename file and move it to another folder, in a single request"""
+    drive_v3 = await client.discover("drive", "v3")
+    return await client.as_service_account(
+        drive_v3.files.update(
+            fileId=file_id,
+            addParents=add_parent_id,
+            removeParents=remove_parent_id,
+            json={"name": name},
+            fields="id, name, parents",
+        )
+    )
+
+
+async def batch_update_files(updates: Dict[str, dict]) -> Dict[str, int]:
+    """Update metadata of many files at once via Drive batch requests
+
+    Args:
+        updates: mapping of file id to files.update request body, e.g. {"name": ..}
+
+    Returns:
+        mapping of file id to HTTP status of its update
+    """
+    drive_v3 = await client.discover("drive", "v3")
+    file_ids = list(updates)
+    requests = [
+        drive_v3.files.update(fileId=file_id, json=updates[file_id], fields="id, name")
+        for file_id in file_ids
+    ]
+    results = await client.batch(*requests)
+    return {file_id: status for file_id, (status, _) in zip(file_ids, results)}
+
+
+async def batch_rename_files(names: Dict[str, str]) -> Dict[str, int]:
+    """Rename many files at once, without first fetching their names
+
+    Args:
+        names: mapping of file id to new name
+
+    Returns:
+        mapping of file id to HTTP status of its rename
+    """
+    return await batch_update_files({file_id: {"name": name} for file_id, name in names.items()})
+
+
+async def batch_trash_files(file_ids: List[str]) -> Dict[str, int]:
+    """Move many files to the trash at once"""
+    return await batch_update_files({file_id: {"trashed": True} for file_id in file_ids})
+
+
+def is_shared_with_anyone(permissions: List[dict], role: str = "writer") -> bool:
+    """Whether anyone with the link has the given role, from a files' permissions list"""
+    return any(p.get("type") == "anyone" and p.get("role") == role for p in permissions)
+
+
+async def share_with_anyone(file_id: str, role: str = "writer") -> dict:
+    """Allow anyone with the link to access the file
+
+    Sharing a folder this way also shares the files created in it (and its subfolders).
+    """
+    drive_v3 = await client.discover("drive", "v3")
+    return await client.as_service_account(
+        drive_v3.permissions.create(fileId=file_id, json={"type": "anyone", "role": role}, fields="id")
+    )
+
+
+async def batch_find_unshared_files(file_ids: List[str], role: str = "writer") -> List[str]:
+    """Files which anyone with the link can't access with the given role
+
+    Files whose permissions can't be read (e.g. deleted) are skipped.
+    """
+    drive_v3 = await client.discover("drive", "v3")
+    requests = [
+        drive_v3.permissions.list(fileId=file_id, fields="permissions(type, role)")
+        for file_id in file_ids
+    ]
+    results = await client.batch(*requests)
+    return [
+        file_id for file_id, (status, result) in zip(file_ids, results)
+        if 200 <= status < 300 and not is_shared_with_anyone((result or {}).get("permissions", []), role)
+    ]
+
+
+async def batch_share_with_anyone(file_ids: List[str], role: str = "writer") -> Dict[str, int]:
+    """Share many files with anyone with the link at once, returns HTTP status per file id"""
+    drive_v3 = await client.discover("drive", "v3")
+    requests = [
+        drive_v3.permissions.create(fileId=file_id, json={"type": "anyone", "role": role}, fields="id")
+        for file_id in file_ids
+    ]
+    results = await client.batch(*requests)
+    return {file_id: status for file_id, (status, _) in zip(file_ids, results)}
+
+
+async def batch_update_spreadsheet(spreadsheet_id: str, requests: List[dict]) -> dict:
+    """Apply requests to a spreadsheet atomically, in a single Sheets API call
+
+    Ref: https://developers.google.com/sheets/api/reference/rest/v4/spreadsheets/batchUpdate
+    """
+    sheets_v4 = await client.discover("sheets", "v4")
+    return await client.as_service_account(
+        sheets_v4.spreadsheets.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            json={"requests": requests},
+        )
+    )
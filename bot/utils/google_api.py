@@ -0,0 +1,215 @@
+"""
+Long-lived aiogoogle client shared by the Google Drive / Apps Script utilities
+
+Creating an `Aiogoogle` per call means a new HTTP session (and TLS handshake) plus
+a fetch of the (large) API discovery document every time. Instead each
+`GoogleApiClient` keeps a single pooled HTTP session open for the lifetime of the
+bot, and discovery documents are loaded once from an on-disk cache. Access tokens
+come from the shared `google_auth.credentials` provider.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from aiogoogle import Aiogoogle
+from aiogoogle.models import Request
+from aiogoogle.resource import GoogleAPI
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+
+from . import config
+from .google_auth import GoogleCredentials, credentials
+from .google_quota import QuotaGroup, quota
+
+logger = logging.getLogger(__name__)
+
+# Discovery documents change rarely, refetch them once a week
+DISCOVERY_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# Maximum number of calls in a single batch request
+# Ref: https://developers.google.com/drive/api/guides/performance#batch-requests
+MAX_BATCH_SIZE = 100
+
+
+def redirect_url(url: str, api_url: Optional[str]) -> str:
+    """Point a *.googleapis.com url at `api_url` instead, keeping its path and query"""
+    if not api_url:
+        return url
+    parts = urlsplit(url)
+    if not parts.netloc.endswith("googleapis.com"):
+        return url
+    return api_url.rstrip("/") + url[len(f"{parts.scheme}://{parts.netloc}"):]
+
+
+def request_quota_group(request: Request) -> QuotaGroup:
+    """Infer quota group, e.g. ("drive", "write"), from request url and method"""
+    url = request.url or ""
+    if "sheets.googleapis.com" in url:
+        api = "sheets"
+    elif "script.googleapis.com" in url:
+        api = "script"
+    else:
+        api = "drive"
+    return (api, "read" if request.method == "GET" else "write")
+
+
+def encode_batch(requests: List[Request], boundary: str) -> str:
+    """Encode requests as a multipart/mixed batch request body"""
+    parts = []
+    for index, request in enumerate(requests):
+        url = urlsplit(request.url)
+        path = url.path + (f"?{url.query}" if url.query else "")
+        body = json.dumps(request.json) if request.json is not None else ""
+        parts.append(
+            f"--{boundary}\r\n"
+            f"Content-Type: application/http\r\n"
+            f"Content-ID: <item{index}>\r\n\r\n"
+            f"{request.method} {path} HTTP/1.1\r\n"
+            f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+            f"{body}\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts)
+
+
+def decode_batch(content_type: str, body: str, num_requests: int) -> List[Tuple[int, Optional[dict]]]:
+    """Decode multipart/mixed batch response into (status, json) per request, in request order"""
+    boundary = content_type.split("boundary=", 1)[1].strip('"')
+    results: List[Tuple[int, Optional[dict]]] = [(0, None)] * num_requests
+    for part in body.replace("\r\n", "\n").split(f"--{boundary}"):
+        sections = part.strip().split("\n\n", 2)
+        if len(sections) < 2:
+            # preamble or closing delimiter
+            continue
+        outer_headers, inner_headers = sections[0], sections[1]
+        content_id = next(
+            (line.split(":", 1)[1].strip() for line in outer_headers.splitlines() if line.lower().startswith("content-id")),
+            "",
+        )
+        index = int(content_id.strip("<>").rsplit("item", 1)[-1])
+        status = int(inner_headers.splitlines()[0].split()[1])
+        payload = None
+        if len(sections) == 3 and sections[2].strip():
+            try:
+                payload = json.loads(sections[2])
+            except ValueError:
+                payload = None
+        results[index] = (status, payload)
+    return results
+
+
+class GoogleApiClient:
+    def __init__(
+        self,
+        scopes: Sequence[str],
+        subject: Optional[str] = None,
+        cache_dir: Optional[Path] = None,
+        provider: GoogleCredentials = credentials,
+    ):
+        # Only used for discovery and its session factory, requests are authorized with `provider` tokens
+        self.aiogoogle = Aiogoogle()
+        self.scopes = tuple(scopes)
+        self.subject = subject
+        self.provider = provider
+        self.cache_dir = Path(cache_dir or config.google_cache_dir) / "discovery"
+        self._apis: Dict[Tuple[str, str], GoogleAPI] = {}
+        self._session: Optional[AiohttpSession] = None
+        self._discover_lock = asyncio.Lock()
+
+    @property
+    def api_url(self) -> Optional[str]:
+        """Override for Google API urls, read on each request so that it can be set at runtime"""
+        return config.google_api_url
+
+    def discovery_path(self, api_name: str, api_version: str) -> Path:
+        return self.cache_dir / f"{api_name}_{api_version}.json"
+
+    def get_session(self) -> AiohttpSession:
+        """Pooled HTTP session, created lazily so that it binds to the running event loop"""
+        if self._session is None:
+            self._session = AiohttpSession()
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def discover(self, api_name: str, api_version: str) -> GoogleAPI:
+        """Retrieve API from memory, the on-disk cache, or Google's discovery service, in that order"""
+        key = (api_name, api_version)
+        if key in self._apis:
+            return self._apis[key]
+
+        async with self._discover_lock:
+            if key in self._apis:
+                return self._apis[key]
+
+            path = self.discovery_path(api_name, api_version)
+            discovery_document = None
+            # Don't mix discovery documents of other servers into the cache
+            use_cache = not self.api_url
+            if use_cache and path.exists() and time.time() - path.stat().st_mtime < DISCOVERY_MAX_AGE_SECONDS:
+                try:
+                    with path.open() as fp:
+                        discovery_document = json.load(fp)
+                except (IOError, ValueError):
+                    logger.exception(f"Unable to load cached discovery document {path}")
+
+            if discovery_document is None:
+                request = self.aiogoogle.discovery_service.apis.getRest(
+                    api=api_name, version=api_version, validate=False
+                )
+                request.url = redirect_url(request.url, self.api_url)
+                discovery_document = await self.get_session().send(request)
+                if use_cache:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with path.open("w") as fp:
+                        json.dump(discovery_document, fp)
+                logger.info(f"Fetched discovery document for {api_name} {api_version}")
+
+            self._apis[key] = GoogleAPI(discovery_document)
+        return self._apis[key]
+
+    async def as_service_account(self, *requests: Request, full_res: bool = False):
+        """Send requests over the shared session, same semantics as `Aiogoogle.as_service_account`
+
+        Requests are rate limited and retried by `google_quota.quota`.
+        """
+        api, group = request_quota_group(requests[0])
+        return await quota.call(api, group, self._send, *requests, full_res=full_res)
+
+    async def _send(self, *requests: Request, full_res: bool = False):
+        token = await self.provider.token(self.scopes, self.subject)
+        for request in requests:
+            request.headers = {**(request.headers or {}), "Authorization": f"Bearer {token}"}
+            request.url = redirect_url(request.url, self.api_url)
+        return await self.get_session().send(
+            *requests,
+            full_res=full_res,
+            session_factory=self.aiogoogle.session_factory,
+        )
+
+    async def batch(self, *requests: Request) -> List[Tuple[int, Optional[dict]]]:
+        """Send requests of a single API as batch requests, returns (status, json) per request
+
+        Errors of individual requests don't raise, check the returned statuses.
+        """
+        results = []
+        for start in range(0, len(requests), MAX_BATCH_SIZE):
+            chunk = requests[start:start + MAX_BATCH_SIZE]
+            boundary = f"batch_{uuid.uuid4().hex}"
+            batch_request = Request(
+                method="POST",
+                url=chunk[0].batch_url,
+                headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+                data=encode_batch(chunk, boundary),
+            )
+            response = await self.as_service_account(batch_request, full_res=True)
+            body = response.data if isinstance(response.data, str) else response.data.decode()
+            results.extend(decode_batch(response.headers["Content-Type"], body, len(chunk)))
+        return results
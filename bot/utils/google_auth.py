@@ -0,0 +1,124 @@
+"""
+Google service account credentials shared by the aiogoogle and gspread clients
+
+`google_secrets.json` is only read on first use, so the bot starts without it as
+long as the Google integration isn't used. Credentials are cached per
+(scopes, subject), and the same google-auth credentials object is used by
+gspread's session and to authorize aiogoogle requests, so clients with the same
+scopes and subject share access tokens. `start_refresh` refreshes tokens in the background before they expire,
+so commands don't wait on the token endpoint.
+"""
+import asyncio
+import datetime
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import google.auth.transport.requests
+from google.oauth2.service_account import Credentials
+
+logger = logging.getLogger(__name__)
+
+SECRETS_FILE = "google_secrets.json"
+
+# Scopes of the Drive / Sheets clients, shared so that they can use the same access token
+DRIVE_SCOPES = (
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+)
+SCRIPT_SCOPES = ("https://www.googleapis.com/auth/script.projects",)
+
+CredentialsKey = Tuple[Tuple[str, ...], Optional[str]]
+
+
+class GoogleCredentials:
+    def __init__(self, path: str = SECRETS_FILE, refresh_margin: float = 300.0):
+        """
+        Args:
+            path: service account key file, relative to the working directory
+            refresh_margin: refresh access tokens this many seconds before they expire
+        """
+        self.path = path
+        self.refresh_margin = datetime.timedelta(seconds=refresh_margin)
+        self._info: Optional[dict] = None
+        self._credentials: Dict[CredentialsKey, Credentials] = {}
+        self._locks: Dict[CredentialsKey, asyncio.Lock] = {}
+        self._refresher: Optional[asyncio.Task] = None
+
+    def info(self) -> dict:
+        if self._info is None:
+            with Path(self.path).open() as fp:
+                self._info = json.load(fp)
+        return self._info
+
+    def reset(self):
+        """Forget loaded credentials, e.g. after the key file changed"""
+        self._info = None
+        self._credentials.clear()
+
+    def get(self, scopes: Sequence[str] = DRIVE_SCOPES, subject: Optional[str] = None) -> Credentials:
+        """google-auth credentials for the scopes, created once and shared"""
+        key = (tuple(scopes), subject)
+        if key not in self._credentials:
+            creds = Credentials.from_service_account_info(self.info(), scopes=list(scopes))
+            if subject:
+                creds = creds.with_subject(subject)
+            self._credentials[key] = creds
+        return self._credentials[key]
+
+    def needs_refresh(self, creds: Credentials, margin: datetime.timedelta = datetime.timedelta(0)) -> bool:
+        if not creds.token or creds.expiry is None:
+            return True
+        # google-auth expiry is a naive UTC datetime
+        return creds.expiry - margin <= datetime.datetime.utcnow()
+
+    async def refresh(self, scopes: Sequence[str] = DRIVE_SCOPES, subject: Optional[str] = None, margin=None):
+        """Refresh the access token if it has expired (or expires within margin)"""
+        key = (tuple(scopes), subject)
+        creds = self.get(scopes, subject)
+        margin = margin or datetime.timedelta(0)
+        if not self.needs_refresh(creds, margin):
+            return
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if self.needs_refresh(creds, margin):
+                # google-auth refreshes synchronously, keep it off the event loop
+                request = google.auth.transport.requests.Request()
+                await asyncio.get_running_loop().run_in_executor(None, creds.refresh, request)
+                logger.info(f"Refreshed Google access token for {', '.join(scopes)}")
+
+    async def token(self, scopes: Sequence[str] = DRIVE_SCOPES, subject: Optional[str] = None) -> str:
+        """Valid access token, normally kept fresh by the background refresh"""
+        await self.refresh(scopes, subject)
+        return self.get(scopes, subject).token
+
+    def start_refresh(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    def stop_refresh(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def _refresh_loop(self):
+        while True:
+            for (scopes, subject) in list(self._credentials):
+                try:
+                    await self.refresh(scopes, subject, margin=self.refresh_margin)
+                except Exception:
+                    logger.exception("Unable to refresh Google access token")
+            await asyncio.sleep(self.next_refresh_delay())
+
+    def next_refresh_delay(self) -> float:
+        """Seconds until the first token enters its refresh margin, checked at least every minute"""
+        now = datetime.datetime.utcnow()
+        delays = [
+            (creds.expiry - self.refresh_margin - now).total_seconds()
+            for creds in self._credentials.values() if creds.expiry is not None
+        ]
+        return max(1.0, min(delays + [60.0]))
+
+
+credentials = GoogleCredentials()
@@ -0,0 +1,164 @@
+"""
+Shared client-side rate limiting and retries for Google API calls
+
+Every Drive, Sheets and Apps Script request goes through `quota.call`, which
+waits on a token bucket for the API's quota group (e.g. sheets reads vs sheets
+writes) and retries rate limited (429) or server (5xx) errors with jittered
+exponential backoff. Counters are kept per quota group so they can be inspected
+from discord via `!google_stats`.
+
+Ref: https://developers.google.com/sheets/api/limits
+     https://developers.google.com/drive/api/guides/limits
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+import requests
+from aiogoogle.excs import HTTPError
+from gspread.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+QuotaGroup = Tuple[str, str]  # (api, "read" / "write")
+
+# Requests per second and burst size for each quota group. These are somewhat below
+# Google's default per-user quotas, e.g. 60 Sheets read or write requests per minute.
+DEFAULT_LIMITS: Dict[QuotaGroup, Tuple[float, int]] = {
+    ("drive", "read"): (10.0, 20),
+    ("drive", "write"): (3.0, 10),
+    ("sheets", "read"): (0.9, 10),
+    ("sheets", "write"): (0.9, 10),
+    ("script", "read"): (1.0, 5),
+    ("script", "write"): (1.0, 5),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token, returns the number of seconds waited"""
+        waited = 0.0
+        # Lock so that waiters are served in order
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= 1
+        return waited
+
+
+@dataclass
+class QuotaStats:
+    requests: int = 0       # Calls issued, including retries
+    throttled: int = 0      # Calls delayed by the client-side token bucket
+    throttled_seconds: float = 0.0
+    rate_limited: int = 0   # 429 responses received from Google
+    server_errors: int = 0  # 5xx or connection errors
+    retries: int = 0
+    failures: int = 0       # Calls which failed after all retries (or with a non-retryable error)
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of an aiogoogle or gspread error, if any"""
+    if isinstance(exc, HTTPError) and exc.res is not None:
+        return exc.res.status_code
+    if isinstance(exc, APIError):
+        return exc.response.status_code
+    return None
+
+
+def error_message(exc: BaseException) -> str:
+    """Message of a Google API error, as returned by Google"""
+    if isinstance(exc, HTTPError) and exc.res is not None:
+        content = exc.res.content
+        if isinstance(content, dict):
+            return str(content.get("message", content))
+    return str(exc)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    return isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError, requests.ConnectionError, requests.Timeout))
+
+
+class GoogleQuota:
+    def __init__(
+        self,
+        limits: Optional[Dict[QuotaGroup, Tuple[float, int]]] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+    ):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.buckets: Dict[QuotaGroup, TokenBucket] = {}
+        self.stats: Dict[QuotaGroup, QuotaStats] = {}
+
+    def bucket(self, group: QuotaGroup) -> TokenBucket:
+        if group not in self.buckets:
+            rate, capacity = self.limits.get(group, (1.0, 5))
+            self.buckets[group] = TokenBucket(rate, capacity)
+        return self.buckets[group]
+
+    def get_stats(self, group: QuotaGroup) -> QuotaStats:
+        return self.stats.setdefault(group, QuotaStats())
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter exponential backoff"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, api: str, group: str, method: Callable[..., Awaitable], *args, **kwargs):
+        """Await method(*args, **kwargs) under the rate limit of (api, group), retrying transient errors"""
+        key = (api, group)
+        stats = self.get_stats(key)
+        attempt = 0
+        while True:
+            waited = await self.bucket(key).acquire()
+            if waited:
+                stats.throttled += 1
+                stats.throttled_seconds += waited
+            stats.requests += 1
+            try:
+                return await method(*args, **kwargs)
+            except Exception as exc:
+                if status_code(exc) == 429:
+                    stats.rate_limited += 1
+                elif is_retryable(exc):
+                    stats.server_errors += 1
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    stats.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                stats.retries += 1
+                logger.warning(f"Retrying {api}/{group} request in {delay:.1f}s after error: {exc}")
+                await asyncio.sleep(delay)
+
+    def summary(self) -> Dict[str, QuotaStats]:
+        return {f"{api} {group}": stats for (api, group), stats in sorted(self.stats.items())}
+
+
+quota = GoogleQuota()
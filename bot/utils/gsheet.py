@@ -3,11 +3,12 @@
 asyncio packages required: gspread_asyncio, oauth2client, google-api-python-client
 non-asyncio: gspread, cryptography, oauth2client, google-api-python-client
 """
-from typing import Optional
+from typing import List, Optional, Tuple
 import asyncio
 import logging
 # asyncio imports
 import gspread_asyncio
+import requests
 # from google-auth package
 from google.oauth2.service_account import Credentials
 
@@ -16,37 +17,131 @@ import gspread
 from gspread.spreadsheet import Spreadsheet
 from oauth2client.service_account import ServiceAccountCredentials
 from apiclient.discovery import build
-from . import config
+from . import config, google_auth
+from .google_api import redirect_url
+from .google_auth import DRIVE_SCOPES
+from .google_quota import QuotaGroup, quota
 
 
 logger = logging.getLogger(__name__)
 
+# gspread methods which go through the Drive API rather than the Sheets API
+GSPREAD_DRIVE_METHODS = {
+    "copy", "create", "del_spreadsheet", "insert_permission", "list_permissions",
+    "remove_permission", "list_spreadsheet_files", "openall",
+}
+GSPREAD_READ_PREFIXES = ("get", "fetch", "list", "open", "values_get", "values_batch_get", "worksheets", "range")
 
-# First, set up a callback function that fetches our credentials off the disk.
-# gspread_asyncio needs this to re-authenticate when credentials expire.
+
+# gspread_asyncio calls this to re-authenticate when credentials expire; the
+# credentials object is shared, and kept fresh by `google_auth.credentials`.
 def get_credentials(scopes: Optional[list] = None) -> Credentials:
     # To obtain a service account JSON file, follow these steps:
     # https://gspread.readthedocs.io/en/latest/oauth2.html#for-bots-using-service-account
-    creds = Credentials.from_service_account_file("google_secrets.json")
-    scoped = creds.with_subject(config.owner_email).with_scopes(
-        scopes
-        or [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-    )
-    return scoped
+    return google_auth.credentials.get(scopes or DRIVE_SCOPES, config.owner_email)
+
+
+def gspread_quota_group(method) -> QuotaGroup:
+    name = method.__name__
+    api = "drive" if name in GSPREAD_DRIVE_METHODS else "sheets"
+    return (api, "read" if name.startswith(GSPREAD_READ_PREFIXES) else "write")
+
+
+class RedirectAdapter(requests.adapters.HTTPAdapter):
+    """Sends gspread's *.googleapis.com requests to `config.google_api_url` instead"""
+    def send(self, request, **kwargs):
+        request.url = redirect_url(request.url, config.google_api_url)
+        return super().send(request, **kwargs)
+
+
+class RateLimitedClientManager(gspread_asyncio.AsyncioGspreadClientManager):
+    """gspread_asyncio client manager which defers rate limiting and retries to `google_quota.quota`
+
+    By default gspread_asyncio sleeps `gspread_delay` between every call and retries
+    errors forever; instead fail fast here and let the shared quota layer handle it.
+    """
+    async def _call(self, method, *args, **kwargs):
+        api, group = gspread_quota_group(method)
+        return await quota.call(api, group, super()._call, method, *args, **kwargs)
+
+    async def _authorize(self):
+        client = await super()._authorize()
+        if config.google_api_url:
+            # gspread < 6 keeps the session on the client itself
+            session = getattr(getattr(client.gc, "http_client", client.gc), "session")
+            if not isinstance(session.get_adapter("https://"), RedirectAdapter):
+                session.mount("https://", RedirectAdapter())
+        return client
+
+    async def handle_gspread_error(self, e, method, args, kwargs):
+        raise e
+
+    async def handle_requests_error(self, e, method, args, kwargs):
+        raise e
 
 
 def get_manager() -> gspread_asyncio.AsyncioGspreadClientManager:
-    return gspread_asyncio.AsyncioGspreadClientManager(get_credentials)
+    return RateLimitedClientManager(get_credentials, gspread_delay=0)
 
 
 def spreadsheet_link(sheet_id: str):
     return f"https://docs.google.com/spreadsheets/d/{sheet_id}"
 
 
+# Fixed worksheet id for the Quick Links tab, so that requests in the same
+# batchUpdate can refer to it before it exists
+QUICK_LINKS_SHEET_ID = 1000
+QUICK_LINKS_TITLE = "Quick Links"
+BLANK_SHEET_TITLE = "Sheet 1"
+
+
+def _cell(value: str) -> dict:
+    return {"userEnteredValue": {"stringValue": value or ""}}
+
+
+def quick_links_requests(
+    rows: List[Tuple[str, str]], sheet_id: int = QUICK_LINKS_SHEET_ID, column_width: int = 1000
+) -> List[dict]:
+    """spreadsheets.batchUpdate requests which add a key-value Quick Links worksheet
+
+    Ref: https://developers.google.com/sheets/api/reference/rest/v4/spreadsheets/request
+    """
+    return [
+        {
+            "addSheet": {
+                "properties": {
+                    "sheetId": sheet_id,
+                    "title": QUICK_LINKS_TITLE,
+                    "gridProperties": {"rowCount": max(len(rows), 10), "columnCount": 2},
+                }
+            }
+        },
+        {
+            "updateCells": {
+                "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+                "rows": [{"values": [_cell(key), _cell(value)]} for key, value in rows],
+                "fields": "userEnteredValue",
+            }
+        },
+        {
+            "updateDimensionProperties": {
+                "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": 1, "endIndex": 2},
+                "properties": {"pixelSize": column_width},
+                "fields": "pixelSize",
+            }
+        },
+    ]
+
+
+def clear_spreadsheet_requests(sheet_ids: List[int]) -> List[dict]:
+    """spreadsheets.batchUpdate requests which replace the given worksheets by a single blank one"""
+    return [
+        {"addSheet": {"properties": {"title": BLANK_SHEET_TITLE, "index": 0}}}
+    ] + [
+        {"deleteSheet": {"sheetId": sheet_id}} for sheet_id in sheet_ids
+    ]
+
+
 async def copy_spreadsheet(
     agcm: gspread_asyncio.AsyncioGspreadClientManager,
     source_id: str,
@@ -64,12 +159,9 @@ async def copy_spreadsheet(
     """
     agc = await agcm.authorize()
 
-    # Re-implmented from gspread_asyncio for folder_id.
-    # NOTE: now merged in https://github.com/dgilman/gspread_asyncio/pull/30
-    ss = await agc.agcm._call(agc.gc.copy, source_id, title, folder_id=folder_id)
-    sheet = gspread_asyncio.AsyncioGspreadSpreadsheet(agc.agcm, ss)
-    agc._ss_cache_title[title] = sheet
-    agc._ss_cache_key[ss.id] = sheet
+    # folder_id support merged in https://github.com/dgilman/gspread_asyncio/pull/30
+    # Copying comments costs extra Drive calls per copy, and starter sheets are just templates
+    sheet = await agc.copy(source_id, title=title, folder_id=folder_id, copy_comments=False)
 
     if share_anyone:
         # Allow anyone with the URL to write to this spreadsheet.
@@ -94,12 +186,8 @@ async def create_spreadsheet(
         """
     agc = await agcm.authorize()
 
-    # Re-implmented from gspread_asyncio for folder_id.
-    # NOTE: now merged in https://github.com/dgilman/gspread_asyncio/pull/30
-    ss = await agc.agcm._call(agc.gc.create, title, folder_id=folder_id)
-    sheet = gspread_asyncio.AsyncioGspreadSpreadsheet(agc.agcm, ss)
-    agc._ss_cache_title[title] = sheet
-    agc._ss_cache_key[ss.id] = sheet
+    # folder_id support merged in https://github.com/dgilman/gspread_asyncio/pull/30
+    sheet = await agc.create(title, folder_id=folder_id)
 
     if share_anyone:
         # Allow anyone with the URL to write to this spreadsheet.
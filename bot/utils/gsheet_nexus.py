@@ -3,7 +3,7 @@ Maintain a central "nexus" dashboard with links to puzzles, status, and so forth
 """
 import logging
 import string
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
 import gspread_asyncio
 from bot.store import PuzzleData
@@ -30,34 +30,89 @@ COLUMNS = [
 ]
 
 
+def _attr(column: str) -> Callable[[PuzzleData], str]:
+    """Extractor which simply stringifies the PuzzleData attribute of the same name"""
+    def extract(puzzle: PuzzleData) -> str:
+        value = getattr(puzzle, column, "")
+        return "" if value is None else str(value)
+    return extract
+
+
+def _google_sheet_url(puzzle: PuzzleData) -> str:
+    return urls.spreadsheet_url(puzzle.google_sheet_id) if puzzle.google_sheet_id else ""
+
+
+def _data_path(puzzle: PuzzleData) -> str:
+    # Convenience for bot administrator to get path to puzzle metadata json,
+    # matches the layout of FilePuzzleJsonDb.puzzle_path
+    return f"{puzzle.guild_id}/{puzzle.hunt_id}/{puzzle.round_id}/{puzzle.channel_id}.json"
+
+
+# Column name -> method extracting the cell contents from a puzzle.
+# Columns without a special extractor default to the PuzzleData attribute.
+COLUMN_EXTRACTORS: Dict[str, Callable[[PuzzleData], str]] = {
+    column: _attr(column) for column in COLUMNS
+}
+COLUMN_EXTRACTORS.update({
+    "google_sheet_url": _google_sheet_url,
+    "data_path": _data_path,
+})
+assert list(COLUMN_EXTRACTORS) == COLUMNS
+
+def header_row() -> List[str]:
+    return [string.capwords(column.replace("_", " ")) for column in COLUMNS]
+
+
+def build_nexus_values(puzzles: List[PuzzleData], min_rows: int = 0) -> List[List[str]]:
+    """Build the 2D matrix of nexus cell values: a header row followed by one row per puzzle
+
+    Args:
+        min_rows: pad with blank rows up to this many rows (including the header)
+    """
+    values = [header_row()]
+    extractors = list(COLUMN_EXTRACTORS.values())
+    for puzzle in puzzles:
+        values.append([extract(puzzle) for extract in extractors])
+    blank_row = [""] * len(COLUMNS)
+    while len(values) < min_rows:
+        values.append(list(blank_row))
+    return values
+
+
+def a1_range(num_rows: int, num_cols: int = len(COLUMNS), first_row: int = HEADER_ROW) -> str:
+    """A1 notation for a block starting from the first column, e.g. `A1:M11`"""
+    last_col = ""
+    col = num_cols
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        last_col = string.ascii_uppercase[rem] + last_col
+    return f"A{first_row}:{last_col}{first_row + num_rows - 1}"
+
+
 async def update_nexus(agcm: gspread_asyncio.AsyncioGspreadClientManager, file_id: str, puzzles: List[PuzzleData]):
     # Always authorize first.
     # If you have a long-running program call authorize() repeatedly.
     agc = await agcm.authorize()
 
+    # open_by_key is cached by gspread_asyncio, so this only fetches metadata once
     nexus_sheet = await agc.open_by_key(file_id)
 
-    # Get reference to first spreadsheet
-    zero_ws = await nexus_sheet.get_worksheet(0)
-
-    # Update puzzle contents
-    cell_range = await zero_ws.range(HEADER_ROW, 1, HEADER_ROW + len(puzzles), len(COLUMNS))
-    cell_index = 0
-    for column in COLUMNS:
-        cell_range[cell_index].value = string.capwords(column.replace("_", " "))
-        cell_index += 1
-    for puzzle in puzzles:
-        for column in COLUMNS:
-            if column == "google_sheet_url" and puzzle.google_sheet_id:
-                cell_range[cell_index].value = urls.spreadsheet_url(puzzle.google_sheet_id)
-            elif column == "data_path":
-                # Convenience for bot administrator to get path to puzzle metadata json
-                cell_range[cell_index].value = f"{puzzle.guild_id}/{puzzle.round_id}/{puzzle.channel_id}.json"
-            else:
-                cell_range[cell_index].value = str(getattr(puzzle, column, ""))
-            cell_index += 1
-    assert cell_index == len(cell_range)
-    await zero_ws.update_cells(cell_range)
+    # Size the first worksheet to the puzzle rows, which drops the rows of since deleted
+    # puzzles without reading the sheet. Its row count is known from the cached metadata,
+    # and kept up to date by resize, so this is only requested when the number of puzzles changes.
+    # At least one row has to stay unfrozen, which is blanked when there are no puzzles.
+    worksheet = await nexus_sheet.get_worksheet(0)
+    num_rows = max(len(puzzles) + 1, worksheet.frozen_row_count + 1)
+    if worksheet.row_count != num_rows:
+        await worksheet.resize(rows=num_rows)
+
+    # Write puzzle contents in a single values request
+    values = build_nexus_values(puzzles, min_rows=num_rows)
+    await nexus_sheet.values_update(
+        a1_range(len(values)),
+        params={"valueInputOption": "RAW"},
+        body={"values": values},
+    )
     logger.info(f"Finished updating nexus spreadsheet with {len(puzzles)} puzzles")
 
 
@@ -67,14 +122,14 @@ if __name__ == "__main__":
     import argparse
     import asyncio
 
-    from bot.utils.gsheet import get_credentials
-    from bot.utils.puzzles_data import PuzzleJsonDb
+    from bot.utils.gsheet import get_manager
+    from bot.store import PuzzleJsonDb
 
     logging.basicConfig(level=logging.DEBUG)
 
     # Create an AsyncioGspreadClientManager object which
     # will give us access to the Spreadsheet API.
-    agcm = gspread_asyncio.AsyncioGspreadClientManager(get_credentials)
+    agcm = get_manager()
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--sheet", "--sheet-id", required=True, help="ID (in URL) of Nexus Google Sheet")
@@ -0,0 +1,66 @@
+"""
+Pool of ready-made puzzle spreadsheets, kept per hunt folder
+
+Creating a puzzle spreadsheet takes several serial Google API calls (copy the
+starter sheet, share it, clear it), so the GoogleSheets cog prepares some in the
+background ahead of time. New puzzles then only need to claim a sheet and rename
+and move it into the round folder.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+POOL_SHEET_TITLE = "Unused puzzle sheet"
+
+
+class SpreadsheetPool:
+    """Persistent hunt folder id -> list of unused spreadsheet ids"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.sheets: Optional[Dict[str, List[str]]] = None
+
+    def load(self) -> Dict[str, List[str]]:
+        if self.sheets is None:
+            self.sheets = {}
+            if self.path.exists():
+                try:
+                    with self.path.open() as fp:
+                        self.sheets = json.load(fp)
+                except (IOError, ValueError):
+                    logger.exception(f"Unable to load spreadsheet pool from {self.path}")
+        return self.sheets
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w") as fp:
+            json.dump(self.load(), fp, indent=4)
+
+    def size(self, folder_id: str) -> int:
+        return len(self.load().get(folder_id, []))
+
+    def add(self, folder_id: str, sheet_id: str):
+        self.load().setdefault(folder_id, []).append(sheet_id)
+        self.save()
+
+    def claim(self, folder_id: str) -> Optional[str]:
+        """Remove and return the oldest unused spreadsheet, if any"""
+        sheets = self.load().get(folder_id)
+        if not sheets:
+            return None
+        sheet_id = sheets.pop(0)
+        self.save()
+        return sheet_id
+
+    def release(self, folder_id: str) -> List[str]:
+        """Remove and return all unused spreadsheets of the folder"""
+        sheets = self.load().pop(folder_id, [])
+        self.save()
+        return sheets
+
+
+sheet_pool = SpreadsheetPool(Path(config.google_cache_dir) / "sheet_pool.json")
@@ -0,0 +1,208 @@
+"""
+Durable background job queue
+
+Slow side effects of commands (mainly Google Drive / Sheets calls) are enqueued as
+jobs instead of being awaited inline, so that discord commands can respond as soon
+as the discord side is done. Jobs are persisted in the store before they run, and
+only deleted once they succeed, so pending jobs are resumed when the bot restarts.
+
+Handlers must be idempotent: a job may run again if the bot restarts mid-way.
+"""
+import asyncio
+import datetime
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import pytz
+
+from bot.store import Job, _JobDb
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[None]]
+# Batch handlers process several jobs of one kind at once, and return the keys of failed jobs
+BatchJobHandler = Callable[[List[Job]], Awaitable[List[str]]]
+
+
+class JobRetry(RuntimeError):
+    """Raise from a handler when the job can't run yet, e.g. waiting on another job"""
+    pass
+
+
+@dataclass
+class JobKind:
+    handler: Callable
+    batch: bool = False
+    # How long newly enqueued jobs wait before running, so that batch jobs can accumulate
+    delay: float = 0.0
+    max_attempts: int = 8
+    # Called with the job and error message once retries are exhausted, e.g. to notify users
+    on_give_up: Optional[Callable[[Job, str], Awaitable[None]]] = None
+
+
+class JobQueue:
+    def __init__(self, db: _JobDb, concurrency: int = 4, base_retry_delay: float = 2.0, max_retry_delay: float = 300.0):
+        self.db = db
+        self.kinds: Dict[str, JobKind] = {}
+        self.jobs: Dict[str, Job] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.base_retry_delay = base_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.wakeup = asyncio.Event()
+        self.scheduler: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    def register(self, kind: str, handler: JobHandler, **kwargs):
+        self.kinds[kind] = JobKind(handler=handler, **kwargs)
+
+    def register_batch(self, kind: str, handler: BatchJobHandler, **kwargs):
+        self.kinds[kind] = JobKind(handler=handler, batch=True, **kwargs)
+
+    def load(self):
+        """Load jobs persisted by a previous run"""
+        if self.loaded:
+            return
+        for job in self.db.get_all():
+            self.jobs.setdefault(job.key, job)
+        self.loaded = True
+
+    def enqueue(self, kind: str, key: str, payload: Optional[dict] = None) -> Job:
+        """Persist and schedule a job, unless a job with the same key is already queued"""
+        self.load()
+        if key in self.jobs and self.jobs[key].status == "pending":
+            return self.jobs[key]
+        now = datetime.datetime.now(tz=pytz.UTC)
+        delay = self.kinds[kind].delay if kind in self.kinds else 0.0
+        job = Job(
+            key=key,
+            kind=kind,
+            payload=payload or {},
+            created_time=now,
+            next_attempt_time=now + datetime.timedelta(seconds=delay),
+        )
+        self.db.commit(job)
+        self.jobs[key] = job
+        self.wakeup.set()
+        return job
+
+    def save(self, job: Job):
+        """Persist changes a handler made to its job's payload, e.g. progress to resume from on retry"""
+        if self.jobs.get(job.key) is job:
+            self.db.commit(job)
+
+    def pending(self, kind: Optional[str] = None) -> List[Job]:
+        return [j for j in self.jobs.values() if j.status == "pending" and (kind is None or j.kind == kind)]
+
+    def failed(self) -> List[Job]:
+        return [j for j in self.jobs.values() if j.status == "failed"]
+
+    def cancel(self, key: str) -> bool:
+        """Stop a job, running or not, and forget it. Returns whether the job existed"""
+        self.load()
+        job = self.jobs.pop(key, None)
+        if job is None:
+            return False
+        self.db.delete(job)
+        task = self.running.get(key)
+        if task is not None:
+            task.cancel()
+        return True
+
+    def start(self):
+        """Start running jobs, including ones left over from a previous run"""
+        self.load()
+        if self.scheduler is None or self.scheduler.done():
+            self.scheduler = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+        tasks = list(self.running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def retry_delay(self, attempts: int) -> float:
+        return random.uniform(0.5, 1.0) * min(self.max_retry_delay, self.base_retry_delay * 2 ** attempts)
+
+    def due_jobs(self, now: datetime.datetime) -> List[Job]:
+        return [
+            job for job in self.pending()
+            if job.kind in self.kinds
+            and job.key not in self.running
+            and (job.next_attempt_time is None or job.next_attempt_time <= now)
+        ]
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            now = datetime.datetime.now(tz=pytz.UTC)
+            batches: Dict[str, List[Job]] = {}
+            for job in self.due_jobs(now):
+                if self.kinds[job.kind].batch:
+                    batches.setdefault(job.kind, []).append(job)
+                else:
+                    self.spawn([job])
+            for jobs in batches.values():
+                self.spawn(jobs)
+
+            # Sleep until the next job is due, or something new is enqueued
+            next_times = [
+                j.next_attempt_time for j in self.pending()
+                if j.key not in self.running and j.next_attempt_time is not None
+            ]
+            timeout = min([(t - now).total_seconds() for t in next_times], default=60.0)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(timeout, 0.1))
+            except asyncio.TimeoutError:
+                pass
+
+    def spawn(self, jobs: List[Job]):
+        task = asyncio.create_task(self.execute(jobs))
+        for job in jobs:
+            self.running[job.key] = task
+
+    async def execute(self, jobs: List[Job]):
+        kind = self.kinds[jobs[0].kind]
+        try:
+            async with self.semaphore:
+                failed = {}
+                try:
+                    if kind.batch:
+                        failed = {key: "failed in batch" for key in await kind.handler(jobs)}
+                    else:
+                        await kind.handler(jobs[0])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    if not isinstance(exc, JobRetry):
+                        logger.exception(f"Job {jobs[0].kind} failed: {[j.key for j in jobs]}")
+                    failed = {job.key: f"{type(exc).__name__}: {exc}" for job in jobs}
+
+            for job in jobs:
+                if job.key in failed:
+                    self.record_failure(job, kind, failed[job.key])
+                else:
+                    self.db.delete(job)
+                    if self.jobs.get(job.key) is job:
+                        del self.jobs[job.key]
+        finally:
+            for job in jobs:
+                self.running.pop(job.key, None)
+            self.wakeup.set()
+
+    def record_failure(self, job: Job, kind: JobKind, error: str):
+        job.attempts += 1
+        job.last_error = error
+        if job.attempts >= kind.max_attempts:
+            job.status = "failed"
+            logger.error(f"Giving up on job {job.key} after {job.attempts} attempts: {error}")
+            if kind.on_give_up is not None:
+                asyncio.create_task(kind.on_give_up(job, error))
+        else:
+            delay = self.retry_delay(job.attempts)
+            job.next_attempt_time = datetime.datetime.now(tz=pytz.UTC) + datetime.timedelta(seconds=delay)
+        self.db.commit(job)
@@ -0,0 +1,78 @@
+"""
+Async locks by key, e.g. one per puzzle
+
+Commands that read-modify-write a puzzle (`!note`, `!solve`, archiving it, ...)
+await discord or Google calls in between, so two of them on the same puzzle can
+overwrite each other's changes. Holding the puzzle's lock around the read, update
+and commit serializes them, while operations on other puzzles still run in
+parallel. Hunt-level operations (new rounds, archiving, cleanup) use the hunt's
+lock the same way; when both are needed, the hunt lock is taken first.
+
+Time spent waiting for locks is recorded, and shown by `!loop_stats`.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LockStats:
+    acquired: int = 0
+    contended: int = 0  # acquisitions which had to wait for another task
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class KeyedLock:
+    def __init__(self, name: str, slow_wait: float = 1.0):
+        """
+        Args:
+            name: what the keys are, e.g. "puzzle", for logs and stats
+            slow_wait: waits longer than this many seconds are logged
+        """
+        self.name = name
+        self.slow_wait = slow_wait
+        self.locks: Dict[Hashable, asyncio.Lock] = {}
+        # Number of tasks holding or waiting for each lock, so that unused locks are dropped
+        self.users: Counter = Counter()
+        self.stats = LockStats()
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable):
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        self.users[key] += 1
+        try:
+            contended = lock.locked()
+            start = time.monotonic()
+            async with lock:
+                self.record(key, time.monotonic() - start, contended)
+                yield
+        finally:
+            self.users[key] -= 1
+            if not self.users[key]:
+                del self.users[key]
+                del self.locks[key]
+
+    def locked(self, key: Hashable) -> bool:
+        return key in self.locks and self.locks[key].locked()
+
+    def record(self, key: Hashable, wait: float, contended: bool):
+        self.stats.acquired += 1
+        if contended:
+            self.stats.contended += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+        if wait > self.slow_wait:
+            logger.warning(f"Waited {wait:.2f}s for the lock of {self.name} {key}")
+
+
+# Keyed by puzzle channel id (or thread id)
+puzzle_locks = KeyedLock("puzzle")
+# Keyed by hunt id
+hunt_locks = KeyedLock("hunt")
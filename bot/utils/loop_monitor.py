@@ -0,0 +1,144 @@
+"""
+Event loop lag monitor
+
+A heartbeat coroutine sleeps for a short interval and records how late it wakes
+up, which is how long the event loop was busy running other callbacks. A watchdog
+thread checks the heartbeat, and when the loop has been stuck for longer than the
+threshold it captures the event loop thread's stack via `sys._current_frames`,
+i.e. the synchronous call that is blocking the loop (file I/O, gspread, git, ...).
+
+Lag histogram and recent stalls can be inspected from discord via `!loop_stats`,
+and each stall is logged with its stack.
+"""
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Frames in this package identify the blocking call site, rather than library internals
+PACKAGE_DIR = str(Path(__file__).resolve().parents[1])
+
+
+@dataclass
+class Stall:
+    started: float  # time.time() when the loop stopped responding
+    stack: List[traceback.FrameSummary]
+    duration: float = 0.0  # seconds, updated once the loop responds again
+
+    @property
+    def location(self) -> str:
+        """Innermost frame of bot code in the stack, e.g. `bot/store/fs.py:42 in commit`"""
+        frames = [f for f in self.stack if f.filename.startswith(PACKAGE_DIR)] or self.stack
+        if not frames:
+            return "unknown"
+        frame = frames[-1]
+        filename = Path(frame.filename)
+        if frame.filename.startswith(PACKAGE_DIR):
+            filename = filename.relative_to(Path(PACKAGE_DIR).parent)
+        return f"{filename}:{frame.lineno} in {frame.name}"
+
+    def format_stack(self) -> str:
+        return "".join(traceback.format_list(self.stack))
+
+
+@dataclass
+class LagHistogram:
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LAG_BUCKETS_MS) + 1))
+    samples: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, lag: float):
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+        self.samples += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+
+    def buckets(self):
+        """(label, count) for each non-empty bucket"""
+        labels = [f"≤{bound}ms" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return [(label, count) for label, count in zip(labels, self.counts) if count]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, max_stalls: int = 50):
+        """
+        Args:
+            interval: seconds between heartbeats
+            threshold: seconds the loop may be unresponsive before its stack is captured
+            max_stalls: number of recent stalls to keep
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = LagHistogram()
+        self.stalls: Deque[Stall] = deque(maxlen=max_stalls)
+        # Number of stalls per blocking call site, since the monitor started
+        self.locations: Counter = Counter()
+        self.last_beat = time.monotonic()
+        self._current: Optional[Stall] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._heartbeat is not None and not self._heartbeat.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self.heartbeat())
+        self._watchdog = threading.Thread(target=self.watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.last_beat = time.monotonic()
+            lag = max(0.0, self.last_beat - before - self.interval)
+            self.histogram.add(lag)
+            stall = self._current
+            if stall is not None:
+                self._current = None
+                stall.duration = lag
+                logger.warning(f"Event loop was blocked for {lag:.3f}s at {stall.location}")
+
+    def watch(self):
+        """Watchdog thread: capture the loop thread's stack once per stall"""
+        captured_beat = None
+        while not self._stopped.wait(self.interval / 2):
+            last_beat = self.last_beat
+            blocked = time.monotonic() - last_beat - self.interval
+            if blocked < self.threshold or last_beat == captured_beat:
+                continue
+            captured_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stall = Stall(started=time.time() - blocked, stack=traceback.extract_stack(frame))
+            del frame
+            self.stalls.append(stall)
+            self.locations[stall.location] += 1
+            self._current = stall
+            logger.warning(
+                f"Event loop blocked for more than {blocked:.3f}s, currently at:\n{stall.format_stack()}"
+            )
@@ -0,0 +1,42 @@
+"""
+Progress reporting by editing a single discord message
+
+Long operations (e.g. `!cleanup`) report progress by editing one message instead
+of posting a message per step. Edits are throttled, since message edits share a
+rate limit per channel.
+"""
+import logging
+import time
+from typing import Optional, Union
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressMessage:
+    def __init__(self, message: Optional[Union[discord.Message, discord.PartialMessage]], min_interval: float = 2.0):
+        """
+        Args:
+            message: message (or partial message) to edit, None to not report progress
+            min_interval: seconds between edits, intermediate updates are skipped
+        """
+        self.message = message
+        self.min_interval = min_interval
+        self.content = None
+        self.last_edit = 0.0
+
+    async def update(self, content: str, force: bool = False):
+        """Show content, unless the message was edited less than min_interval ago (and not force)"""
+        if self.message is None or content == self.content:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_edit < self.min_interval:
+            return
+        self.content = content
+        self.last_edit = now
+        try:
+            await self.message.edit(content=content)
+        except discord.HTTPException:
+            # progress is informational, don't fail the operation over it
+            logger.exception("Unable to update progress message")
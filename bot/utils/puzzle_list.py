@@ -0,0 +1,133 @@
+"""
+Puzzle listing rendered as discord embeds, for `!list` and the hunt status board
+
+Puzzles are listed one per line, grouped in an embed field per round. Discord
+limits field values to 1024 characters, so long rounds continue in further
+fields, and embeds are split in pages once they reach 25 fields or 6000
+characters. A round is moved to the next page rather than split across pages
+whenever it fits on a single page.
+
+Rendered pages are cached per hunt by `listings`, and only rendered again once
+the hunt's puzzles changed, as tracked by the puzzle store's version counter.
+"""
+import hashlib
+import json
+from typing import Dict, List, Sequence, Tuple
+
+import discord
+
+from bot.store import PuzzleData, PuzzleJsonDb, _PuzzleJsonDb
+
+# Ref: https://discord.com/developers/docs/resources/message#embed-object-embed-limits
+MAX_FIELD_NAME = 256
+MAX_FIELD_VALUE = 1024
+MAX_FIELDS = 25
+MAX_EMBED_CHARS = 6000
+MAX_TITLE = 256
+# Room left for the page number footer, e.g. "2/3"
+FOOTER_CHARS = 16
+
+Field = Tuple[str, str]
+
+
+def puzzle_line(puzzle: PuzzleData) -> str:
+    line = f"{puzzle.channel_mention}"
+    if puzzle.puzzle_type:
+        line += f" type:{puzzle.puzzle_type}"
+    if puzzle.solution:
+        line += f" sol:**{puzzle.solution}**"
+    elif puzzle.status:
+        line += f" status:{puzzle.status}"
+    return line[:MAX_FIELD_VALUE]
+
+
+def round_fields(round_name: str, lines: Sequence[str]) -> List[Field]:
+    """Fields listing the round's puzzles, continued over several fields past MAX_FIELD_VALUE"""
+    round_name = (round_name or "-")[:MAX_FIELD_NAME]
+    fields = []
+    value = ""
+    for line in lines:
+        if value and len(value) + 1 + len(line) > MAX_FIELD_VALUE:
+            fields.append(value)
+            value = ""
+        value = f"{value}\n{line}" if value else line
+    if value:
+        fields.append(value)
+    names = [round_name] + [f"{round_name} (cont.)"[:MAX_FIELD_NAME]] * (len(fields) - 1)
+    return list(zip(names, fields))
+
+
+def group_by_round(puzzles: Sequence[PuzzleData]) -> List[Tuple[str, List[PuzzleData]]]:
+    """(round name, puzzles) in order, puzzles are expected to be sorted by round already"""
+    rounds = []
+    for puzzle in puzzles:
+        if not rounds or rounds[-1][0] != puzzle.round_name:
+            rounds.append((puzzle.round_name, []))
+        rounds[-1][1].append(puzzle)
+    return rounds
+
+
+def paginate(rounds: Sequence[List[Field]], title: str = "") -> List[List[Field]]:
+    """Split fields of each round in pages fitting in a single embed"""
+    title_chars = len(title[:MAX_TITLE]) + FOOTER_CHARS
+    pages: List[List[Field]] = [[]]
+    chars = title_chars
+
+    def size(fields):
+        return sum(len(name) + len(value) for name, value in fields)
+
+    for fields in rounds:
+        fits_own_page = len(fields) <= MAX_FIELDS and title_chars + size(fields) <= MAX_EMBED_CHARS
+        if pages[-1] and fits_own_page and (
+            len(pages[-1]) + len(fields) > MAX_FIELDS or chars + size(fields) > MAX_EMBED_CHARS
+        ):
+            # keep rounds on a single page when possible
+            pages.append([])
+            chars = title_chars
+        for field in fields:
+            if pages[-1] and (len(pages[-1]) >= MAX_FIELDS or chars + size([field]) > MAX_EMBED_CHARS):
+                pages.append([])
+                chars = title_chars
+            pages[-1].append(field)
+            chars += size([field])
+    return [page for page in pages if page]
+
+
+def render_pages(puzzles: Sequence[PuzzleData], title: str = "") -> List[discord.Embed]:
+    """Embeds listing the puzzles by round, puzzles are expected to be sorted by round already"""
+    rounds = [round_fields(name, [puzzle_line(p) for p in round_puzzles]) for name, round_puzzles in group_by_round(puzzles)]
+    pages = paginate(rounds, title=title)
+    embeds = []
+    for index, page in enumerate(pages):
+        embed = discord.Embed(title=title[:MAX_TITLE] or None)
+        for name, value in page:
+            embed.add_field(name=name, value=value, inline=True)
+        if len(pages) > 1:
+            embed.set_footer(text=f"{index + 1}/{len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+
+def embed_digest(embed: discord.Embed) -> str:
+    """Hash of the embed's content, to skip edits that wouldn't change anything"""
+    return hashlib.sha1(json.dumps(embed.to_dict(), sort_keys=True).encode()).hexdigest()
+
+
+class PuzzleListCache:
+    def __init__(self, db: _PuzzleJsonDb):
+        self.db = db
+        # (guild id, hunt id, title) -> (store version, pages)
+        self.entries: Dict[Tuple[int, int, str], Tuple[int, List[discord.Embed]]] = {}
+
+    def get(self, guild_id: int, hunt_id: int, title: str = "") -> List[discord.Embed]:
+        """Pages listing the hunt's puzzles, read and rendered only if the hunt changed since last time"""
+        version = self.db.version(guild_id, hunt_id)
+        key = (guild_id, hunt_id, title)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, render_pages(self.db.get_all(guild_id, hunt_id), title=title))
+            self.entries[key] = entry
+        return entry[1]
+
+
+listings = PuzzleListCache(PuzzleJsonDb)
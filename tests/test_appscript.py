@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def appscript(tmp_path, monkeypatch):
+    import bot.utils.appscript as module
+    (tmp_path / "addons").mkdir()
+    (tmp_path / "addons" / "Main.gs").write_text("function onOpen() {}")
+    monkeypatch.setattr(module, "addon_source", module.AddonSource(tmp_path / "addons"))
+    monkeypatch.setattr(module, "deployments", module.Deployments(tmp_path / "deployments.json"))
+    return module
+
+
+class TestAddonDeployment:
+    def test_source_hash(self, appscript, tmp_path):
+        source = appscript.addon_source
+        assert source.source == "function onOpen() {}"
+        first_hash = source.hash
+        assert not source.load()
+
+        (tmp_path / "addons" / "Main.gs").write_text("function onEdit() {}")
+        assert source.load()
+        assert source.hash != first_hash
+
+    def test_skip_unchanged_deployments(self, appscript, tmp_path, monkeypatch):
+        sent = []
+
+        class Projects:
+            def getContent(self, **kwargs):
+                return {"method": "getContent", **kwargs}
+
+            def updateContent(self, **kwargs):
+                return {"method": "updateContent", **kwargs}
+
+        class Script:
+            projects = Projects()
+
+        async def discover(api_name, api_version):
+            return Script()
+
+        async def as_service_account(request):
+            if request["method"] == "getContent":
+                return {"scriptId": request["scriptId"], "files": []}
+            sent.append(request)
+            return {"scriptId": request["scriptId"]}
+
+        monkeypatch.setattr(appscript.client, "discover", discover)
+        monkeypatch.setattr(appscript.client, "as_service_account", as_service_account)
+
+        assert asyncio.run(appscript.add_javascript("script-1")) == {"scriptId": "script-1"}
+        assert asyncio.run(appscript.add_javascript("script-1")) is None
+        assert len(sent) == 1
+        files = sent[0]["json"]["files"]
+        assert [f["name"] for f in files] == ["appsscript", "Code"]
+
+        # persisted, and redeployed once the source changes
+        assert appscript.Deployments(tmp_path / "deployments.json").get("script-1") == appscript.addon_source.hash
+        (tmp_path / "addons" / "Main.gs").write_text("function onEdit() {}")
+        appscript.addon_source.load()
+        assert asyncio.run(appscript.update_deployments()) == 1
+        assert len(sent) == 2
+
+    def test_keep_other_project_files(self, appscript, monkeypatch):
+        sent = []
+        manifest = {"name": "appsscript", "type": "JSON", "source": '{"timeZone": "Europe/London"}'}
+        helpers = {"name": "Helpers", "type": "SERVER_JS", "source": "function helper() {}"}
+
+        class Projects:
+            def getContent(self, **kwargs):
+                return {"method": "getContent", **kwargs}
+
+            def updateContent(self, **kwargs):
+                return {"method": "updateContent", **kwargs}
+
+        class Script:
+            projects = Projects()
+
+        async def discover(api_name, api_version):
+            return Script()
+
+        async def as_service_account(request):
+            if request["method"] == "getContent":
+                old_code = {"name": "Code", "type": "SERVER_JS", "source": "old", "createTime": "2020-01-01"}
+                return {"files": [manifest, old_code, helpers]}
+            sent.append(request)
+            return {}
+
+        monkeypatch.setattr(appscript.client, "discover", discover)
+        monkeypatch.setattr(appscript.client, "as_service_account", as_service_account)
+
+        asyncio.run(appscript.add_javascript("script-1"))
+        assert sent[0]["json"]["files"] == [
+            manifest,
+            helpers,
+            {"name": "Code", "type": "SERVER_JS", "source": "function onOpen() {}"},
+        ]
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot.utils.channel_index import ChannelIndex
+
+
+def make_channel(channel_id, name, channel_type=discord.ChannelType.text, category=None, guild_id=1):
+    return SimpleNamespace(
+        id=channel_id, name=name, type=channel_type, guild=SimpleNamespace(id=guild_id),
+        category_id=category.id if category is not None else None,
+    )
+
+
+class TestChannelIndex:
+    def test_lookups_follow_channel_events(self):
+        round_category = make_channel(10, "round", discord.ChannelType.category)
+        puzzle = make_channel(11, "puzzle", category=round_category)
+        voice = make_channel(12, "puzzle", discord.ChannelType.voice, category=round_category)
+        guild = SimpleNamespace(id=1, channels=[round_category, puzzle, voice], threads=[])
+
+        index = ChannelIndex()
+        channels = index(guild)
+        assert channels.category("round") is round_category
+        assert channels.find(round_category, discord.ChannelType.text, "puzzle") is puzzle
+        assert channels.find(round_category, discord.ChannelType.voice, "puzzle") is voice
+        assert channels.get(11, discord.ChannelType.voice) is None
+
+        async def events():
+            new = make_channel(13, "other", category=round_category)
+            await index.on_guild_channel_create(new)
+            assert channels.find(round_category, discord.ChannelType.text, "other") is new
+
+            # discord.py updates cached channels in place
+            solved = make_channel(20, "solved", discord.ChannelType.category)
+            await index.on_guild_channel_create(solved)
+            puzzle.category_id = solved.id
+            await index.on_guild_channel_update(puzzle, puzzle)
+            assert channels.find(round_category, discord.ChannelType.text, "puzzle") is None
+            assert channels.find(solved, discord.ChannelType.text, "puzzle") is puzzle
+            assert channels.channel_count(solved.id) == 1
+            assert channels.channel_count(round_category.id) == 2
+
+            await index.on_guild_channel_delete(voice)
+            assert channels.get(12) is None
+            assert channels.find(round_category, discord.ChannelType.voice, "puzzle") is None
+            assert channels.channel_count(round_category.id) == 1
+
+        asyncio.run(events())
+
+    def test_duplicate_names(self):
+        first = make_channel(1, "dup", discord.ChannelType.category)
+        second = make_channel(2, "dup", discord.ChannelType.category)
+        index = ChannelIndex()
+        channels = index(SimpleNamespace(id=1, channels=[first, second], threads=[]))
+        assert channels.category("dup") is first
+        channels.remove(first)
+        assert channels.category("dup") is second
+
+    def test_threads_indexed_by_parent(self):
+        round_category = make_channel(10, "round", discord.ChannelType.category)
+        meta = make_channel(11, "meta", category=round_category)
+        thread = SimpleNamespace(
+            id=12, name="puzzle", type=discord.ChannelType.public_thread, guild=SimpleNamespace(id=1),
+            parent_id=meta.id, category_id=round_category.id,
+        )
+        index = ChannelIndex()
+        channels = index(SimpleNamespace(id=1, channels=[round_category, meta], threads=[thread]))
+        assert channels.find(meta, discord.ChannelType.public_thread, "puzzle") is thread
+        assert channels.get(12) is thread
+        # threads don't count towards the category's channels
+        assert channels.channel_count(round_category.id) == 1
+
+        asyncio.run(index.on_thread_delete(thread))
+        assert channels.get(12) is None
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from aiogoogle.excs import HTTPError
+
+from bot.utils import config, gdrive, google_auth
+from bot.store import PuzzleData
+from bot.utils.google_api import GoogleApiClient
+from bot.utils.google_auth import DRIVE_SCOPES, GoogleCredentials
+from bot.utils.fake_google import FakeGoogle, write_service_account_file
+from bot.utils.google_quota import error_message
+from bot.utils.gsheet import QUICK_LINKS_TITLE, get_manager, quick_links_requests
+from bot.utils.gsheet_nexus import update_nexus
+
+
+@pytest.fixture
+def google(tmp_path, monkeypatch):
+    """Run a test coroutine against a fresh fake Google server, with the gdrive module pointed at it"""
+    monkeypatch.chdir(tmp_path)
+
+    def run(test, **kwargs):
+        async def main():
+            fake = FakeGoogle(**kwargs)
+            await fake.start()
+            write_service_account_file(tmp_path / "google_secrets.json", fake.token_uri)
+            monkeypatch.setattr(config, "google_api_url", fake.url)
+            # Fresh credentials, since the token endpoint changes with each fake server
+            monkeypatch.setattr(google_auth, "credentials", GoogleCredentials(str(tmp_path / "google_secrets.json")))
+            monkeypatch.setattr(gdrive, "client", GoogleApiClient(DRIVE_SCOPES, provider=google_auth.credentials))
+            monkeypatch.setattr(gdrive, "folder_cache", gdrive.FolderCache(tmp_path / "drive_folders.json"))
+            try:
+                await test(fake, gdrive)
+            finally:
+                await gdrive.client.close()
+                await fake.stop()
+        asyncio.run(main())
+    return run
+
+
+class TestFakeGoogle:
+    def test_folders_and_batch_renames(self, google):
+        async def test(fake, gdrive):
+            root = await gdrive.create_folder("root")
+            folder = await gdrive.get_or_create_folder("Hunt", root["id"])
+            assert folder["created"]
+            assert fake.files[folder["id"]]["parents"] == [root["id"]]
+
+            sheet = await gdrive.client.as_service_account(
+                (await gdrive.client.discover("drive", "v3")).files.create(
+                    json={"name": "Puzzle", "mimeType": "application/vnd.google-apps.spreadsheet"}
+                )
+            )
+            statuses = await gdrive.batch_rename_files({sheet["id"]: "[SOLVED: X] Puzzle", "missing": "Other"})
+            assert statuses == {sheet["id"]: 200, "missing": 404}
+            assert fake.files[sheet["id"]]["name"] == "[SOLVED: X] Puzzle"
+            # one HTTP request for both renames
+            assert fake.calls["drive.files.update"] == 2
+
+        google(test)
+
+    def test_quick_links_single_batch_update(self, google):
+        async def test(fake, gdrive):
+            sheet = fake.create_file({}, {"name": "Puzzle", "mimeType": "application/vnd.google-apps.spreadsheet"})
+            requests = quick_links_requests([("Hunt URL", "https://hunt")])
+            await gdrive.batch_update_spreadsheet(sheet["id"], requests)
+            assert fake.sheet_values(sheet["id"], QUICK_LINKS_TITLE) == [["Hunt URL", "https://hunt"]]
+            assert fake.calls["sheets.spreadsheets.batchUpdate"] == 1
+
+            # batch updates are atomic, and retried ones fail
+            with pytest.raises(HTTPError) as exc_info:
+                await gdrive.batch_update_spreadsheet(sheet["id"], requests)
+            assert "already exists" in error_message(exc_info.value)
+
+        google(test)
+
+    def test_nexus_drops_deleted_puzzles_after_restart(self, google):
+        def puzzles(count):
+            return [PuzzleData(name=f"puzzle-{i}", guild_id=1, hunt_id=2, round_id=3, channel_id=i) for i in range(count)]
+
+        async def test(fake, gdrive):
+            sheet = fake.create_file({}, {"name": "Nexus", "mimeType": "application/vnd.google-apps.spreadsheet"})
+            agcm = get_manager()
+            await update_nexus(agcm, sheet["id"], puzzles(3))
+            assert len(fake.sheet_values(sheet["id"])) == 4
+            await update_nexus(agcm, sheet["id"], puzzles(3))
+
+            # e.g. after a restart, nothing is remembered about the previous update
+            await update_nexus(get_manager(), sheet["id"], puzzles(1))
+            values = fake.sheet_values(sheet["id"])
+            assert [row[0] for row in values] == ["Name", "puzzle-0"]
+            # resized only when the number of puzzles changed
+            assert fake.calls["sheets.spreadsheets.batchUpdate"] == 2
+
+        google(test)
+
+    def test_rate_limits_are_retried(self, google, monkeypatch):
+        from bot.utils.google_quota import quota
+        monkeypatch.setattr(quota, "base_delay", 0.01)
+
+        async def test(fake, gdrive):
+            root = await gdrive.create_folder("root")
+            for index in range(5):
+                await gdrive.create_folder(f"folder-{index}", root["id"])
+            assert fake.rate_limited > 0
+            assert len(fake.list_files({"q": f"'{root['id']}' in parents"}, {})["files"]) == 5
+
+        google(test, rate_limit_probability=0.3, seed=1)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.fixture
+def gdrive(tmp_path, monkeypatch):
+    import bot.utils.gdrive
+    monkeypatch.setattr(bot.utils.gdrive, "folder_cache", bot.utils.gdrive.FolderCache(tmp_path / "drive_folders.json"))
+    return bot.utils.gdrive
+
+
+class TestFolderCache:
+    def test_persists_folders(self, gdrive, tmp_path):
+        cache = gdrive.FolderCache(tmp_path / "cache" / "folders.json")
+        assert cache.get("round", "hunt") is None
+        cache.set("round", "hunt", "folder-1")
+
+        reloaded = gdrive.FolderCache(tmp_path / "cache" / "folders.json")
+        assert reloaded.get("round", "hunt") == "folder-1"
+        with (tmp_path / "cache" / "folders.json").open() as fp:
+            assert json.load(fp) == {"hunt": {"round": "folder-1"}}
+
+    def test_get_or_create_folder_single_flight(self, gdrive, monkeypatch):
+        calls = {"list": 0, "create": 0}
+
+        async def list_child_folders(parent_id):
+            calls["list"] += 1
+            await asyncio.sleep(0.01)
+            return [{"id": "existing", "name": "old-round"}]
+
+        async def create_folder(name, parent_id=None):
+            calls["create"] += 1
+            await asyncio.sleep(0.01)
+            return {"id": f"new-{name}"}
+
+        monkeypatch.setattr(gdrive, "list_child_folders", list_child_folders)
+        monkeypatch.setattr(gdrive, "create_folder", create_folder)
+
+        async def run():
+            racing = await asyncio.gather(
+                gdrive.get_or_create_folder("new-round", "hunt"),
+                gdrive.get_or_create_folder("new-round", "hunt"),
+            )
+            existing = await gdrive.get_or_create_folder("old-round", "hunt")
+            again = await gdrive.get_or_create_folder("new-round", "hunt")
+            return racing, existing, again
+
+        racing, existing, again = asyncio.run(run())
+        assert [r["id"] for r in racing] == ["new-new-round", "new-new-round"]
+        assert sorted(r["created"] for r in racing) == [False, True]
+        assert existing == {"id": "existing", "name": "old-round", "created": False}
+        assert again["created"] is False
+        assert calls == {"list": 1, "create": 1}
+
+    def test_get_or_create_folder_leader_cancelled(self, gdrive, monkeypatch):
+        created = []
+
+        async def list_child_folders(parent_id):
+            await asyncio.sleep(0.01)
+            return []
+
+        async def create_folder(name, parent_id=None):
+            created.append(name)
+            await asyncio.sleep(0.01)
+            return {"id": f"new-{name}"}
+
+        monkeypatch.setattr(gdrive, "list_child_folders", list_child_folders)
+        monkeypatch.setattr(gdrive, "create_folder", create_folder)
+
+        async def run():
+            leader = asyncio.create_task(gdrive.get_or_create_folder("new-round", "hunt"))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(gdrive.get_or_create_folder("new-round", "hunt"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            # the waiter isn't cancelled along with it, and creates the folder itself
+            return await waiter
+
+        result = asyncio.run(run())
+        assert result == {"id": "new-new-round", "name": "new-round", "created": True}
+        assert created == ["new-round"]
+
+    def test_get_or_create_folder_error_shared(self, gdrive, monkeypatch):
+        async def list_child_folders(parent_id):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend error")
+
+        monkeypatch.setattr(gdrive, "list_child_folders", list_child_folders)
+
+        async def run():
+            return await asyncio.gather(
+                gdrive.get_or_create_folder("new-round", "hunt"),
+                gdrive.get_or_create_folder("new-round", "hunt"),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        assert gdrive._pending_folders == {}
+
+
+class TestSharing:
+    def test_is_shared_with_anyone(self, gdrive):
+        owner = {"type": "user", "role": "owner"}
+        assert not gdrive.is_shared_with_anyone([owner])
+        assert not gdrive.is_shared_with_anyone([owner, {"type": "anyone", "role": "reader"}])
+        assert gdrive.is_shared_with_anyone([owner, {"type": "anyone", "role": "writer"}])
+
+    def test_batch_find_unshared_files(self, gdrive, monkeypatch):
+        async def batch(*requests):
+            return [
+                (200, {"permissions": [{"type": "anyone", "role": "writer"}]}),
+                (200, {"permissions": [{"type": "user", "role": "owner"}]}),
+                (404, None),
+            ]
+
+        async def discover(api_name, api_version):
+            class Permissions:
+                def list(self, **kwargs):
+                    return kwargs
+
+            class Drive:
+                permissions = Permissions()
+            return Drive()
+
+        monkeypatch.setattr(gdrive.client, "batch", batch)
+        monkeypatch.setattr(gdrive.client, "discover", discover)
+        unshared = asyncio.run(gdrive.batch_find_unshared_files(["shared", "unshared", "deleted"]))
+        assert unshared == ["unshared"]
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from aiogoogle.models import Request
+
+from bot.utils.google_api import GoogleApiClient, decode_batch, encode_batch
+
+
+class TestGoogleApiClient:
+    def test_discover_from_disk_cache(self, tmp_path):
+        (tmp_path / "discovery").mkdir()
+        with (tmp_path / "discovery" / "drive_v3.json").open("w") as fp:
+            json.dump({
+                "name": "drive",
+                "version": "v3",
+                "rootUrl": "https://www.googleapis.com/",
+                "servicePath": "drive/v3/",
+                "resources": {},
+                "parameters": {},
+            }, fp)
+
+        async def discover_twice():
+            client = GoogleApiClient(["https://www.googleapis.com/auth/drive"], cache_dir=tmp_path)
+            try:
+                first = await client.discover("drive", "v3")
+                second = await client.discover("drive", "v3")
+            finally:
+                await client.close()
+            return first, second
+
+        first, second = asyncio.run(discover_twice())
+        assert first is second
+        assert first.discovery_document["name"] == "drive"
+
+    def test_encode_decode_batch(self):
+        requests = [
+            Request(method="PATCH", url="https://www.googleapis.com/drive/v3/files/a?fields=id", json={"name": "A"}),
+            Request(method="PATCH", url="https://www.googleapis.com/drive/v3/files/b", json={"name": "B"}),
+        ]
+        body = encode_batch(requests, "xyz")
+        assert body.startswith("--xyz\r\nContent-Type: application/http\r\nContent-ID: <item0>\r\n\r\n")
+        assert "PATCH /drive/v3/files/a?fields=id HTTP/1.1\r\n" in body
+        assert body.endswith('{"name": "B"}\r\n--xyz--\r\n')
+
+        response = (
+            "--batch_abc\r\n"
+            "Content-Type: application/http\r\n"
+            "Content-ID: <response-item1>\r\n\r\n"
+            "HTTP/1.1 429 Too Many Requests\r\n"
+            "Content-Type: application/json\r\n\r\n"
+            '{"error": {"code": 429}}\r\n'
+            "--batch_abc\r\n"
+            "Content-Type: application/http\r\n"
+            "Content-ID: <response-item0>\r\n\r\n"
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/json\r\n\r\n"
+            '{"id": "a", "name": "A"}\r\n'
+            "--batch_abc--\r\n"
+        )
+        results = decode_batch("multipart/mixed; boundary=batch_abc", response, 2)
+        assert results == [(200, {"id": "a", "name": "A"}), (429, {"error": {"code": 429}})]
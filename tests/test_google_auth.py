@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+
+import pytest
+
+from bot.utils import config, gsheet
+from bot.utils.fake_google import FakeGoogle, write_service_account_file
+from bot.utils.google_api import GoogleApiClient
+from bot.utils.google_auth import DRIVE_SCOPES, SCRIPT_SCOPES, GoogleCredentials
+
+
+class TestGoogleCredentials:
+    def test_loads_secrets_lazily(self, tmp_path):
+        credentials = GoogleCredentials(str(tmp_path / "google_secrets.json"))
+        with pytest.raises(FileNotFoundError):
+            credentials.get()
+
+        write_service_account_file(tmp_path / "google_secrets.json", "http://localhost/token")
+        assert credentials.get() is credentials.get(list(DRIVE_SCOPES))
+        assert credentials.get(SCRIPT_SCOPES) is not credentials.get()
+
+    def test_shared_with_gspread(self, tmp_path, monkeypatch):
+        credentials = GoogleCredentials(str(tmp_path / "google_secrets.json"))
+        write_service_account_file(tmp_path / "google_secrets.json", "http://localhost/token")
+        monkeypatch.setattr(gsheet.google_auth, "credentials", credentials)
+        monkeypatch.setattr(config, "owner_email", None)
+        assert gsheet.get_credentials() is credentials.get(DRIVE_SCOPES)
+
+    def test_token_refreshed_once(self, tmp_path, monkeypatch):
+        async def main():
+            fake = FakeGoogle()
+            await fake.start()
+            monkeypatch.setattr(config, "google_api_url", fake.url)
+            write_service_account_file(tmp_path / "google_secrets.json", fake.token_uri)
+            credentials = GoogleCredentials(str(tmp_path / "google_secrets.json"), refresh_margin=300)
+            client = GoogleApiClient(DRIVE_SCOPES, cache_dir=tmp_path, provider=credentials)
+            try:
+                drive_v3 = await client.discover("drive", "v3")
+                await asyncio.gather(*[
+                    client.as_service_account(drive_v3.files.create(json={"name": f"file-{i}"}))
+                    for i in range(5)
+                ])
+                assert fake.calls["oauth2.token"] == 1
+
+                # Tokens about to expire are refreshed ahead of time by the background refresh
+                creds = credentials.get(DRIVE_SCOPES)
+                creds.expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+                assert credentials.next_refresh_delay() == 1.0
+                credentials.start_refresh()
+                await asyncio.sleep(0.5)
+                credentials.stop_refresh()
+                assert fake.calls["oauth2.token"] == 2
+                assert credentials.next_refresh_delay() == 60.0
+            finally:
+                await client.close()
+                await fake.stop()
+
+        asyncio.run(main())
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from aiogoogle.excs import HTTPError
+from aiogoogle.models import Response
+
+from bot.utils.google_quota import GoogleQuota, TokenBucket, is_retryable
+
+
+def http_error(status_code):
+    return HTTPError("error", res=Response(status_code=status_code))
+
+
+class TestGoogleQuota:
+    def test_is_retryable(self):
+        assert is_retryable(http_error(429))
+        assert is_retryable(http_error(503))
+        assert not is_retryable(http_error(404))
+        assert not is_retryable(ValueError())
+
+    def test_token_bucket_throttles_after_burst(self):
+        async def acquire_all():
+            bucket = TokenBucket(rate=100.0, capacity=2)
+            return [await bucket.acquire() for _ in range(3)]
+
+        waits = asyncio.run(acquire_all())
+        assert waits[:2] == [0.0, 0.0]
+        assert waits[2] > 0
+
+    def test_retries_rate_limited_calls(self):
+        quota = GoogleQuota(base_delay=0.001)
+        responses = [http_error(429), http_error(500), "ok"]
+
+        async def flaky():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        assert asyncio.run(quota.call("sheets", "write", flaky)) == "ok"
+        stats = quota.get_stats(("sheets", "write"))
+        assert (stats.requests, stats.rate_limited, stats.server_errors, stats.retries) == (3, 1, 1, 2)
+        assert stats.failures == 0
+
+    def test_does_not_retry_client_errors(self):
+        quota = GoogleQuota(base_delay=0.001)
+
+        async def not_found():
+            raise http_error(404)
+
+        with pytest.raises(HTTPError):
+            asyncio.run(quota.call("drive", "read", not_found))
+        stats = quota.get_stats(("drive", "read"))
+        assert (stats.requests, stats.retries, stats.failures) == (1, 0, 1)
+
+    def test_gives_up_after_max_retries(self):
+        quota = GoogleQuota(max_retries=2, base_delay=0.001)
+
+        async def unavailable():
+            raise http_error(503)
+
+        with pytest.raises(HTTPError):
+            asyncio.run(quota.call("drive", "write", unavailable))
+        assert quota.get_stats(("drive", "write")).requests == 3
@@ -0,0 +1,24 @@
+from bot.utils.gsheet import (
+    BLANK_SHEET_TITLE, QUICK_LINKS_SHEET_ID, QUICK_LINKS_TITLE, clear_spreadsheet_requests, quick_links_requests,
+)
+
+
+class TestBatchUpdateRequests:
+    def test_quick_links_requests(self):
+        requests = quick_links_requests([("Hunt URL", "https://hunt"), ("", None)], column_width=500)
+        add_sheet, update_cells, column_width = requests
+
+        assert add_sheet["addSheet"]["properties"]["title"] == QUICK_LINKS_TITLE
+        # later requests refer to the sheet added in the same batch
+        assert update_cells["updateCells"]["start"]["sheetId"] == QUICK_LINKS_SHEET_ID
+        assert column_width["updateDimensionProperties"]["range"]["sheetId"] == QUICK_LINKS_SHEET_ID
+        assert update_cells["updateCells"]["rows"] == [
+            {"values": [{"userEnteredValue": {"stringValue": "Hunt URL"}}, {"userEnteredValue": {"stringValue": "https://hunt"}}]},
+            {"values": [{"userEnteredValue": {"stringValue": ""}}, {"userEnteredValue": {"stringValue": ""}}]},
+        ]
+        assert column_width["updateDimensionProperties"]["properties"] == {"pixelSize": 500}
+
+    def test_clear_spreadsheet_requests(self):
+        requests = clear_spreadsheet_requests([0, 123])
+        assert requests[0]["addSheet"]["properties"] == {"title": BLANK_SHEET_TITLE, "index": 0}
+        assert requests[1:] == [{"deleteSheet": {"sheetId": 0}}, {"deleteSheet": {"sheetId": 123}}]
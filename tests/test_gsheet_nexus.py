@@ -0,0 +1,44 @@
+import datetime
+
+from bot.store.puzzle_data import PuzzleData
+from bot.utils.gsheet_nexus import COLUMNS, a1_range, build_nexus_values
+
+
+class TestGsheetNexus:
+    def dummy_data(self, name="dummy-puzzle", google_sheet_id=""):
+        return PuzzleData(
+            name=name,
+            hunt_name="dummy-hunt",
+            hunt_id=3,
+            round_name="dummy-round",
+            round_id=4,
+            guild_id=1,
+            channel_mention="#dummy-puzzle",
+            channel_id=2,
+            google_sheet_id=google_sheet_id,
+            start_time=datetime.datetime(2020, 1, 1),
+        )
+
+    def test_build_values(self):
+        values = build_nexus_values([self.dummy_data(google_sheet_id="abc"), self.dummy_data(name="p2")])
+        assert len(values) == 3
+        assert all(len(row) == len(COLUMNS) for row in values)
+        assert values[0][0] == "Name"
+        assert values[0][COLUMNS.index("google_sheet_url")] == "Google Sheet Url"
+
+        row = dict(zip(COLUMNS, values[1]))
+        assert row["name"] == "dummy-puzzle"
+        assert row["google_sheet_url"] == "https://docs.google.com/spreadsheets/d/abc"
+        assert row["data_path"] == "1/3/4/2.json"
+        assert row["solve_time"] == ""
+        assert dict(zip(COLUMNS, values[2]))["google_sheet_url"] == ""
+
+    def test_build_values_pads_stale_rows(self):
+        values = build_nexus_values([self.dummy_data()], min_rows=4)
+        assert len(values) == 4
+        assert values[3] == [""] * len(COLUMNS)
+
+    def test_a1_range(self):
+        assert a1_range(3) == "A1:M3"
+        assert a1_range(1, num_cols=26) == "A1:Z1"
+        assert a1_range(2, num_cols=28) == "A1:AB2"
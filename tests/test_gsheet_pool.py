@@ -0,0 +1,20 @@
+from bot.utils.gsheet_pool import SpreadsheetPool
+
+
+class TestSpreadsheetPool:
+    def test_claim_and_release(self, tmp_path):
+        pool = SpreadsheetPool(tmp_path / "pool.json")
+        assert pool.claim("hunt") is None
+
+        pool.add("hunt", "sheet-1")
+        pool.add("hunt", "sheet-2")
+        pool.add("other-hunt", "sheet-3")
+        assert pool.size("hunt") == 2
+
+        # persisted across instances
+        pool = SpreadsheetPool(tmp_path / "pool.json")
+        assert pool.claim("hunt") == "sheet-1"
+        assert pool.size("hunt") == 1
+        assert pool.release("hunt") == ["sheet-2"]
+        assert pool.release("hunt") == []
+        assert SpreadsheetPool(tmp_path / "pool.json").size("other-hunt") == 1
@@ -0,0 +1,127 @@
+import asyncio
+
+from bot.store import _JobDb
+from bot.store.fs import FileJobDb
+from bot.utils.job_queue import JobQueue, JobRetry
+
+
+async def wait_for(condition, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+class TestJobQueue:
+    def test_enqueue_is_idempotent_and_persisted(self, tmp_path):
+        db = FileJobDb(dir_path=tmp_path)
+        queue = JobQueue(db)
+        queue.enqueue("sheet", key="sheet-1", payload={"channel_id": 1})
+        queue.enqueue("sheet", key="sheet-1", payload={"channel_id": 2})
+        assert [job.payload for job in db.get_all()] == [{"channel_id": 1}]
+
+        # a new queue (e.g. after restart) picks the job up again
+        resumed = JobQueue(db)
+        ran = []
+
+        async def handler(job):
+            ran.append(job.key)
+
+        async def run():
+            resumed.register("sheet", handler)
+            resumed.start()
+            await wait_for(lambda: ran and not db.get_all())
+            await resumed.stop()
+
+        asyncio.run(run())
+        assert ran == ["sheet-1"]
+
+    def test_retry_then_give_up(self, tmp_path):
+        db = FileJobDb(dir_path=tmp_path)
+        attempts = []
+        given_up = []
+
+        async def handler(job):
+            attempts.append(job.key)
+            raise JobRetry("not yet")
+
+        async def give_up(job, error):
+            given_up.append((job.key, error))
+
+        async def run():
+            queue = JobQueue(db, base_retry_delay=0.01, max_retry_delay=0.01)
+            queue.register("sheet", handler, max_attempts=3, on_give_up=give_up)
+            queue.enqueue("sheet", key="sheet-1")
+            queue.start()
+            await wait_for(lambda: given_up)
+            await queue.stop()
+            return queue
+
+        queue = asyncio.run(run())
+        assert len(attempts) == 3
+        assert given_up == [("sheet-1", "JobRetry: not yet")]
+        assert [job.key for job in queue.failed()] == ["sheet-1"]
+        assert db.get("sheet-1").status == "failed"
+
+    def test_batch_handler_failed_keys(self, tmp_path):
+        db = FileJobDb(dir_path=tmp_path)
+        batches = []
+
+        async def handler(jobs):
+            batches.append(sorted(job.key for job in jobs))
+            return ["rename-2"] if len(batches) == 1 else []
+
+        async def run():
+            queue = JobQueue(db, base_retry_delay=0.01, max_retry_delay=0.01)
+            queue.register_batch("rename", handler)
+            for i in range(3):
+                queue.enqueue("rename", key=f"rename-{i}")
+            queue.start()
+            await wait_for(lambda: not db.get_all())
+            await queue.stop()
+
+        asyncio.run(run())
+        assert batches == [["rename-0", "rename-1", "rename-2"], ["rename-2"]]
+
+    def test_cancel_running_job(self, tmp_path):
+        db = FileJobDb(dir_path=tmp_path)
+        started = []
+
+        async def handler(job):
+            started.append(job.key)
+            await asyncio.sleep(10)
+
+        async def run():
+            queue = JobQueue(db)
+            queue.register("cleanup", handler)
+            queue.enqueue("cleanup", key="cleanup-1")
+            queue.start()
+            await wait_for(lambda: started)
+            assert queue.cancel("cleanup-1")
+            await wait_for(lambda: not queue.running)
+            assert not queue.cancel("cleanup-1")
+            await queue.stop()
+            return queue
+
+        queue = asyncio.run(run())
+        assert not queue.pending()
+        assert db.get_all() == []
+
+    def test_runs_without_persisted_jobs(self):
+        # e.g. with a storage backend that doesn't persist jobs
+        done = []
+
+        async def handler(job):
+            done.append(job.key)
+
+        async def run():
+            queue = JobQueue(_JobDb())
+            queue.register("sheet", handler)
+            queue.start()
+            queue.enqueue("sheet", key="sheet-1")
+            await wait_for(lambda: done)
+            await queue.stop()
+
+        asyncio.run(run())
+        assert done == ["sheet-1"]
@@ -0,0 +1,62 @@
+import asyncio
+
+from bot.utils.keyed_lock import KeyedLock
+
+
+class TestKeyedLock:
+    def test_serializes_same_key(self):
+        locks = KeyedLock("puzzle")
+        events = []
+
+        async def update(key, name):
+            async with locks(key):
+                events.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} end")
+
+        async def run():
+            await asyncio.gather(update(1, "a"), update(1, "b"))
+
+        asyncio.run(run())
+        assert events == ["a start", "a end", "b start", "b end"]
+        assert locks.stats.acquired == 2
+        assert locks.stats.contended == 1
+        assert locks.stats.max_wait > 0
+        # unused locks are dropped
+        assert locks.locks == {}
+
+    def test_other_keys_run_in_parallel(self):
+        locks = KeyedLock("puzzle")
+        events = []
+
+        async def update(key):
+            async with locks(key):
+                events.append(f"{key} start")
+                await asyncio.sleep(0.01)
+                events.append(f"{key} end")
+
+        async def run():
+            await asyncio.gather(update(1), update(2))
+
+        asyncio.run(run())
+        assert events == ["1 start", "2 start", "1 end", "2 end"]
+        assert locks.stats.contended == 0
+
+    def test_released_on_error(self):
+        locks = KeyedLock("hunt")
+
+        async def fail():
+            async with locks(1):
+                raise ValueError("oops")
+
+        async def run():
+            try:
+                await fail()
+            except ValueError:
+                pass
+            assert not locks.locked(1)
+            async with locks(1):
+                assert locks.locked(1)
+
+        asyncio.run(run())
+        assert locks.locks == {}
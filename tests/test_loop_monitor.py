@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from bot.utils.loop_monitor import LagHistogram, LoopMonitor
+
+
+def block_event_loop(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    def test_histogram(self):
+        histogram = LagHistogram()
+        for lag in (0.001, 0.003, 0.2, 10.0):
+            histogram.add(lag)
+        assert histogram.buckets() == [("≤5ms", 2), ("≤250ms", 1), (">5000ms", 1)]
+        assert histogram.max == 10.0
+
+    def test_captures_blocking_call(self):
+        async def main():
+            monitor = LoopMonitor(interval=0.01, threshold=0.1)
+            monitor.start()
+            try:
+                await asyncio.sleep(0.05)
+                block_event_loop(0.3)
+                await asyncio.sleep(0.05)
+            finally:
+                monitor.stop()
+            return monitor
+
+        monitor = asyncio.run(main())
+        assert len(monitor.stalls) == 1
+        stall = monitor.stalls[0]
+        # No bot frames in the stack, so the innermost frame is the blocking call
+        assert stall.location.endswith("in block_event_loop")
+        assert stall.duration >= 0.25
+        assert monitor.histogram.max >= 0.25
+        assert monitor.histogram.samples > 1
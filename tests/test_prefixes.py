@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.database.prefixes import GinoPrefixStore, MemoryPrefixStore, SqlitePrefixStore, prefix_store
+from bot.utils import config, get_guild_prefix
+
+
+class TestPrefixStore:
+    def test_store_from_url(self, tmp_path):
+        store = prefix_store(f"sqlite:///{tmp_path}/guilds.sqlite3")
+        assert isinstance(store, SqlitePrefixStore)
+        assert store.path == f"{tmp_path}/guilds.sqlite3"
+        assert isinstance(prefix_store("postgresql://localhost/postgres"), GinoPrefixStore)
+
+    def test_without_database(self):
+        store = prefix_store(None)
+        assert isinstance(store, MemoryPrefixStore)
+
+        async def run():
+            await store.setup()
+            await store.set(1, "?")
+            return await store.load_all()
+
+        assert asyncio.run(run()) == {}
+
+    def test_sqlite_write_through_and_preload(self, tmp_path):
+        path = str(tmp_path / "guilds.sqlite3")
+
+        async def write():
+            store = SqlitePrefixStore(path)
+            await store.setup()
+            assert await store.load_all() == {}
+            await store.set(1, "?")
+            await store.set(2, "$")
+            await store.set(1, ">")
+
+        async def preload():
+            # e.g. after a restart
+            store = SqlitePrefixStore(path)
+            await store.setup()
+            return await store.load_all()
+
+        asyncio.run(write())
+        assert asyncio.run(preload()) == {1: ">", 2: "$"}
+
+    def test_guild_prefix_from_preloaded_data(self):
+        bot = SimpleNamespace(guild_data={1: {"prefix": ">"}})
+        assert get_guild_prefix(bot, 1) == ">"
+        assert get_guild_prefix(bot, 2) == config.prefix
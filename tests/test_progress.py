@@ -0,0 +1,27 @@
+import asyncio
+
+from bot.utils.progress import ProgressMessage
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, content):
+        self.edits.append(content)
+
+
+class TestProgressMessage:
+    def test_throttles_edits(self):
+        message = FakeMessage()
+        progress = ProgressMessage(message, min_interval=60.0)
+
+        async def run():
+            for i in range(1, 6):
+                await progress.update(f"deleted {i}/5")
+            await progress.update("deleted 5/5", force=True)
+            await progress.update("done", force=True)
+            await progress.update("done", force=True)
+
+        asyncio.run(run())
+        assert message.edits == ["deleted 1/5", "deleted 5/5", "done"]
@@ -0,0 +1,99 @@
+import datetime
+
+from bot.store import PuzzleData
+from bot.store.fs import FilePuzzleJsonDb
+from bot.utils.puzzle_list import (
+    MAX_EMBED_CHARS, MAX_FIELD_VALUE, MAX_FIELDS, PuzzleListCache, embed_digest, paginate, render_pages, round_fields,
+)
+
+
+def make_puzzle(index, round_name="round-1", **kwargs):
+    return PuzzleData(
+        name=f"puzzle-{index}",
+        round_name=round_name,
+        guild_id=1,
+        hunt_id=2,
+        round_id=3,
+        channel_id=100 + index,
+        channel_mention=f"<#{100 + index}>",
+        start_time=datetime.datetime(2020, 1, 1),
+        **kwargs,
+    )
+
+
+class TestPuzzleList:
+    def test_render_groups_by_round(self):
+        puzzles = [
+            make_puzzle(1, status="extracting"),
+            make_puzzle(2, puzzle_type="meta", solution="ANSWER"),
+            make_puzzle(3, round_name="round-2"),
+        ]
+        embeds = render_pages(puzzles, title="Hunt puzzles")
+        assert len(embeds) == 1
+        fields = embeds[0].fields
+        assert [field.name for field in fields] == ["round-1", "round-2"]
+        assert fields[0].value == "<#101> status:extracting\n<#102> type:meta sol:**ANSWER**"
+        assert embeds[0].footer.text is None
+
+    def test_long_round_continues_in_fields(self):
+        lines = [f"<#{i}> status:" + "x" * 40 for i in range(100)]
+        fields = round_fields("round-1", lines)
+        assert len(fields) > 1
+        assert fields[1][0] == "round-1 (cont.)"
+        assert all(len(value) <= MAX_FIELD_VALUE for _, value in fields)
+        assert "\n".join(value for _, value in fields).split("\n") == lines
+
+    def test_paginate_within_embed_limits(self):
+        rounds = [round_fields(f"round-{r}", [f"<#{i}> " + "x" * 60 for i in range(30)]) for r in range(10)]
+        pages = paginate(rounds, title="Hunt puzzles")
+        assert len(pages) > 1
+        for page in pages:
+            assert len(page) <= MAX_FIELDS
+            assert sum(len(name) + len(value) for name, value in page) <= MAX_EMBED_CHARS
+        # rounds fitting on a page aren't split across pages
+        first_page_of_round = {}
+        for index, page in enumerate(pages):
+            for name, _ in page:
+                assert first_page_of_round.setdefault(name.replace(" (cont.)", ""), index) == index
+
+    def test_digest_changes_with_content(self):
+        before = render_pages([make_puzzle(1)])[0]
+        after = render_pages([make_puzzle(1, status="solved")])[0]
+        assert embed_digest(before) == embed_digest(render_pages([make_puzzle(1)])[0])
+        assert embed_digest(before) != embed_digest(after)
+
+
+class TestPuzzleListeners:
+    def test_commit_and_delete_notify(self, tmp_path):
+        (tmp_path / "1").mkdir()
+        db = FilePuzzleJsonDb(dir_path=tmp_path)
+        seen = []
+        db.add_listener(lambda puzzle: seen.append(puzzle.name))
+        puzzle = make_puzzle(1)
+        db.commit(puzzle)
+        db.delete(puzzle)
+        assert seen == ["puzzle-1", "puzzle-1"]
+
+
+class TestPuzzleListCache:
+    def test_renders_again_only_after_changes(self, tmp_path):
+        (tmp_path / "1").mkdir()
+        db = FilePuzzleJsonDb(dir_path=tmp_path)
+        db.commit(make_puzzle(1))
+        reads = []
+        get_all = db.get_all
+        db.get_all = lambda *args: reads.append(args) or get_all(*args)
+        cache = PuzzleListCache(db)
+
+        first = cache.get(1, 2)
+        assert cache.get(1, 2) is first
+        assert len(reads) == 1
+
+        db.commit(make_puzzle(1, status="solved"))
+        assert "status:solved" in cache.get(1, 2)[0].fields[0].value
+        assert len(reads) == 2
+        # other hunts are unaffected
+        assert cache.get(1, 5) == []
+        db.commit(make_puzzle(2))
+        cache.get(1, 5)
+        assert len(reads) == 3
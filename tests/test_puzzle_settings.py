@@ -0,0 +1,24 @@
+from google.cloud import datastore
+
+from bot.store.puzzle_settings import GuildSettings
+
+
+class TestGuildSettings:
+    def test_from_entity_without_newer_settings(self):
+        # Guild saved before the voice idle, sheet pool and thread settings existed
+        entity = datastore.Entity(key=datastore.Key("Guild", 1, project="test"))
+        entity.update({
+            "guild_name": "guild",
+            "discord_bot_channel": "",
+            "discord_bot_emoji": ":ladder: :dog:",
+            "discord_use_voice_channels": False,
+            "drive_parent_id": "",
+            "drive_resources_id": "",
+            "past_hunts_category_id": 0,
+            "drive_starter_sheet_id": "",
+        })
+        settings = GuildSettings.from_entity(entity)
+        assert settings.guild_id == 1
+        assert settings.discord_voice_idle_minutes == 30
+        assert settings.drive_sheet_pool_size == 0
+        assert settings.discord_puzzle_threads == ""
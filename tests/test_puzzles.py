@@ -0,0 +1,412 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import bot.base_cog as base_cog
+import bot.cogs.puzzles as puzzles_module
+from bot.cogs.puzzles import Puzzles
+from bot.store import HuntSettings, PuzzleData
+from bot.store.fs import FileGuildSettingsDb, FilePuzzleJsonDb
+from bot.utils.channel_index import ChannelIndex
+
+
+class FakeChannel:
+    def __init__(self, channel_id, name, channel_type=discord.ChannelType.text, category=None, guild=None, parent=None):
+        self.id = channel_id
+        self.name = name
+        self.type = channel_type
+        self.category = category
+        self.category_id = category.id if category is not None else None
+        self.parent_id = parent.id if parent is not None else None
+        self.guild = guild
+        self.members = []
+        self.deleted = False
+        self.archived = False
+        self.locked = False
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def delete(self, reason=None):
+        self.deleted = True
+
+    async def edit(self, reason=None, **kwargs):
+        self.__dict__.update(kwargs)
+        if "category" in kwargs:
+            self.category_id = kwargs["category"].id
+
+    async def create_thread(self, name, content=None, reason=None, **kwargs):
+        thread = FakeChannel(
+            200 + len(self.guild.threads), name, discord.ChannelType.public_thread,
+            category=self.category, guild=self.guild, parent=self,
+        )
+        self.guild.threads.append(thread)
+        if self.type is discord.ChannelType.forum:
+            return SimpleNamespace(thread=thread, message=None)
+        return thread
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.channels = []
+        self.threads = []
+
+    def add(self, *args, **kwargs):
+        channel = FakeChannel(*args, guild=self, **kwargs)
+        self.channels.append(channel)
+        return channel
+
+    @property
+    def categories(self):
+        return [channel for channel in self.channels if channel.type is discord.ChannelType.category]
+
+    async def create_category(self, name, overwrites=None, position=0):
+        return self.add(100 + len(self.channels), name, discord.ChannelType.category)
+
+    async def create_text_channel(self, name, category=None, **kwargs):
+        return self.add(100 + len(self.channels), name, category=category)
+
+    async def create_voice_channel(self, name, category=None, **kwargs):
+        return self.add(100 + len(self.channels), name, discord.ChannelType.voice, category=category)
+
+    async def create_forum(self, name, category=None, **kwargs):
+        return self.add(100 + len(self.channels), name, discord.ChannelType.forum, category=category)
+
+    async def fetch_channel(self, channel_id):
+        for channel in self.channels + self.threads:
+            if channel.id == channel_id:
+                return channel
+        raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Channel")
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    (tmp_path / "1").mkdir()
+    puzzle_db = FilePuzzleJsonDb(dir_path=tmp_path)
+    settings_db = FileGuildSettingsDb(dir_path=tmp_path)
+    for module in (puzzles_module, base_cog):
+        monkeypatch.setattr(module, "PuzzleJsonDb", puzzle_db)
+        monkeypatch.setattr(module, "GuildSettingsDb", settings_db)
+    return SimpleNamespace(puzzles=puzzle_db, settings=settings_db)
+
+
+@pytest.fixture
+def hunt(stores):
+    """Guild with a hunt, a round and a puzzle with a voice channel"""
+    guild = FakeGuild()
+    hunt_category = guild.add(5, "hunt", discord.ChannelType.category)
+    round_category = guild.add(10, "round", discord.ChannelType.category)
+    text_channel = guild.add(11, "puzzle", category=round_category)
+    voice_channel = guild.add(12, "puzzle", discord.ChannelType.voice, category=round_category)
+
+    settings = stores.settings.get(guild.id)
+    settings.category_mapping[round_category.id] = hunt_category.id
+    settings.hunt_settings[hunt_category.id] = HuntSettings(hunt_id=hunt_category.id, guild_id=guild.id, hunt_name="hunt")
+    stores.settings.commit(settings)
+    puzzle = PuzzleData(
+        name="puzzle", guild_id=guild.id, hunt_id=hunt_category.id, round_id=round_category.id,
+        channel_id=text_channel.id, voice_channel_id=voice_channel.id,
+    )
+    stores.puzzles.commit(puzzle)
+    return SimpleNamespace(guild=guild, text_channel=text_channel, voice_channel=voice_channel, puzzle=puzzle)
+
+
+def make_cog(guild, **kwargs):
+    async def wait_until_ready():
+        await asyncio.Event().wait()
+
+    fake_bot = SimpleNamespace(
+        jobs=SimpleNamespace(register=lambda *args, **kwargs: None),
+        channel_index=ChannelIndex(),
+        get_guild=lambda guild_id: guild if guild_id == guild.id else None,
+        get_cog=lambda name: None,
+        wait_until_ready=wait_until_ready,
+    )
+    fake_bot.__dict__.update(kwargs)
+    return Puzzles(fake_bot)
+
+
+def run_with_cog(guild, test, **kwargs):
+    """Run the async test with a cog, stopping its background loops afterwards"""
+    async def run():
+        cog = make_cog(guild, **kwargs)
+        try:
+            await test(cog)
+        finally:
+            stop_loops(cog)
+
+    asyncio.run(run())
+
+
+def stop_loops(cog):
+    cog.archived_solved_puzzles_loop.cancel()
+    cog.reap_voice_channels.cancel()
+
+
+class TestVoiceChannels:
+    def test_reap_after_deleting_puzzle(self, hunt):
+        async def send(*args, **kwargs):
+            pass
+
+        async def test(cog):
+            cog.track_voice_channel(hunt.puzzle)
+            ctx = SimpleNamespace(guild=hunt.guild, channel=hunt.text_channel, send=send)
+            await cog.delete.callback(cog, ctx)
+            assert hunt.voice_channel.deleted and hunt.text_channel.deleted
+            # the reaper keeps running, and has nothing left to track
+            await cog.reap_voice_channels()
+            assert cog.voice_channels == {}
+            assert cog.voice_idle_since == {}
+
+        run_with_cog(hunt.guild, test)
+
+    def test_reap_untracked_channel(self, hunt):
+        async def test(cog):
+            cog.voice_idle_since[99] = time.monotonic() - 3600
+            await cog.reap_voice_channels()
+            assert cog.voice_idle_since == {}
+
+        run_with_cog(hunt.guild, test)
+
+    def test_reap_idle_channel(self, hunt, stores):
+        async def test(cog):
+            cog.track_voice_channel(hunt.puzzle)
+            cog.voice_idle_since[hunt.voice_channel.id] -= 31 * 60
+            await cog.reap_voice_channels()
+            assert hunt.voice_channel.deleted
+            assert cog.voice_channels == {}
+
+        run_with_cog(hunt.guild, test)
+        puzzle = stores.puzzles.get(1, hunt.puzzle.channel_id, hunt.puzzle.round_id, hunt.puzzle.hunt_id)
+        assert puzzle.voice_channel_id == 0
+
+
+class TestSolvedCategories:
+    def test_keep_settings_committed_while_creating(self, hunt, stores):
+        new_round = hunt.guild.add(40, "new-round", discord.ChannelType.category)
+        create_category = hunt.guild.create_category
+
+        async def slow_create_category(name, **kwargs):
+            # e.g. `!round` adding a round while the category is being created
+            settings = stores.settings.get(1)
+            settings.category_mapping[new_round.id] = 5
+            stores.settings.commit(settings)
+            return await create_category(name, **kwargs)
+
+        async def test(cog):
+            stores.settings.get_cached(1)
+            hunt.guild.create_category = slow_create_category
+            category = await cog.add_solved_category(hunt.guild, 5)
+            assert category.name == "hunt-solved"
+
+        run_with_cog(hunt.guild, test)
+        settings = stores.settings.get(1)
+        solved_id = settings.hunt_settings[5].solved_category_ids[0]
+        assert settings.category_mapping == {10: 5, 40: 5, solved_id: 5}
+
+    def test_pick_up_legacy_categories(self, hunt, stores):
+        first = hunt.guild.add(20, "hunt-solved", discord.ChannelType.category)
+        second = hunt.guild.add(21, "hunt-solved-2", discord.ChannelType.category)
+
+        async def test(cog):
+            assert cog.solved_categories(hunt.guild, 5) == [first, second]
+
+        run_with_cog(hunt.guild, test)
+        assert stores.settings.get(1).hunt_settings[5].solved_category_ids == [20, 21]
+
+
+class TestPuzzleThreads:
+    @pytest.mark.parametrize("mode, parent_name, parent_type", [
+        ("meta", "meta", discord.ChannelType.text),
+        ("forum", "puzzles", discord.ChannelType.forum),
+    ])
+    def test_create_and_reuse(self, hunt, mode, parent_name, parent_type):
+        round_category = hunt.text_channel.category
+
+        async def test(cog):
+            thread, created = await cog.get_or_create_thread(hunt.guild, round_category, "new-puzzle", mode)
+            assert created and thread.type is discord.ChannelType.public_thread
+            parent = cog.channels(hunt.guild).get(thread.parent_id)
+            assert (parent.name, parent.type, parent.category) == (parent_name, parent_type, round_category)
+            assert await cog.get_or_create_thread(hunt.guild, round_category, "new-puzzle", mode) == (thread, False)
+            other, created = await cog.get_or_create_thread(hunt.guild, round_category, "other-puzzle", mode)
+            assert created and other.parent_id == parent.id
+
+        run_with_cog(hunt.guild, test)
+        assert len(hunt.guild.threads) == 2
+
+    def test_unknown_mode(self, hunt):
+        async def test(cog):
+            with pytest.raises(ValueError):
+                await cog.get_or_create_thread(hunt.guild, hunt.text_channel.category, "new-puzzle", "channels")
+
+        run_with_cog(hunt.guild, test)
+
+    def test_archive_solved_threads(self, hunt, stores):
+        meta = hunt.guild.add(30, "meta", category=hunt.text_channel.category)
+        threads = []
+
+        async def test(cog):
+            for name in ["indexed", "auto-archived"]:
+                thread, _ = await cog.get_or_create_thread(hunt.guild, meta.category, name, "meta")
+                threads.append(thread)
+            # not indexed after a restart, since Discord archived it already
+            cog.channels(hunt.guild).remove(threads[1])
+            puzzles = []
+            for thread in threads:
+                puzzle = PuzzleData(
+                    name=thread.name, guild_id=1, hunt_id=5, round_id=10, channel_id=thread.id, status="solved",
+                )
+                stores.puzzles.commit(puzzle)
+                puzzles.append(puzzle)
+            await cog.archive_hunt_puzzles(hunt.guild, 5, puzzles)
+
+        run_with_cog(hunt.guild, test)
+        assert all(thread.archived and thread.locked for thread in threads)
+        assert all(thread.category_id == 10 for thread in threads)
+        assert all(stores.puzzles.get(1, thread.id, 10, 5).archive_time for thread in threads)
+
+
+class TestMoveChannels:
+    def test_one_by_one_when_bulk_update_fails(self, hunt):
+        solved = hunt.guild.add(20, "solved", discord.ChannelType.category)
+        already_moved = hunt.guild.add(13, "other", category=solved)
+
+        async def bulk_channel_update(guild_id, data, reason=None):
+            raise discord.HTTPException(SimpleNamespace(status=400, reason="Bad Request"), "too many channels")
+
+        async def test(cog):
+            await cog.move_channels(hunt.guild, [hunt.text_channel, already_moved], solved)
+
+        run_with_cog(hunt.guild, test, http=SimpleNamespace(bulk_channel_update=bulk_channel_update))
+        assert hunt.text_channel.category is solved
+        assert already_moved.category is solved
+
+
+class TestBatchPuzzles:
+    def test_parse_and_create(self, hunt):
+        sent, created, enqueued = [], [], []
+
+        async def send(content):
+            sent.append(content)
+
+        async def setup_puzzle_channel(guild, round_name, puzzle_name, puzzle_url=None):
+            created.append((round_name, puzzle_name, puzzle_url))
+            if puzzle_name == "broken":
+                raise ValueError("Round not found")
+            channel = FakeChannel(100 + len(created), puzzle_name)
+            return channel, puzzle_name != "puzzle", SimpleNamespace(name=puzzle_name), None
+
+        gsheet_cog = SimpleNamespace(enqueue_puzzle_spreadsheet=lambda puzzle: enqueued.append(puzzle.name))
+        bot_channel = FakeChannel(30, "bot", guild=hunt.guild)
+        ctx = SimpleNamespace(guild=hunt.guild, channel=bot_channel, send=send)
+
+        async def test(cog):
+            cog.setup_puzzle_channel = setup_puzzle_channel
+            await cog.puzzle.callback(cog, ctx, arg="round: first | Second, https://hunt/second\npuzzle\n| first |broken")
+
+        run_with_cog(hunt.guild, test, get_cog=lambda name: gsheet_cog)
+        assert created == [
+            ("round", "first", None),
+            ("round", "Second", "https://hunt/second"),
+            ("round", "puzzle", None),
+            ("round", "broken", None),
+        ]
+        assert enqueued == ["first", "Second"]
+        assert len(sent) == 1
+        assert sent[0].splitlines() == [
+            ":white_check_mark: I've created 2 new puzzle channels: <#101> <#102>",
+            "I've found already existing puzzle channels: <#103>",
+            ":exclamation: Unable to create:",
+            "broken: Round not found",
+        ]
+
+
+    def test_spreadsheets_queued_as_channels_are_created(self, hunt):
+        enqueued = []
+        fast_enqueued = asyncio.Event()
+
+        async def send(content):
+            pass
+
+        async def setup_puzzle_channel(guild, round_name, puzzle_name, puzzle_url=None):
+            if puzzle_name == "slow":
+                # the other puzzle's spreadsheet is queued while this channel is still being created
+                await asyncio.wait_for(fast_enqueued.wait(), timeout=5)
+            return FakeChannel(100 + len(enqueued), puzzle_name), True, SimpleNamespace(name=puzzle_name), None
+
+        def enqueue_puzzle_spreadsheet(puzzle):
+            enqueued.append(puzzle.name)
+            if puzzle.name == "fast":
+                fast_enqueued.set()
+
+        gsheet_cog = SimpleNamespace(enqueue_puzzle_spreadsheet=enqueue_puzzle_spreadsheet)
+        ctx = SimpleNamespace(guild=hunt.guild, channel=FakeChannel(30, "bot", guild=hunt.guild), send=send)
+
+        async def test(cog):
+            cog.setup_puzzle_channel = setup_puzzle_channel
+            await cog.puzzle.callback(cog, ctx, arg="round: first | slow | fast")
+
+        run_with_cog(hunt.guild, test, get_cog=lambda name: gsheet_cog)
+        assert enqueued == ["first", "fast", "slow"]
+
+
+class FakeInteraction:
+    def __init__(self, loading=True, expired=False, error=None):
+        self.flags = SimpleNamespace(loading=loading)
+        self.expired = expired
+        self.error = error
+        self.edits = []
+
+    def is_expired(self):
+        return self.expired
+
+    async def original_response(self):
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(flags=self.flags)
+
+    async def edit_original_response(self, content):
+        self.edits.append(content)
+
+
+class TestSlashCommandHooks:
+    def invoke(self, hunt, interaction, command_failed=False):
+        deferred = []
+
+        async def defer():
+            deferred.append(True)
+
+        ctx = SimpleNamespace(interaction=interaction, command_failed=command_failed, defer=defer)
+
+        async def test(cog):
+            await cog.cog_before_invoke(ctx)
+            await cog.cog_after_invoke(ctx)
+
+        run_with_cog(hunt.guild, test)
+        return deferred
+
+    def test_defer_and_acknowledge(self, hunt):
+        interaction = FakeInteraction()
+        assert self.invoke(hunt, interaction) == [True]
+        assert interaction.edits == [":ok_hand:"]
+
+    def test_keep_command_response(self, hunt):
+        for interaction, command_failed in [
+            (FakeInteraction(loading=False), False),
+            (FakeInteraction(), True),
+            (FakeInteraction(expired=True), False),
+        ]:
+            self.invoke(hunt, interaction, command_failed=command_failed)
+            assert interaction.edits == []
+
+    def test_ignore_deleted_response(self, hunt):
+        error = discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        interaction = FakeInteraction(error=error)
+        self.invoke(hunt, interaction)
+        assert interaction.edits == []
@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot.cogs.puzzles_gsheet as puzzles_gsheet
+from bot.cogs.puzzles_gsheet import GoogleSheets
+from bot.store import HuntSettings, PuzzleData
+from bot.store.fs import FileGuildSettingsDb, FileJobDb, FilePuzzleJsonDb
+from bot.utils.gsheet_pool import SpreadsheetPool
+from bot.utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    (tmp_path / "1").mkdir()
+    puzzle_db = FilePuzzleJsonDb(dir_path=tmp_path)
+    settings_db = FileGuildSettingsDb(dir_path=tmp_path)
+    monkeypatch.setattr(puzzles_gsheet, "PuzzleJsonDb", puzzle_db)
+    monkeypatch.setattr(puzzles_gsheet, "GuildSettingsDb", settings_db)
+    return SimpleNamespace(puzzles=puzzle_db, settings=settings_db)
+
+
+def make_cog(guild_ids=(1,), **kwargs):
+    # Skip __init__, which starts the background loops and token refreshes
+    cog = GoogleSheets.__new__(GoogleSheets)
+    cog.bot = SimpleNamespace(guilds=[SimpleNamespace(id=guild_id) for guild_id in guild_ids], **kwargs)
+    cog.pool_refills = {}
+    return cog
+
+
+class TestRefreshNexus:
+    def test_failing_hunt_does_not_stop_others(self, stores, monkeypatch):
+        settings = stores.settings.get(1)
+        for hunt_id, nexus_id in [(2, "broken-nexus"), (3, "nexus")]:
+            settings.hunt_settings[hunt_id] = HuntSettings(
+                hunt_id=hunt_id, guild_id=1, hunt_name=f"hunt-{hunt_id}", drive_nexus_sheet_id=nexus_id
+            )
+        stores.settings.commit(settings)
+
+        updated = []
+
+        async def update_nexus(agcm, file_id, puzzles):
+            if file_id == "broken-nexus":
+                raise RuntimeError("quota exceeded")
+            updated.append(file_id)
+
+        monkeypatch.setattr(puzzles_gsheet, "update_nexus", update_nexus)
+        asyncio.run(make_cog().refresh_nexus())
+        assert updated == ["nexus"]
+
+
+class TestPuzzleSheetJob:
+    def test_pooled_sheet_returned_when_move_fails(self, stores, tmp_path, monkeypatch):
+        settings = stores.settings.get(1)
+        settings.hunt_settings[2] = HuntSettings(hunt_id=2, guild_id=1, hunt_name="hunt", drive_parent_id="hunt-folder")
+        stores.settings.commit(settings)
+        puzzle = PuzzleData(name="puzzle", round_name="round", guild_id=1, hunt_id=2, round_id=3, channel_id=4)
+        stores.puzzles.commit(puzzle)
+
+        pool = SpreadsheetPool(tmp_path / "pool.json")
+        pool.add("hunt-folder", "pooled-sheet")
+        monkeypatch.setattr(puzzles_gsheet, "sheet_pool", pool)
+        job_db = FileJobDb(dir_path=tmp_path / "jobs")
+        moves = []
+
+        async def get_or_create_folder(name, parent_id):
+            return {"id": "round-folder"}
+
+        async def move_file(file_id, name, add_parent_id, remove_parent_id):
+            # the claimed sheet is recorded before moving it
+            assert [job.payload["sheet_id"] for job in job_db.get_all() if job.kind == "puzzle_sheet"] == [file_id]
+            moves.append(file_id)
+            if len(moves) == 1:
+                raise RuntimeError("backend error")
+
+        async def send(**kwargs):
+            pass
+
+        monkeypatch.setattr(puzzles_gsheet, "get_or_create_folder", get_or_create_folder)
+        monkeypatch.setattr(puzzles_gsheet, "move_file", move_file)
+        text_channel = SimpleNamespace(id=4, guild=SimpleNamespace(id=1), send=send)
+        jobs = JobQueue(job_db)
+        cog = make_cog(jobs=jobs, get_channel=lambda channel_id: text_channel)
+
+        async def run():
+            cog.enqueue_puzzle_spreadsheet(puzzle)
+            job = jobs.pending("puzzle_sheet")[0]
+            with pytest.raises(RuntimeError):
+                await cog.run_puzzle_sheet_job(job)
+            assert pool.size("hunt-folder") == 1
+            assert "sheet_id" not in job_db.get_all()[0].payload
+            await cog.run_puzzle_sheet_job(job)
+
+        asyncio.run(run())
+        assert moves == ["pooled-sheet", "pooled-sheet"]
+        assert pool.size("hunt-folder") == 0
+        assert stores.puzzles.get(1, 4, 3, 2).google_sheet_id == "pooled-sheet"
+
+
+class TestSheetPoolRelease:
+    def test_release_retried_when_trash_fails(self, tmp_path, monkeypatch):
+        pool = SpreadsheetPool(tmp_path / "pool.json")
+        pool.add("hunt-folder", "sheet-1")
+        pool.add("hunt-folder", "sheet-2")
+        monkeypatch.setattr(puzzles_gsheet, "sheet_pool", pool)
+        trashed = []
+
+        async def batch_trash_files(file_ids):
+            if not trashed:
+                trashed.append(None)
+                raise RuntimeError("backend error")
+            trashed.extend(file_ids)
+
+        monkeypatch.setattr(puzzles_gsheet, "batch_trash_files", batch_trash_files)
+        jobs = JobQueue(FileJobDb(dir_path=tmp_path / "jobs"))
+        cog = make_cog(jobs=jobs)
+        cog.release_sheet_pool(HuntSettings(hunt_id=2, guild_id=1, hunt_name="hunt", drive_parent_id="hunt-folder"))
+        job = jobs.pending("sheet_pool_release")[0]
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cog.run_sheet_pool_release_job(job))
+        assert pool.size("hunt-folder") == 2
+        asyncio.run(cog.run_sheet_pool_release_job(job))
+        assert trashed == [None, "sheet-1", "sheet-2"]
+        assert pool.size("hunt-folder") == 0